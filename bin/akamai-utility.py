@@ -6,8 +6,11 @@ import sys
 from pathlib import Path
 from time import perf_counter
 
+from akamai_api import edge_auth
 from akamai_api.identity_access import IdentityAccessManagement
+from akamai_utils import checkpoint
 from akamai_utils import papi as p
+from akamai_utils import snapshot
 from command import admin
 from command import bulk
 from command import certificates_audit as ca
@@ -21,8 +24,12 @@ from command import mpulse as mp
 from command import report
 from command import ruleformat
 from command import security as sec
+from command import snapshot as snap
 from command.parser import AkamaiParser as Parser
 from utils import _logging as lg
+from utils import cache
+from utils import files
+from utils import resolver
 
 
 if __name__ == '__main__':
@@ -31,6 +38,18 @@ if __name__ == '__main__':
     start_time = perf_counter()
     logger = lg.setup_logger(args)
 
+    # size the shared API connection pool so every worker thread can hold a connection
+    concurrency = int(getattr(args, 'concurrency', 0) or 0)
+    edge_auth.configure_session_pool(pool_size=max(concurrency, 10),
+                                     keep_alive=not args.no_keep_alive,
+                                     connect_timeout=args.connect_timeout,
+                                     read_timeout=args.read_timeout)
+    cache.configure_cache(enabled=not args.no_cache, refresh=args.refresh)
+    files.configure_output(args.output_format, constant_memory=args.constant_memory)
+    if args.dns_backend == 'server' and not args.dns_server:
+        sys.exit(logger.error('--dns-server is required with --dns-backend server'))
+    resolver.configure_resolver(backend=args.dns_backend, server=args.dns_server, concurrency=args.dns_concurrency)
+
     if args.command is None:
         sys.exit(logger.error('no valid command found'))
     else:
@@ -47,6 +66,9 @@ if __name__ == '__main__':
             account = iam.show_account_summary(account)
             account_folder = f'output/{account}'
             Path(account_folder).mkdir(parents=True, exist_ok=True)
+            checkpoint.configure_checkpoint(account_folder, resume=args.resume)
+            if args.snapshot and args.command != 'snapshot':
+                snapshot.configure_snapshot(account_folder, logger=logger)
 
     if args.command == 'mpulse':
         if args.subcommand == 'token':
@@ -94,6 +116,8 @@ if __name__ == '__main__':
         Path(f'{account_folder}').mkdir(parents=True, exist_ok=True)
         if args.subcommand == 'hostname':
             sec.audit_hostname(args, account_folder, logger)
+        elif args.subcommand == 'netlist':
+            sec.network_list(args, account_folder, logger)
         else:
             sec.list_config(args, account_folder, logger)
 
@@ -139,10 +163,18 @@ if __name__ == '__main__':
             bulk.bulk_activate(args, account_folder, logger=logger)
         elif args.subcommand == 'add':
             bulk.bulk_add_behavior_default(args, account_folder, logger=logger)
+        elif args.subcommand == 'jobs':
+            bulk.bulk_jobs(args, account_folder, logger=logger)
 
     if args.command == 'certificate':
         ca.audit(args, account_folder, logger)
 
+    if args.command == 'snapshot':
+        if args.subcommand == 'refresh':
+            snap.refresh(args, account_folder, logger)
+        else:
+            snap.show(args, account_folder, logger)
+
     if args.command == 'cpcode':
         if args.subcommand == 'reporting':
             if args.ops == 'create':
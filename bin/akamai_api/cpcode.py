@@ -18,8 +18,9 @@ class CpCode(AkamaiSession):
         self._params = super().params
         self.logger = logger
 
-    def list_cpcode(self) -> tuple:
-        return self.session.get(f'{self.MODULE}/cpcodes', params=self._params, headers=self.headers)
+    def list_cpcode(self, params: dict | None = None) -> tuple:
+        params = self._params if params is None else params
+        return self.session.get(f'{self.MODULE}/cpcodes', params=params, headers=self.headers)
 
     def get_cpcode(self, cpcode: str) -> tuple:
         return self.session.get(f'{self.MODULE}/cpcodes/{cpcode}', params=self._params, headers=self.headers)
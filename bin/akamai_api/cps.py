@@ -2,13 +2,16 @@
 # https://techdocs.akamai.com/cps/reference/api-summary
 from __future__ import annotations
 
+import concurrent.futures
 import logging
+import threading
 from urllib.parse import urlparse
 
 import pandas as pd
 from akamai_api.edge_auth import AkamaiSession
+from akamai_api.edge_auth import POOL_CONFIG
 from rich import print_json
-from utils import google_dns as gg
+from utils import resolver
 
 
 class CpsWrapper(AkamaiSession):
@@ -21,6 +24,8 @@ class CpsWrapper(AkamaiSession):
         self.headers = {'Accept': 'application/vnd.akamai.cps.enrollments.v11+json'}
         self.account_switch_key = account_switch_key if account_switch_key else None
         self.logger = logger
+        self.deployments: dict[int, dict] = {}
+        self.deployments_lock = threading.Lock()
 
     def list_enrollments(self, contract_id: str, enrollment_ids: list | None = None) -> list:
         self.logger.debug(f'{contract_id=} {enrollment_ids=}')
@@ -28,54 +33,61 @@ class CpsWrapper(AkamaiSession):
         params = self.params
         params['contractId'] = contract_id
         resp = self.session.get(f'{self.MODULE}/enrollments', params=params, headers=self.headers)
-        enrollments = []
-        df = pd.DataFrame()
         if resp.status_code == 200:
             self.logger.debug(f'Enrollments for contract {contract_id:<15} {urlparse(resp.url).path:>20} {resp.status_code}')
             enrollments = resp.json()['enrollments']
-            df = pd.DataFrame(enrollments)
-            pd.set_option('display.max_rows', 300)
-            pd.set_option('max_colwidth', 50)
-            df['contractId'] = contract_id
-            cols = df.columns.values.tolist()
-            if 'productionSlots' in cols:
-                df['productionSlots'] = df['productionSlots'].apply(lambda x: x[0] if len(x) == 1 else 0)
-
-            if 'csr' in cols:
-                df['common_name'] = df['csr'].apply(lambda x: x['cn'])
-                df['hostname_count'] = df['csr'].apply(lambda x: len(x['sans']))
-                df['hostname'] = df['csr'].apply(lambda x: x['sans'])
-
-                empty_df = df[df['hostname_count'] == 0].copy()
-                empty_df = empty_df.sort_values(by='common_name')
-                empty_df = empty_df.reset_index(drop=True)
-
-                df = df.sort_values(by=['hostname_count', 'common_name'])
-                df = df.reset_index(drop=True)
-                all_columns = ['contractId'] + df.columns.values.tolist()
-
-            if 'networkConfiguration' in cols:
-                df['sni'] = df['networkConfiguration'].apply(lambda x: x['sniOnly'])
-
-            if 'productionSlots' in cols:
-                df = df.rename(columns={'productionSlots': 'Slot'})
-                df['Slot'] = df['Slot'].astype(str)
-
-            if not df.empty:
-                if empty_df.shape[0] > 0:
-                    self.logger.critical(f'out of {df.shape[0]}, {empty_df.shape[0]} certificates do not have hostname assigned to')
-                columns = ['contractId', 'id', 'Slot', 'ra',
-                           'orgId', 'org', 'adminContact', 'techContact',
-                           'common_name', 'sni', 'hostname_count', 'hostname']
-                return enrollments, df[columns]
-            else:
-                return [], pd.DataFrame()
+            df = self.enrollments_dataframe(contract_id, enrollments)
+            return (enrollments, df) if not df.empty else ([], df)
         else:
             self.logger.debug(f'Enrollments for contract {contract_id:<15} {urlparse(resp.url).path:>20} {resp.status_code}')
-            return [], pd.DataFrame()
+            # None tells a failed listing apart from a contract without enrollment
+            return None, pd.DataFrame()
+
+    def enrollments_dataframe(self, contract_id: str, enrollments: list) -> pd.DataFrame:
+        df = pd.DataFrame(enrollments)
+        if df.empty:
+            return df
+        pd.set_option('display.max_rows', 300)
+        pd.set_option('max_colwidth', 50)
+        df['contractId'] = contract_id
+        cols = df.columns.values.tolist()
+        if 'productionSlots' in cols:
+            df['productionSlots'] = df['productionSlots'].apply(lambda x: x[0] if len(x) == 1 else 0)
+
+        empty_df = pd.DataFrame()
+        if 'csr' in cols:
+            df['common_name'] = df['csr'].apply(lambda x: x['cn'])
+            df['hostname_count'] = df['csr'].apply(lambda x: len(x['sans']))
+            df['hostname'] = df['csr'].apply(lambda x: x['sans'])
+
+            empty_df = df[df['hostname_count'] == 0].copy()
+            empty_df = empty_df.sort_values(by='common_name')
+            empty_df = empty_df.reset_index(drop=True)
+
+            df = df.sort_values(by=['hostname_count', 'common_name'])
+            df = df.reset_index(drop=True)
+
+        if 'networkConfiguration' in cols:
+            df['sni'] = df['networkConfiguration'].apply(lambda x: x['sniOnly'])
+
+        if 'productionSlots' in cols:
+            df = df.rename(columns={'productionSlots': 'Slot'})
+            df['Slot'] = df['Slot'].astype(str)
+
+        if empty_df.shape[0] > 0:
+            self.logger.critical(f'out of {df.shape[0]}, {empty_df.shape[0]} certificates do not have hostname assigned to')
+        columns = ['contractId', 'id', 'Slot', 'ra',
+                   'orgId', 'org', 'adminContact', 'techContact',
+                   'common_name', 'sni', 'hostname_count', 'hostname']
+        return df[columns]
+
+    def list_enrollments_many(self, contract_ids: list[str]) -> dict[str, tuple]:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=POOL_CONFIG['pool_size']) as executor:
+            return dict(zip(contract_ids, executor.map(self.list_enrollments, contract_ids)))
 
     def collect_enrollments(self, contract_id: str, enrollments: list, enrollment_ids: list | None = None) -> list:
         enrollment_filered = [cert for cert in enrollments if cert.get('id', {}) in enrollment_ids]
+        self.fetch_deployments([cert['id'] for cert in (enrollment_filered if enrollment_filered else enrollments)])
 
         enrollment_subset = []
         if enrollment_filered:
@@ -143,8 +155,9 @@ class CpsWrapper(AkamaiSession):
                                           'techContact' : certificates['techContact']['email']
                                           })
             '''
+            cnames = resolver.get_resolver().resolve_many(hostnames)
             for hostname in certificates['csr']['sans']:
-                cname = gg.dnslookup(hostname=hostname)
+                cname = cnames.get(hostname, 'Wildcard')
                 if 'edgesuite.net' in cname:
                     self.logger.info(f'{contract_id=:<20} {enrollment_id=:<20} {hostname:<40} cname to {cname}')
                 enrollment_subset.append({'contractId': contract_id,
@@ -162,7 +175,7 @@ class CpsWrapper(AkamaiSession):
                                           })
 
         else:
-            cname = gg.dnslookup(hostname=common_name)
+            cname = resolver.get_resolver().resolve(common_name)
             # if 'edgesuite.net' in cname:
             # logger.info(f'{contract_id=:<20} {enrollment_id=:<20} {hostname:<40} cname to {cname}')
             enrollment_subset.append({'contractId': contract_id,
@@ -181,39 +194,56 @@ class CpsWrapper(AkamaiSession):
 
         return enrollment_subset
 
-    def certificate_deployment(self, enrollment_id: int) -> str:
+    def get_deployment(self, enrollment_id: int) -> dict | None:
         '''
-        Provide trustChain and expiration date
+        Deployments of one enrollment, fetched once per run
         '''
-        self.headers = {'Accept': 'application/vnd.akamai.cps.deployments.v7+json'}
+        with self.deployments_lock:
+            if enrollment_id in self.deployments:
+                return self.deployments[enrollment_id]
         url = f'{self.MODULE}/enrollments/{enrollment_id}/deployments'
-        resp = self.session.get(url, params=self.params, headers=self.headers)
+        resp = self.session.get(url, params=self.params, headers={'Accept': 'application/vnd.akamai.cps.deployments.v7+json'})
         if resp.status_code == 200:
-            if 'expiry' in resp.json()['production']['primaryCertificate'].keys():
-                expire_date = resp.json()['production']['primaryCertificate']['expiry']
-            else:
-                expire_date = None
+            deployment = resp.json()
         else:
             self.logger.error(f'Deployment for {enrollment_id} {urlparse(resp.url).path:>20} {resp.status_code}')
-        # print_json(data=resp.json())
-        # logger.info(resp.url)
-        return expire_date, resp.json()['production']['primaryCertificate']
+            deployment = None
+        with self.deployments_lock:
+            self.deployments[enrollment_id] = deployment
+        return deployment
+
+    def fetch_deployments(self, enrollment_ids: list[int]) -> dict[int, dict | None]:
+        '''
+        Deployments of every enrollment in one concurrent fan-out, throttled by the shared cps rate limit
+        '''
+        missing = [x for x in dict.fromkeys(enrollment_ids) if x not in self.deployments]
+        if missing:
+            self.logger.debug(f'Collect deployment for {len(missing)} enrollments')
+            with concurrent.futures.ThreadPoolExecutor(max_workers=POOL_CONFIG['pool_size']) as executor:
+                list(executor.map(self.get_deployment, missing))
+        return {x: self.deployments.get(x) for x in enrollment_ids}
+
+    def certificate_deployment(self, enrollment_id: int) -> str:
+        '''
+        Provide trustChain and expiration date
+        '''
+        deployment = self.get_deployment(enrollment_id)
+        if deployment is None:
+            return None, {}
+        certificate = deployment['production']['primaryCertificate']
+        return certificate.get('expiry'), certificate
 
     def certificate_expiration_date(self, enrollment_id: int) -> str:
         '''
         Provide trustChain and expiration date
         '''
-        self.headers = {'Accept': 'application/vnd.akamai.cps.deployments.v7+json'}
-        url = f'{self.MODULE}/enrollments/{enrollment_id}/deployments'
-        resp = self.session.get(url, params=self.params, headers=self.headers)
-        if resp.status_code == 200:
-            try:
-                return resp.json()['production']['primaryCertificate']['expiry']
-            except:
-                self.logger.debug(f'{enrollment_id:<7} {resp.json()}')
-                return ''
-        else:
-            self.logger.error(f'Deployment for {enrollment_id} {urlparse(resp.url).path:>20} {resp.status_code}')
+        deployment = self.get_deployment(enrollment_id)
+        if deployment is None:
+            return ''
+        try:
+            return deployment['production']['primaryCertificate']['expiry']
+        except (KeyError, TypeError):
+            self.logger.debug(f'{enrollment_id:<7} {deployment}')
             return ''
 
     def get_enrollment(self, enrollment_id: int):
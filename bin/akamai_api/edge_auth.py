@@ -1,20 +1,208 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 import re
 import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
 from configparser import NoOptionError
 from configparser import NoSectionError
 from pathlib import Path
 
+import aiohttp
 import requests
 from akamai.edgegrid import EdgeGridAuth
 from akamai.edgegrid import EdgeRc
+from akamai_api.rate_limit import api_family
+from akamai_api.rate_limit import get_bucket
+from akamai_api.rate_limit import RateLimitedSession
+from akamai_api.rate_limit import retry_wait
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from yarl import URL
 
 
 logger = logging.getLogger(__name__)
 
+# one keep-alive pool per (edgerc section, host), shared by every AkamaiSession subclass
+# async_limit caps the connections, so the requests in flight, of the async transport per event loop
+POOL_CONFIG = {'pool_size': 10,
+               'async_limit': 100,
+               'keep_alive': True,
+               'connect_timeout': 10,
+               'read_timeout': 120}
+_shared_sessions: dict[tuple[str, str], requests.Session] = {}
+_shared_sessions_lock = threading.Lock()
+_async_sessions: dict[tuple[asyncio.AbstractEventLoop, str, str], aiohttp.ClientSession] = {}
+_map_executor: ThreadPoolExecutor | None = None
+_map_worker = threading.local()
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    '''
+    HTTPAdapter applying the pool default (connect, read) timeout
+    when the caller does not provide one
+    '''
+    def __init__(self, timeout: tuple | None = None, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def configure_session_pool(pool_size: int | None = None,
+                           keep_alive: bool | None = None,
+                           connect_timeout: float | None = None,
+                           read_timeout: float | None = None,
+                           async_limit: int | None = None) -> dict:
+    '''
+    Tune the shared connection pool, call before any API wrapper is created.
+    pool_size is usually derived from --concurrency so every worker thread gets its own connection.
+    '''
+    with _shared_sessions_lock:
+        if pool_size:
+            POOL_CONFIG['pool_size'] = max(int(pool_size), 1)
+        if async_limit:
+            POOL_CONFIG['async_limit'] = max(int(async_limit), 1)
+        if keep_alive is not None:
+            POOL_CONFIG['keep_alive'] = keep_alive
+        if connect_timeout:
+            POOL_CONFIG['connect_timeout'] = float(connect_timeout)
+        if read_timeout:
+            POOL_CONFIG['read_timeout'] = float(read_timeout)
+
+        # sessions built with the previous settings are dropped, new wrappers get a resized pool
+        for session in _shared_sessions.values():
+            session.close()
+        _shared_sessions.clear()
+    logger.debug(f'connection pool {POOL_CONFIG}')
+    return POOL_CONFIG
+
+
+def get_shared_session(edgerc_file: EdgeRc, section: str, host: str) -> requests.Session:
+    key = (section, host)
+    with _shared_sessions_lock:
+        session = _shared_sessions.get(key)
+        if session is None:
+            session = RateLimitedSession()
+            session.auth = EdgeGridAuth.from_edgerc(edgerc_file, section)
+            adapter = TimeoutHTTPAdapter(timeout=(POOL_CONFIG['connect_timeout'], POOL_CONFIG['read_timeout']),
+                                         pool_connections=1,
+                                         pool_maxsize=POOL_CONFIG['pool_size'],
+                                         pool_block=True)
+            session.mount('https://', adapter)
+            if not POOL_CONFIG['keep_alive']:
+                session.headers['Connection'] = 'close'
+            _shared_sessions[key] = session
+            logger.debug(f'new connection pool for [{section}] {host} size {POOL_CONFIG["pool_size"]}')
+    return session
+
+
+def get_async_session(section: str, host: str) -> aiohttp.ClientSession:
+    '''
+    aiohttp connection pool of the running event loop for (edgerc section, host),
+    closed by run_coroutines or close_async_sessions
+    '''
+    key = (asyncio.get_running_loop(), section, host)
+    with _shared_sessions_lock:
+        session = _async_sessions.get(key)
+        if session is None:
+            connector = aiohttp.TCPConnector(limit=POOL_CONFIG['async_limit'], force_close=not POOL_CONFIG['keep_alive'])
+            timeout = aiohttp.ClientTimeout(sock_connect=POOL_CONFIG['connect_timeout'], sock_read=POOL_CONFIG['read_timeout'])
+            session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            _async_sessions[key] = session
+            logger.debug(f'new async connection pool for [{section}] {host} limit {POOL_CONFIG["async_limit"]}')
+    return session
+
+
+async def close_async_sessions() -> None:
+    loop = asyncio.get_running_loop()
+    with _shared_sessions_lock:
+        sessions = [_async_sessions.pop(key) for key in [key for key in _async_sessions if key[0] is loop]]
+    for session in sessions:
+        await session.close()
+
+
+def run_coroutines(coroutines: list) -> list:
+    '''
+    Run awaitable API calls on one event loop from synchronous code, results keep the input order.
+    Requests in flight are capped by POOL_CONFIG['async_limit'] and throttled by the shared rate limiter.
+
+    sample:
+    df['hostname'] = run_coroutines([papi.async_get_property_hostnames(x) for x in df['propertyId']])
+    '''
+    async def gather():
+        try:
+            return await asyncio.gather(*coroutines)
+        finally:
+            await close_async_sessions()
+    return asyncio.run(gather())
+
+
+def get_map_executor() -> ThreadPoolExecutor:
+    '''
+    Worker threads shared by every parallel_map call, sized to the connection pool
+    '''
+    global _map_executor
+    with _shared_sessions_lock:
+        if _map_executor is None:
+            _map_executor = ThreadPoolExecutor(max_workers=POOL_CONFIG['pool_size'], thread_name_prefix='parallel_map',
+                                               initializer=lambda: setattr(_map_worker, 'active', True))
+    return _map_executor
+
+
+def parallel_map(func, items, concurrency: int | None = None, progress: str | None = None,
+                 logger: logging.Logger = logger, executor: ThreadPoolExecutor | None = None) -> list:
+    '''
+    Apply an I/O bound function (API call, DNS lookup) to every item on the shared worker threads,
+    requests go through the pooled session and rate limiter, results keep the input order.
+    At most `concurrency` items are in flight, a nested call from a worker runs serially.
+    Work that is not an API call (DNS queries, TLS handshakes) passes its own executor,
+    `concurrency` is then not capped by the API pool size and the API worker threads stay free.
+    pandarallel forks and pickles, keep it for CPU bound transforms only.
+
+    sample:
+    df['ruleFormat'] = parallel_map(lambda row: papi.get_property_version_detail(row['propertyId'], row['version'], 'ruleFormat'),
+                                    df.to_dict('records'), concurrency=args.concurrency, progress='ruleFormat')
+    '''
+    items = list(items)
+    if executor is None:
+        limit = min(int(concurrency) if concurrency else POOL_CONFIG['pool_size'], POOL_CONFIG['pool_size'], len(items))
+        if limit <= 1 or getattr(_map_worker, 'active', False):
+            return [func(item) for item in items]
+        executor = get_map_executor()
+    else:
+        limit = min(int(concurrency) if concurrency else len(items), len(items))
+    results = [None] * len(items)
+    queue = iter(enumerate(items))
+    pending = {}
+
+    def submit() -> None:
+        for i, item in queue:
+            pending[executor.submit(func, item)] = i
+            return
+
+    for _ in range(limit):
+        submit()
+    completed, total = 0, len(items)
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            results[pending.pop(future)] = future.result()
+            submit()
+            completed += 1
+            if progress and (completed % 100 == 0 or completed == total):
+                logger.info(f'{progress:<30} {completed:>6,}/{total:,}')
+    return results
+
 
 class AkamaiSession:
     def __init__(self,
@@ -25,7 +213,7 @@ class AkamaiSession:
                  contract_id: int | None = None,
                  group_id: int | None = None):
 
-        self.edgerc_file = edgerc if edgerc else EdgeRc(f'{str(Path.home())}/.edgerc')
+        self.edgerc_file = EdgeRc(edgerc) if edgerc else EdgeRc(f'{str(Path.home())}/.edgerc')
         self.account_switch_key = account_switch_key if account_switch_key else None
         self.contract_id = contract_id if contract_id else None
         self.group_id = group_id if group_id else None
@@ -35,11 +223,53 @@ class AkamaiSession:
         try:
             self.host = self.edgerc_file.get(self.section, 'host')
             self.base_url = f'https://{self.host}'
-            self.session = requests.Session()
-            self.session.auth = EdgeGridAuth.from_edgerc(self.edgerc_file, self.section)
+            self.session = get_shared_session(self.edgerc_file, self.section, self.host)
         except NoSectionError:
             sys.exit(logger.error(f'edgerc section "{self.section}" not found'))
 
+    async def async_request(self, method: str, url: str, **kwargs) -> requests.Response:
+        '''
+        Awaitable request on the aiohttp pool of the running loop. It is signed by the EdgeGridAuth of the shared session,
+        throttled by the same token bucket and retried like RateLimitedSession, every attempt is signed again.
+        Redirects are not followed, the signature only covers the original URL.
+        kwargs are the requests ones (params, json, data, headers), the result is a requests.Response.
+        '''
+        kwargs.pop('timeout', None)
+        session = get_async_session(self.section, self.host)
+        bucket = get_bucket(api_family(url))
+        attempt = 0
+        while True:
+            # prepare_request merges the session headers and signs with the session auth
+            prepared = self.session.prepare_request(requests.Request(method, url, **kwargs))
+            # aiohttp sets its own framing and compression headers, they are not part of the signature
+            headers = {k: v for k, v in prepared.headers.items() if k.lower() not in ('content-length', 'connection', 'accept-encoding')}
+            await bucket.async_acquire()
+            async with session.request(prepared.method, URL(prepared.url, encoded=True), headers=headers,
+                                       data=prepared.body, allow_redirects=False) as response:
+                resp = requests.Response()
+                resp.status_code = response.status
+                resp.reason = response.reason
+                resp.headers = CaseInsensitiveDict(response.headers)
+                resp._content = await response.read()
+                resp.encoding = get_encoding_from_headers(resp.headers)
+                resp.url = prepared.url
+                resp.request = prepared
+            RateLimitedSession.adjust_bucket(bucket, resp)
+            wait = retry_wait(bucket, method, resp, attempt)
+            if wait is None:
+                return resp
+            attempt += 1
+            await asyncio.sleep(wait)
+
+    async def async_get(self, url: str, **kwargs) -> requests.Response:
+        return await self.async_request('GET', url, **kwargs)
+
+    async def async_post(self, url: str, **kwargs) -> requests.Response:
+        return await self.async_request('POST', url, **kwargs)
+
+    async def async_patch(self, url: str, **kwargs) -> requests.Response:
+        return await self.async_request('PATCH', url, **kwargs)
+
     @property
     def params(self) -> dict:
         return {'accountSwitchKey': self.account_switch_key} if self.account_switch_key else {}
@@ -8,7 +8,6 @@ import sys
 
 from akamai_api.edge_auth import AkamaiSession
 from rich import print_json
-from utils import _logging as lg
 
 
 class IdentityAccessManagement(AkamaiSession):
@@ -48,10 +47,6 @@ class IdentityAccessManagement(AkamaiSession):
                 return resp.json()
         elif resp.json()['title'] == 'ERROR_NO_SWITCH_CONTEXT':
             sys.exit(self.logger.error('You do not have permission to lookup other accounts'))
-        elif 'WAF deny rule IPBLOCK-BURST' in resp.json()['detail']:
-            self.logger.error(resp.json()['detail'])
-            self.logger.countdown(540, msg='Oopsie! You just hit rate limit.', logger=self.logger)
-            sys.exit()
         else:
             sys.exit(self.logger.error(resp.json()['detail']))
 
@@ -80,10 +75,6 @@ class IdentityAccessManagement(AkamaiSession):
                     account_name.append(account['accountName'])
         elif resp.json()['title'] == 'ERROR_NO_SWITCH_CONTEXT':
             sys.exit(self.logger.error('You do not have permission to lookup other accounts'))
-        elif 'WAF deny rule IPBLOCK-' in resp.json()['detail']:
-            self.logger.error(resp.json()['detail'])
-            lg.countdown(540, msg='Oopsie! You just hit rate limit.', logger=self.logger)
-            sys.exit()
         else:
             sys.exit(self.logger.error(resp.json()['detail']))
 
@@ -103,10 +94,6 @@ class IdentityAccessManagement(AkamaiSession):
             return resp.json()
         elif resp.json()['title'] == 'ERROR_NO_SWITCH_CONTEXT':
             sys.exit(self.logger.error('You do not have permission to lookup other accounts'))
-        elif 'WAF deny rule IPBLOCK-BURST' in resp.json()['detail']:
-            self.logger.error(resp.json()['detail'])
-            lg.countdown(540, msg='Oopsie! You just hit rate limit.', logger=self.logger)
-            sys.exit()
         else:
             sys.exit(self.logger.error(resp.json()['detail']))
 
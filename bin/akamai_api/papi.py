@@ -4,7 +4,6 @@ from __future__ import annotations
 
 import logging
 import sys
-import time
 import xml.etree.ElementTree as ET
 from collections import defaultdict
 from urllib.parse import urlparse
@@ -14,9 +13,12 @@ from boltons.iterutils import remap
 from jsonpath_ng import parse
 from requests.structures import CaseInsensitiveDict
 from rich import print_json
-from utils import _logging as lg
+from utils import cache
 from utils import files
 
+# version payloads carry activation status and notes, serve them from the disk cache only briefly
+VERSION_STATUS_TTL = 600
+
 
 class Papi(AkamaiSession):
     def __init__(self,
@@ -45,6 +47,37 @@ class Papi(AkamaiSession):
         self.cookies = self.cookies
         self.logger = logger
 
+    # CACHE
+    @property
+    def cache_account(self) -> str:
+        return self.account_switch_key if self.account_switch_key else self.section
+
+    @property
+    def rule_format(self) -> str:
+        accept = self.headers.get('Accept', '')
+        return accept.split('papirules.')[1].split('+')[0] if 'papirules.' in accept else 'saved'
+
+    @staticmethod
+    def version_locked(detail: dict) -> bool:
+        '''
+        A version becomes read-only once it has been activated on either network
+        '''
+        try:
+            version = detail['versions']['items'][0]
+        except (KeyError, IndexError, TypeError):
+            return False
+        return version.get('stagingStatus', 'INACTIVE') != 'INACTIVE' or version.get('productionStatus', 'INACTIVE') != 'INACTIVE'
+
+    def cache_version_detail(self, property_id: int, version: int, detail: dict) -> None:
+        if self.version_locked(detail):
+            cache.get_cache().set(self.cache_account, property_id, version, 'saved', 'versions', detail)
+
+    def cached_version_locked(self, property_id: int, version: int) -> bool:
+        '''
+        An activated version stays read-only, a cached payload of any age is enough to tell
+        '''
+        return self.version_locked(cache.get_cache().get(self.cache_account, property_id, version, 'saved', 'versions'))
+
     def create_new_property_version(self, property_id: str, base_version: int) -> int:
         payload = {'createFromVersion': base_version}
         url = f'{self.MODULE}/properties/{property_id}/versions'
@@ -118,13 +151,21 @@ class Papi(AkamaiSession):
         else:
             return response.json()
 
-    def get_account_hostnames(self):
+    def get_account_hostnames(self, limit: int = 999):
         url = self.form_url(f'{self.MODULE}/hostnames?sort=hostname%3Aa')
-        resp = self.session.get(url, headers=self.headers)
-        if resp.status_code == 200:
-            return resp.json()['hostnames']['items']
-        else:
-            return resp.json()
+        items = []
+        offset = 0
+        while True:
+            resp = self.session.get(url, headers=self.headers, params={'offset': offset, 'limit': limit})
+            if resp.status_code != 200:
+                # a truncated listing would look like removed hostnames, callers get the error instead
+                self.logger.error(f'account hostnames stopped at offset {offset} {resp.status_code}')
+                return resp.json()
+            page = resp.json()['hostnames']
+            items.extend(page['items'])
+            offset += len(page['items'])
+            if len(page['items']) == 0 or 'nextLink' not in page:
+                return items
 
     # BULK
     def build_query_params(self) -> dict:
@@ -155,10 +196,11 @@ class Papi(AkamaiSession):
         resp = self.session.get(url, params=self.build_query_params(), headers=self.headers)
         return resp
 
-    def bulk_search_properties(self, query: dict):
+    def bulk_search_properties(self, query: dict, params: dict | None = None):
         url = '/bulk/rules-search-requests'
         url = self.form_url(f'{self.MODULE}{url}')
-        resp = self.session.post(url, json=query, params=self.build_query_params(), headers=self.headers)
+        params = params if params is not None else self.build_query_params()
+        resp = self.session.post(url, json=query, params=params, headers=self.headers)
         return resp
 
     def bulk_update_behavior(self, properties: list[str, int, list[str]], patch_json: dict) -> list:
@@ -283,7 +325,6 @@ class Papi(AkamaiSession):
         payload['patchPropertyVersions'] = all_del_properties
         resp = self.session.post(url, json=payload, params=self.build_query_params(), headers=self.headers)
         self.logger.debug(f'{resp=}')
-        time.sleep(10)
         return resp
 
     def bulk_create_properties(self, properties: list[str, int]):
@@ -368,6 +409,21 @@ class Papi(AkamaiSession):
                    'Accept': 'application/json',
                    'Content-Type': 'application/json'}
         resp = self.session.post(url, json=payload, headers=headers)
+        return self.search_property_by_name_response(property_name, resp)
+
+    async def async_search_property_by_name(self, property_name: str) -> tuple:
+        '''
+        Sets the same property state as search_property_by_name, read it before the next await
+        '''
+        url = self.form_url(f'{self.MODULE}/search/find-by-value')
+        payload = {'propertyName': property_name}
+        headers = {'PAPI-Use-Prefixes': 'false',
+                   'Accept': 'application/json',
+                   'Content-Type': 'application/json'}
+        resp = await self.async_post(url, json=payload, headers=headers)
+        return self.search_property_by_name_response(property_name, resp)
+
+    def search_property_by_name_response(self, property_name: str, resp) -> tuple:
         if resp.ok:
             try:
                 property_items = resp.json()['versions']['items']
@@ -399,11 +455,7 @@ class Papi(AkamaiSession):
 
                 return resp.status_code, resp.json()
         elif resp.status_code == 401:
-            self.logger.error(resp['title'])
-            sys.exit()
-        elif 'WAF deny rule IPBLOCK-BURST' in resp.json()['detail']:
-            self.logger.error(resp['detail'])
-            lg.countdown(540, msg='Oopsie! You just hit rate limit.', logger=self.logger)
+            self.logger.error(resp.json()['title'])
             sys.exit()
         else:
             self.logger.debug(f'{property_name:<40} {resp.status_code}')
@@ -490,11 +542,16 @@ class Papi(AkamaiSession):
                         }
         }
         '''
+        data = cache.get_cache().get(self.cache_account, property_id, version, 'saved', 'versions', max_age=VERSION_STATUS_TTL)
+        if data is not None:
+            return data
+
         url = self.form_url(f'{self.MODULE}/properties/{property_id}/versions/{version}')
         response = self.session.get(url, headers=self.headers)
         self.logger.debug(f'Collecting properties version detail {urlparse(response.url).path:<30} {response.status_code}')
         if response.status_code == 200:
             # print_json(data=response.json())
+            self.cache_version_detail(property_id, version, response.json())
             return response.json()
         else:
             return response.json()
@@ -524,10 +581,27 @@ class Papi(AkamaiSession):
                         }
         }
         '''
+        data = cache.get_cache().get(self.cache_account, property_id, version, 'saved', 'versions', max_age=VERSION_STATUS_TTL)
+        if data is not None:
+            return data
+
         url = self.form_url(f'{self.MODULE}/properties/{property_id}/versions/{version}')
         response = self.session.get(url, headers=self.headers)
+        return self.property_version_detail_response(property_id, version, response)
+
+    async def async_get_property_version_detail(self, property_id: int, version: int) -> list:
+        data = cache.get_cache().get(self.cache_account, property_id, version, 'saved', 'versions', max_age=VERSION_STATUS_TTL)
+        if data is not None:
+            return data
+
+        url = self.form_url(f'{self.MODULE}/properties/{property_id}/versions/{version}')
+        response = await self.async_get(url, headers=self.headers)
+        return self.property_version_detail_response(property_id, version, response)
+
+    def property_version_detail_response(self, property_id: int, version: int, response) -> list:
         self.logger.debug(f'Collecting properties version detail {urlparse(response.url).path:<40} {response.status_code}')
         if response.ok:
+            self.cache_version_detail(property_id, version, response.json())
             propertyName = response.json()['propertyName']
             assetId = response.json()['assetId']
             gid = response.json()['groupId']
@@ -592,15 +666,16 @@ class Papi(AkamaiSession):
             # print_json(data=self.cookies)
             sys.exit()
 
-    def get_properties_ruletree_digest(self, property_id: int, version: int) -> list:
+    def get_properties_ruletree_digest(self, property_id: int, version: int) -> dict:
+        '''
+        ruleFormat and etag of a rule tree, the etag changes whenever the rules of the version are saved
+        '''
         url = self.form_url(f'{self.MODULE}/properties/{property_id}/versions/{version}/rules')
         response = self.session.get(url)
         self.logger.debug(f'Collecting ruletree digest {urlparse(response.url).path:<30} {response.status_code}')
-        if property_id == 303315:
-            self.logger.critical(f'{property_id=}')
-            files.write_json('output/response_complete_ruletree_digest.json', response.json())
         if response.status_code == 200:
-            return response.json()['ruleFormat']
+            data = response.json()
+            return {'ruleFormat': data['ruleFormat'], 'etag': data.get('etag', response.headers.get('ETag', '').strip('"'))}
         else:
             return response.json()
 
@@ -639,6 +714,14 @@ class Papi(AkamaiSession):
     def get_property_hostnames(self, property_id: int) -> list:
         url = self.form_url(f'{self.MODULE}/properties/{property_id}/hostnames')
         response = self.session.get(url, headers=self.headers)
+        return self.property_hostnames_response(property_id, response)
+
+    async def async_get_property_hostnames(self, property_id: int) -> list:
+        url = self.form_url(f'{self.MODULE}/properties/{property_id}/hostnames')
+        response = await self.async_get(url, headers=self.headers)
+        return self.property_hostnames_response(property_id, response)
+
+    def property_hostnames_response(self, property_id: int, response) -> list:
         # self.logger.debug(f'Collecting hostname for a property {urlparse(response.url).path:<30} {response.status_code} {response.url}')
         if response.ok:
             try:
@@ -721,34 +804,62 @@ class Papi(AkamaiSession):
             return resp.headers, ruletree_response.json()
 
     # RULETREE
-    def property_ruletree(self, property_id: int, version: int, remove_tags: list | None = None):
+    def property_ruletree(self, property_id: int, version: int, remove_tags: list | None = None, locked: bool | None = None):
+        '''
+        locked tells whether the version is read-only and its rules can be cached,
+        without it only a cached version payload is checked, no extra request is made
+        '''
+        data = cache.get_cache().get(self.cache_account, property_id, version, self.rule_format, 'rules')
+        if data is not None:
+            return self.property_ruletree_response(data, remove_tags)
+
         url = self.form_url(f'{self.MODULE}/properties/{property_id}/versions/{version}/rules')
         params = {
                   'validateRules': 'true',
                   'validateMode': 'full',
                  }
         resp = self.session.get(url, headers=self.headers, params=params)
+        return self.property_ruletree_fetched(property_id, version, resp, remove_tags, locked)
+
+    async def async_property_ruletree(self, property_id: int, version: int, remove_tags: list | None = None, locked: bool | None = None):
+        data = cache.get_cache().get(self.cache_account, property_id, version, self.rule_format, 'rules')
+        if data is not None:
+            return self.property_ruletree_response(data, remove_tags)
+
+        url = self.form_url(f'{self.MODULE}/properties/{property_id}/versions/{version}/rules')
+        params = {
+                  'validateRules': 'true',
+                  'validateMode': 'full',
+                 }
+        resp = await self.async_get(url, headers=self.headers, params=params)
+        return self.property_ruletree_fetched(property_id, version, resp, remove_tags, locked)
 
+    def property_ruletree_fetched(self, property_id: int, version: int, resp, remove_tags: list | None = None, locked: bool | None = None):
         if resp.ok:
-            # tags we are not interested to compare
-            self.property_name = resp.json()['propertyName']
-            ignore_keys = ['etag', 'errors', 'warnings', 'ruleFormat', 'comments',
-                           'accountId', 'contractId', 'groupId',
-                           'propertyId', 'propertyName', 'propertyVersion']
-            if remove_tags is not None:
-                addl_keys = [tag for tag in remove_tags]
-                if addl_keys is not None:
-                    ignore_keys = ignore_keys + addl_keys
-            self.logger.debug(f'{ignore_keys}')
-            mod_resp = remap(resp.json(), lambda p, k, v: k not in ignore_keys)
-            self.logger.debug(params)
-            self.logger.debug(resp.status_code)
-            self.logger.debug(mod_resp)
-            return 200, mod_resp
+            if locked is None:
+                locked = self.cached_version_locked(property_id, version)
+            if locked:
+                cache.get_cache().set(self.cache_account, property_id, version, self.rule_format, 'rules', resp.json())
+            return self.property_ruletree_response(resp.json(), remove_tags)
         else:
             self.logger.error(f'{resp.status_code} {self.contract_id=} {self.group_id=} {resp.url}')
             return resp.status_code, resp.json()
 
+    def property_ruletree_response(self, ruletree: dict, remove_tags: list | None = None):
+        # tags we are not interested to compare
+        self.property_name = ruletree['propertyName']
+        ignore_keys = ['etag', 'errors', 'warnings', 'ruleFormat', 'comments',
+                       'accountId', 'contractId', 'groupId',
+                       'propertyId', 'propertyName', 'propertyVersion']
+        if remove_tags is not None:
+            addl_keys = [tag for tag in remove_tags]
+            if addl_keys is not None:
+                ignore_keys = ignore_keys + addl_keys
+        self.logger.debug(f'{ignore_keys}')
+        mod_resp = remap(ruletree, lambda p, k, v: k not in ignore_keys)
+        self.logger.debug(mod_resp)
+        return 200, mod_resp
+
     def get_property_full_ruletree(self, property_id: int, version: int):
         url = self.form_url(f'{self.MODULE}/properties/{property_id}/versions/{version}/rules')
         params = {'contractId': self.contract_id,
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from datetime import datetime
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+
+logger = logging.getLogger(__name__)
+
+# requests per second and burst size for each API family, shared by every thread in the process
+# https://techdocs.akamai.com/property-mgr/reference/rate-limiting
+# https://techdocs.akamai.com/reporting/reference/rate-limiting
+RATE_LIMITS = {'papi': {'rate': 10, 'burst': 20},
+               'reporting-api': {'rate': 25 / 60, 'burst': 5},
+               'cps': {'rate': 5, 'burst': 10},
+               'appsec': {'rate': 10, 'burst': 20},
+               'network-list': {'rate': 10, 'burst': 20},
+               'identity-management': {'rate': 5, 'burst': 10},
+               'default': {'rate': 10, 'burst': 20},
+               }
+
+MAX_RETRIES = 6
+BACKOFF_BASE = 2
+BACKOFF_MAX = 120
+WAF_BLOCK_WAIT = 60  # minimum wait when the edge returns 'WAF deny rule IPBLOCK'
+RETRY_STATUS = [429, 500, 502, 503, 504]
+IDEMPOTENT_METHODS = ['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE']
+
+
+class TokenBucket:
+    def __init__(self, name: str, rate: float, burst: int):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.resume_at = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        '''
+        Take one token, or return how long to wait before trying again
+        '''
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if now >= self.resume_at and self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return max(self.resume_at - now, (1 - self.tokens) / self.rate)
+
+    def acquire(self) -> None:
+        while True:
+            wait = self.reserve()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def async_acquire(self) -> None:
+        while True:
+            wait = self.reserve()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        '''
+        Stop every caller of this API family until the server side window resets
+        '''
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+_buckets: dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def api_family(url: str) -> str:
+    path = url.split('://', 1)[-1].split('/', 2)
+    module = path[1] if len(path) > 1 else ''
+    return module if module in RATE_LIMITS else 'default'
+
+
+def get_bucket(family: str) -> TokenBucket:
+    with _buckets_lock:
+        if family not in _buckets:
+            limit = RATE_LIMITS.get(family, RATE_LIMITS['default'])
+            _buckets[family] = TokenBucket(family, limit['rate'], limit['burst'])
+        return _buckets[family]
+
+
+def configure_rate_limit(family: str, rate: float | None = None, burst: int | None = None) -> None:
+    limit = RATE_LIMITS.setdefault(family, dict(RATE_LIMITS['default']))
+    limit['rate'] = rate if rate else limit['rate']
+    limit['burst'] = burst if burst else limit['burst']
+    with _buckets_lock:
+        _buckets.pop(family, None)
+
+
+def is_waf_block(resp: requests.Response) -> bool:
+    return resp.status_code == 403 and 'WAF deny rule IPBLOCK' in resp.text
+
+
+def retry_after(resp: requests.Response) -> float | None:
+    '''
+    Seconds to wait based on Retry-After or the X-RateLimit-Next header PAPI returns with 429
+    '''
+    value = resp.headers.get('Retry-After')
+    if value:
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            try:
+                return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0)
+            except (TypeError, ValueError):
+                pass
+
+    value = resp.headers.get('X-RateLimit-Next')
+    if value:
+        try:
+            next_window = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            return max((next_window - datetime.now(timezone.utc)).total_seconds(), 0)
+        except ValueError:
+            pass
+    return None
+
+
+def backoff(attempt: int) -> float:
+    # full jitter so parallel workers do not retry in lockstep
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def retry_wait(bucket: TokenBucket, method: str, resp: requests.Response, attempt: int) -> float | None:
+    '''
+    Seconds to wait before replaying the call, None when the response is final
+    '''
+    waf_block = is_waf_block(resp)
+    if resp.status_code == 429 or waf_block:
+        retryable = True
+    elif resp.status_code in RETRY_STATUS:
+        # do not replay a POST that may have been applied
+        retryable = method.upper() in IDEMPOTENT_METHODS
+    else:
+        retryable = False
+    if not retryable or attempt >= MAX_RETRIES:
+        return None
+
+    wait = retry_after(resp)
+    wait = backoff(attempt) if wait is None else wait + random.uniform(0, 1)
+    if waf_block:
+        wait = max(wait, WAF_BLOCK_WAIT)
+    if resp.status_code == 429 or waf_block:
+        bucket.pause(wait)
+    logger.warning(f'{bucket.name} {resp.status_code}, retry {attempt + 1}/{MAX_RETRIES} in {wait:.1f}s')
+    return wait
+
+
+class RateLimitedSession(requests.Session):
+    '''
+    requests.Session that throttles through the API family token bucket,
+    and retries rate limited or failed calls instead of ending the run
+    '''
+    def request(self, method, url, *args, **kwargs):
+        bucket = get_bucket(api_family(url))
+        attempt = 0
+        while True:
+            bucket.acquire()
+            resp = super().request(method, url, *args, **kwargs)
+            self.adjust_bucket(bucket, resp)
+            wait = retry_wait(bucket, method, resp, attempt)
+            if wait is None:
+                return resp
+            attempt += 1
+            time.sleep(wait)
+
+    @staticmethod
+    def adjust_bucket(bucket: TokenBucket, resp: requests.Response) -> None:
+        remaining = resp.headers.get('X-RateLimit-Remaining')
+        if remaining is None:
+            return
+        try:
+            remaining = int(remaining)
+        except ValueError:
+            return
+        if remaining <= 0 and resp.status_code != 429:
+            wait = retry_after(resp)
+            if wait:
+                logger.debug(f'{bucket.name} quota exhausted, wait {wait:.1f}s')
+                bucket.pause(wait)
+
+
+if __name__ == '__main__':
+    pass
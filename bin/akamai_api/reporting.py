@@ -2,12 +2,10 @@ from __future__ import annotations
 
 import html
 import logging
-import sys
 
 from akamai_api.edge_auth import AkamaiSession
 from bs4 import BeautifulSoup
 from rich import print_json
-from utils import _logging as lg
 from utils import files
 
 
@@ -38,10 +36,6 @@ class Reporting(AkamaiSession):
 
         if resp.status_code == 200:
             return resp.json()
-        elif 'WAF deny rule IPBLOCK' in resp.json()['detail']:
-            self.logger.error(resp.json()['detail'])
-            lg.countdown(540, msg='Oopsie! You just hit rate limit.', logger=self.logger)
-            sys.exit()
         else:
             self.logger.error(print_json(data=resp.json()))
             return resp.json()
@@ -66,11 +60,6 @@ class Reporting(AkamaiSession):
         if resp.status_code == 200:
             files.write_json('output/reporting_trace.json', resp.json())
             return resp.json()['data']
-        elif 'WAF deny rule IPBLOCK' in resp.json()['detail']:
-            self.logger.error(resp.json()['detail'])
-            lg.countdown(540, msg='Oopsie! You just hit rate limit.', logger=self.logger)
-            sys.exit()
-
         else:
             self.logger.error(print_json(data=resp.json()))
             return resp.json()
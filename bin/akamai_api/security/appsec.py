@@ -37,6 +37,8 @@ class Appsec(AkamaiSession):
         url = self.form_url(f'{self.MODULE}/configs?includeHostnames=true&includeContractGroup=true')
         response = self.session.get(url, headers=self.headers)
         # print_json(data=response.json())
+        if response.status_code != 200:
+            return response.status_code, response.json()
         return response.status_code, response.json()['configurations']
 
     def get_config_detail(self, config_id: int):
@@ -2,12 +2,14 @@ from __future__ import annotations
 
 import logging
 import sys
+import threading
 
 import numpy as np
 import pandas as pd
 from akamai_api.security.appsec import Appsec
 from akamai_api.security.botmanager import BotManager
 from akamai_api.security.networklist import NetworkList
+from akamai_utils import snapshot
 from rich import print_json
 from utils import _logging as lg
 from utils import dataframe
@@ -36,6 +38,9 @@ class AppsecWrapper(Appsec):
         return super().get_config_version_metadata_xml(config_name, version)
 
     def list_waf_configs(self):
+        stored = snapshot.get_snapshot()
+        if stored:
+            return 200, stored.security_configs
         return super().list_waf_configs()
 
     def get_policy(self, config_id: int, version: int):
@@ -57,14 +62,35 @@ class NetworkListWrapper(NetworkList):
         super().__init__(account_switch_key=account_switch_key, section=section, edgerc=edgerc)
         self.account_switch_key = account_switch_key
         self.logger = logger
+        # the same lists are referenced by many security configs, fetch each one once per run
+        self.lists: dict[str, tuple[int, dict]] = {}
+        self.lists_lock = threading.Lock()
+        # optional NetworkListMirror, lists are then read locally unless their syncPoint moved
+        self.mirror = None
 
     def get_all_network_list(self):
         return super().get_all_network_list()
 
+    def download_network_list(self, id: str) -> tuple[int, dict]:
+        return super().get_network_list(id)
+
+    def fetch_network_list(self, id: str) -> tuple[int, dict]:
+        if self.mirror:
+            item = self.mirror.get(self, id)
+            return (200, item) if item else (404, {})
+        with self.lists_lock:
+            if id in self.lists:
+                return self.lists[id]
+        status, result = super().get_network_list(id)
+        if status == 200:
+            with self.lists_lock:
+                self.lists[id] = (status, result)
+        return status, result
+
     def get_network_list(self, ids):
         self.logger.debug(ids)
         if isinstance(ids, str):
-            status, result = super().get_network_list(ids)
+            status, result = self.fetch_network_list(ids)
             if status == 200:
                 try:
                     return sorted(result['list'])
@@ -74,7 +100,7 @@ class NetworkListWrapper(NetworkList):
         elif isinstance(ids, list):
             all_ips = []
             for id in ids:
-                status, result = super().get_network_list(id)
+                status, result = self.fetch_network_list(id)
                 if status == 200:
                     try:
                         all_ips.extend(result['list'])
@@ -154,227 +180,159 @@ class BotManagerWrapper(BotManager):
             except:
                 return 0
 
+    def network_list_ips(self, network, values: pd.Series, mask: pd.Series, first: bool = False) -> pd.Series:
+        '''
+        Newline separated IPs of the network lists referenced by rows where mask is True, '' elsewhere.
+        Each distinct reference is resolved once however many rows use it
+
+        sample:
+        df['IPs'] = self.network_list_ips(network, df['value'], df['type'] == 'networkListCondition', first=True)
+        '''
+        resolved = {}
+
+        def resolve(value):
+            ids = value[0] if first else value
+            key = tuple(ids) if isinstance(ids, list) else ids
+            if key not in resolved:
+                resolved[key] = dataframe.split_elements_newline(network.get_network_list(ids))
+            return resolved[key]
+
+        mask = mask.fillna(False).astype(bool)
+        ips = pd.Series('', index=values.index, dtype=object)
+        ips[mask] = [resolve(value) for value in values[mask]]
+        return ips
+
     def process_custom_bot(self, data, network):
         feature = 'customDefinedBots'
 
-        if isinstance(data, list):
-            try:
-                columns = data[0].keys()
-            except:
-                self.logger.critical(f'{feature:<40} no data')
-                return pd.DataFrame()
-
-            self.logger.debug(f'{feature:<40} {len(columns):<5} {columns}')
-            df = pd.json_normalize(data)
-            if 'description' in df.columns:
-                del df['description']
-            if 'notes' in df.columns:
-                del df['notes']
-            df['conditions_count'] = df['conditions'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-
-            # df = df[df['botName'] == 'Allow Botify'].copy()
-
-            # extract conditions column
-            all_keys = dataframe.extract_keys(df['conditions'].sum())
-            columns_to_explode = list(all_keys)
-            self.logger.debug(columns_to_explode)
-
-            for key in all_keys:
-                df[key] = df['conditions'].apply(lambda x: [d.get(key) for d in x])
-            self.logger.debug(f'\n{df[columns_to_explode]}')
-
-            exploded_data = exploded_data = dataframe.explode_cell(df, 'conditions', columns_to_explode)
-            exploded_df = pd.DataFrame(exploded_data)
-            col_1 = ['categoryId', 'botId', 'botName', 'conditions_no']
-            col_2 = ['type', 'name', 'positiveMatch', 'value', 'checkIps', 'valueCase', 'nameWildcard']
-            col_2 = [value for value in col_2 if value in columns_to_explode]
+        if not isinstance(data, list) or len(data) == 0:
+            self.logger.critical(f'{feature:<40} no data')
+            return pd.DataFrame()
 
-            try:
-                columns = col_1 + col_2 + ['IPs']
-                exploded_df['conditions_no'] = (exploded_df.groupby(['categoryId', 'botId', 'botName']).cumcount() + 1)
-
-                exploded_df['IPs'] = exploded_df.apply(lambda row: network.get_network_list(row['value'][0])
-                                                   if row['type'] == 'networkListCondition' else '', axis=1)
-                exploded_df['IPs'] = exploded_df.apply(lambda row: dataframe.split_elements_newline(row['IPs'])
-                                                        if row['type'] == 'networkListCondition' else '', axis=1)
-                exploded_df['name'] = exploded_df.apply(lambda row: dataframe.split_elements_newline_withcomma(row['name'])
-                                                       if isinstance(row['name'], list) else row['name'], axis=1)
-                exploded_df['value'] = exploded_df.apply(lambda row: dataframe.split_elements_newline_withcomma(row['value'])
-                                                        if row['value'] else '', axis=1)
-            except:
-                columns = col_1 + col_2
+        self.logger.debug(f'{feature:<40} {len(data[0].keys()):<5} {data[0].keys()}')
+        df = pd.json_normalize(data)
+        df = df.drop(columns=['description', 'notes'], errors='ignore')
+        df['conditions_count'] = dataframe.count_items(df['conditions'])
+
+        exploded_df, columns_to_explode = dataframe.explode_records(df, 'conditions')
+        self.logger.debug(columns_to_explode)
+        col_1 = ['categoryId', 'botId', 'botName', 'conditions_no']
+        col_2 = ['type', 'name', 'positiveMatch', 'value', 'checkIps', 'valueCase', 'nameWildcard']
+        col_2 = [value for value in col_2 if value in columns_to_explode]
+
+        try:
+            columns = col_1 + col_2 + ['IPs']
+            exploded_df['conditions_no'] = (exploded_df.groupby(['categoryId', 'botId', 'botName']).cumcount() + 1)
+            exploded_df['IPs'] = self.network_list_ips(network, exploded_df['value'], exploded_df['type'] == 'networkListCondition', first=True)
+            exploded_df['name'] = exploded_df['name'].map(lambda x: dataframe.split_elements_newline_withcomma(x) if isinstance(x, list) else x)
+            exploded_df['value'] = exploded_df['value'].map(lambda x: dataframe.split_elements_newline_withcomma(x) if x else '')
+        except:
+            columns = col_1 + col_2
 
         return exploded_df[columns]
 
     def process_custom_deny_list(self, data):
         feature = 'customDenyList'
 
-        if isinstance(data, list):
-            try:
-                columns = data[0].keys()
-            except:
-                self.logger.critical(f'{feature:<40} no data')
-                return pd.DataFrame()
-
-            self.logger.debug(f'{feature:<40} {len(columns):<5} {columns}')
-            df = pd.json_normalize(data)
-            df['rule_name'] = df['name']
-            del df['name']
-            if 'description' in df.columns:
-                df['rule_description'] = df['description']
-            df['parameters_count'] = df['parameters'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-            # extract parameters column
-            all_keys = dataframe.extract_keys(df['parameters'].sum())
-            parameters_columns = list(all_keys)
-
-            for key in all_keys:
-                df[key] = df['parameters'].apply(lambda x: [d.get(key) for d in x])
-
-            exploded_data = exploded_data = dataframe.explode_cell(df, 'parameters', parameters_columns)
-            exploded_df = pd.DataFrame(exploded_data)
-            original_columns = ['id', 'rule_name']
-            if 'description' in df.columns:
-                original_columns.append('rule_description')
-
-            exploded_df['parameters_no'] = (exploded_df.groupby(['id', 'rule_name']).cumcount() + 1)
-            return exploded_df[original_columns + ['parameters_no'] + ['name', 'displayName', 'value']]
+        if not isinstance(data, list) or len(data) == 0:
+            self.logger.critical(f'{feature:<40} no data')
+            return pd.DataFrame()
+
+        self.logger.debug(f'{feature:<40} {len(data[0].keys()):<5} {data[0].keys()}')
+        df = pd.json_normalize(data)
+        df = df.rename(columns={'name': 'rule_name'})
+        original_columns = ['id', 'rule_name']
+        if 'description' in df.columns:
+            df['rule_description'] = df['description']
+            original_columns.append('rule_description')
+        df['parameters_count'] = dataframe.count_items(df['parameters'])
+
+        exploded_df, _ = dataframe.explode_records(df, 'parameters')
+        exploded_df['parameters_no'] = (exploded_df.groupby(['id', 'rule_name']).cumcount() + 1)
+        return exploded_df[original_columns + ['parameters_no'] + ['name', 'displayName', 'value']]
 
     def process_custom_rules(self, data):
         feature = 'customRules'
 
-        if isinstance(data, list):
-            try:
-                columns = data[0].keys()
-            except:
-                self.logger.critical(f'{feature:<40} no data')
-                return pd.DataFrame()
-            self.logger.debug(f'{feature:<40} {len(columns):<5} {columns}')
-            df = pd.json_normalize(data)
-            original_keys = df.columns.tolist()
-            if 'conditions' not in original_keys:
-                return df
-            else:
-                original_keys.remove('conditions')
-                df['conditions_count'] = df['conditions'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-
-                # extract conditions column
-                all_keys = dataframe.extract_keys(df['conditions'].dropna().sum())
-                columns_to_explode = list(all_keys)
-
-                if all_keys is None:
-                    return pd.DataFrame()
-                else:
-                    self.logger.debug(columns_to_explode)
-                    for key in all_keys:
-                        df[key] = df['conditions'].apply(lambda x: [d.get(key) for d in x] if isinstance(x, list) else [])
-
-                    col_1 = original_keys
-                    col_2 = ['type', 'name', 'value', 'valueWildcard', 'valueCase', 'positiveMatch', 'nameWildcard']
-                    col_2 = [value for value in col_2 if value in columns_to_explode]
-                    columns = col_1 + ['conditions_no'] + col_2
-                    exploded_data = dataframe.explode_cell(df, 'conditions', columns_to_explode)
-                    exploded_df = pd.DataFrame(exploded_data)
-                    exploded_df['conditions_no'] = (exploded_df.groupby(['id']).cumcount() + 1)
+        if not isinstance(data, list) or len(data) == 0:
+            self.logger.critical(f'{feature:<40} no data')
+            return pd.DataFrame()
+
+        self.logger.debug(f'{feature:<40} {len(data[0].keys()):<5} {data[0].keys()}')
+        df = pd.json_normalize(data)
+        original_keys = df.columns.tolist()
+        if 'conditions' not in original_keys:
+            return df
+
+        original_keys.remove('conditions')
+        df['conditions_count'] = dataframe.count_items(df['conditions'])
+
+        exploded_df, columns_to_explode = dataframe.explode_records(df, 'conditions')
+        self.logger.debug(columns_to_explode)
+        col_2 = ['type', 'name', 'value', 'valueWildcard', 'valueCase', 'positiveMatch', 'nameWildcard']
+        col_2 = [value for value in col_2 if value in columns_to_explode]
+        columns = original_keys + ['conditions_no'] + col_2
+        exploded_df['conditions_no'] = (exploded_df.groupby(['id']).cumcount() + 1)
         return exploded_df[columns]
 
     def process_rate_policies(self, data, network):
         feature = 'ratePolicies'
 
-        if isinstance(data, list):
-            try:
-                columns = data[0].keys()
-            except:
-                self.logger.critical(f'{feature:<40} no data')
-                return []
-
-            self.logger.debug(f'{feature:<40} {len(columns):<5} {columns}')
-            df = pd.json_normalize(data)
-
-            if 'additionalMatchOptions' not in df.columns.tolist():
-                return df
-            else:
-                original_keys = df.columns.tolist()
-                self.logger.debug(original_keys)
-                original_keys.remove('additionalMatchOptions')
-                original_keys.remove('type')
-
-                df['policy_type'] = df['type']
-                df['additionalMatchOptions_count'] = df['additionalMatchOptions'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-                all_keys = dataframe.extract_keys(df['additionalMatchOptions'].dropna().sum())
-                columns_to_explode = list(all_keys)
-                self.logger.debug(columns_to_explode)
-
-                for key in all_keys:
-                    df[key] = df['additionalMatchOptions'].apply(lambda x: [d.get(key) for d in x] if isinstance(x, list) else [])
-
-                exploded_data = dataframe.explode_cell(df, 'additionalMatchOptions', columns_to_explode)
-                exploded_df = pd.DataFrame(exploded_data)
-                col_1 = original_keys + ['policy_type']
-                columns = col_1 + ['additionalMatchOptions_no'] + columns_to_explode + ['IPs']
-                exploded_df['IPs'] = exploded_df.apply(lambda row: network.get_network_list(row['values'])
-                                                    if row['type'] == 'NetworkListCondition' else '', axis=1)
-                exploded_df['IPs'] = exploded_df.apply(lambda row: dataframe.split_elements_newline(row['IPs'])
-                                                    if row['type'] == 'NetworkListCondition' else '', axis=1)
-
-                exploded_df['additionalMatchOptions_no'] = (exploded_df.groupby(['id']).cumcount() + 1)
-
-                return exploded_df[columns]
+        if not isinstance(data, list) or len(data) == 0:
+            self.logger.critical(f'{feature:<40} no data')
+            return []
+
+        self.logger.debug(f'{feature:<40} {len(data[0].keys()):<5} {data[0].keys()}')
+        df = pd.json_normalize(data)
+        if 'additionalMatchOptions' not in df.columns.tolist():
+            return df
+
+        original_keys = df.columns.tolist()
+        self.logger.debug(original_keys)
+        original_keys.remove('additionalMatchOptions')
+        original_keys.remove('type')
+
+        df['policy_type'] = df['type']
+        df['additionalMatchOptions_count'] = dataframe.count_items(df['additionalMatchOptions'])
+
+        exploded_df, columns_to_explode = dataframe.explode_records(df, 'additionalMatchOptions')
+        self.logger.debug(columns_to_explode)
+        columns = original_keys + ['policy_type'] + ['additionalMatchOptions_no'] + columns_to_explode + ['IPs']
+        exploded_df['IPs'] = self.network_list_ips(network, exploded_df['values'], exploded_df['type'] == 'NetworkListCondition')
+        exploded_df['additionalMatchOptions_no'] = (exploded_df.groupby(['id']).cumcount() + 1)
+        return exploded_df[columns]
 
     def process_matchTargets(self, data, network):
         feature = 'matchTargets'
 
-        if isinstance(data, list):
-            try:
-                columns = data[0].keys()
-            except:
-                self.logger.critical(f'{feature:<40} no data')
-                return pd.DataFrame()
-
-            self.logger.debug(f'{feature:<40} {len(columns):<5} {columns}')
-            df = pd.json_normalize(data)
-            df['policyId'] = df['securityPolicy.policyId']
-            del df['securityPolicy.policyId']
-
-            original_keys = df.columns.tolist()
-            self.logger.debug(original_keys)
-
-            if 'bypassNetworkLists' not in original_keys:
-                return df
-            else:
-                df['matchTarget_type'] = df['type']
-                df['matchTarget_id'] = df['id']
-                original_keys.remove('type')
-                original_keys.remove('id')
-                original_keys.remove('bypassNetworkLists')
-                df['bypassNetworkLists_count'] = df['bypassNetworkLists'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-
-                # extract conditions column
-                all_keys = dataframe.extract_keys(df['bypassNetworkLists'].dropna().sum())
-                columns_to_explode = list(all_keys)
-                self.logger.debug(all_keys)
-
-                for key in all_keys:
-                    df[key] = df['bypassNetworkLists'].apply(lambda x: [d.get(key) for d in x] if isinstance(x, list) else [])
-
-                self.logger.debug(f'\n{df[columns_to_explode]}')
-
-                exploded_data = dataframe.explode_cell(df, 'bypassNetworkLists', columns_to_explode)
-                exploded_df = pd.DataFrame(exploded_data)
-
-                exploded_df['IPs'] = exploded_df.apply(lambda row: network.get_network_list(row['id'])
-                                                            if row['listType'] == 'NL' else '', axis=1)
-                exploded_df['IPs'] = exploded_df.apply(lambda row: dataframe.split_elements_newline(row['IPs'])
-                                                            if row['listType'] == 'NL' else '', axis=1)
-                self.logger.debug(f'\n{exploded_df}')
-                exploded_df = exploded_df.rename(columns={'id': 'bypassNetworkListsId'})
-
-                original_keys.remove('policyId')
-                original_keys.remove('sequence')
-                col_1 = ['policyId', 'sequence'] + ['matchTarget_type', 'matchTarget_id']
-                col_2 = ['bypassNetworkListsId', 'listType', 'name', 'type'] + ['IPs']
-                columns = col_1 + ['NetworkListsId_no'] + col_2 + original_keys
-                exploded_df['NetworkListsId_no'] = (exploded_df.groupby(['policyId']).cumcount() + 1)
+        if not isinstance(data, list) or len(data) == 0:
+            self.logger.critical(f'{feature:<40} no data')
+            return pd.DataFrame()
 
+        self.logger.debug(f'{feature:<40} {len(data[0].keys()):<5} {data[0].keys()}')
+        df = pd.json_normalize(data)
+        df = df.rename(columns={'securityPolicy.policyId': 'policyId'})
+
+        original_keys = df.columns.tolist()
+        self.logger.debug(original_keys)
+        if 'bypassNetworkLists' not in original_keys:
+            return df
+
+        df['matchTarget_type'] = df['type']
+        df['matchTarget_id'] = df['id']
+        for key in ['type', 'id', 'bypassNetworkLists', 'policyId', 'sequence']:
+            original_keys.remove(key)
+        df['bypassNetworkLists_count'] = dataframe.count_items(df['bypassNetworkLists'])
+
+        exploded_df, columns_to_explode = dataframe.explode_records(df, 'bypassNetworkLists')
+        self.logger.debug(columns_to_explode)
+        exploded_df['IPs'] = self.network_list_ips(network, exploded_df['id'], exploded_df['listType'] == 'NL')
+        exploded_df = exploded_df.rename(columns={'id': 'bypassNetworkListsId'})
+
+        col_1 = ['policyId', 'sequence'] + ['matchTarget_type', 'matchTarget_id']
+        col_2 = ['bypassNetworkListsId', 'listType', 'name', 'type'] + ['IPs']
+        columns = col_1 + ['NetworkListsId_no'] + col_2 + original_keys
+        exploded_df['NetworkListsId_no'] = (exploded_df.groupby(['policyId']).cumcount() + 1)
         return exploded_df[columns]
 
     def process_reputation_profiles(self, data, network):
@@ -384,34 +342,22 @@ class BotManagerWrapper(BotManager):
         df = df.sort_values(by=['context', 'threshold'])
         if 'condition.atomicConditions' not in df.columns.tolist():
             return df
-        else:
-            df['atomicConditions'] = df['condition.atomicConditions']
-            df['context_id'] = df['id']
-            del df['condition.atomicConditions']
-            del df['id']
-            original_keys = df.columns.tolist()
-
-            df['atomicConditions_count'] = df['atomicConditions'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-            all_keys = dataframe.extract_keys(df['atomicConditions'].dropna().sum())
-            if all_keys:
-                for key in all_keys:
-                    df[key] = df['atomicConditions'].apply(lambda x: [d.get(key) for d in x] if isinstance(x, list) else [])
-                rules_columns = list(all_keys)
-                exploded_data = dataframe.explode_cell(df, 'atomicConditions', rules_columns)
-
-                condition_columns = ['className', 'index', 'positiveMatch', 'value', 'valueCase', 'valueWildcard', 'checkIps', 'IPs']
-                condition_columns = [value for value in condition_columns if value in all_keys]
-                condition_df = pd.DataFrame(exploded_data)
-
-                condition_df['condition.version'] = condition_df['condition.version'].astype(str)
-
-                condition_df['condition.version'] = condition_df['condition.version'].replace({'nan': ' '})
-
-                condition_df['IPs'] = condition_df.apply(lambda row: network.get_network_list(row['value'])
-                                                            if row['className'] == 'NetworkListCondition' else '', axis=1)
-                condition_df['IPs'] = condition_df.apply(lambda row: dataframe.split_elements_newline(row['IPs'])
-                                                            if row['className'] == 'NetworkListCondition' else '', axis=1)
 
+        df['atomicConditions'] = df.pop('condition.atomicConditions')
+        df['context_id'] = df.pop('id')
+        original_keys = df.columns.tolist()
+        df['atomicConditions_count'] = dataframe.count_items(df['atomicConditions'])
+
+        condition_df, columns_to_explode = dataframe.explode_records(df, 'atomicConditions')
+        self.logger.debug(f'{feature:<40} {columns_to_explode}')
+        if 'condition.version' in condition_df.columns:
+            condition_df['condition.version'] = condition_df['condition.version'].astype(str).replace({'nan': ' '})
+
+        condition_columns = ['className', 'index', 'positiveMatch', 'value', 'valueCase', 'valueWildcard', 'checkIps']
+        condition_columns = [value for value in condition_columns if value in columns_to_explode]
+        if 'className' in condition_columns:
+            condition_df['IPs'] = self.network_list_ips(network, condition_df['value'], condition_df['className'] == 'NetworkListCondition')
+            condition_columns.append('IPs')
         return condition_df[original_keys + condition_columns]
 
     def process_response_actions(self, data, network):
@@ -422,124 +368,57 @@ class BotManagerWrapper(BotManager):
         self.logger.debug(original_keys)
         if 'conditionalActions' not in original_keys:
             return df, pd.DataFrame(), pd.DataFrame()
-        else:
-            original_keys.remove('conditionalActions')
-
-            df['conditionalActions_count'] = df['conditionalActions'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-
-            # extract conditions column
-            all_keys = dataframe.extract_keys(df['conditionalActions'].dropna().sum())
-            columns_to_explode = list(all_keys)
-
-            if all_keys is None:
-                return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-            else:
-                for key in all_keys:
-                    df[key] = df['conditionalActions'].apply(lambda x: [d.get(key) for d in x] if isinstance(x, list) else [])
-
-                self.logger.debug(f'\n{df[columns_to_explode]}')
-
-                exploded_data = dataframe.explode_cell(df, 'conditionalActions', columns_to_explode)
-                exploded_df = pd.DataFrame(exploded_data)
-                conditionalActions_count = exploded_df['conditionalActions_count'].sum()
-
-                if conditionalActions_count == 0:
-                    return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-                else:
-                    col_1 = original_keys
-                    col_2 = ['conditionalActions_count', 'conditionalActions'] + ['actionId', 'actionName', 'defaultAction', 'conditionalActionRules', 'description']
-                    if 'description' not in all_keys:
-                        col_2.remove('description')
-                        self.logger.debug(col_2)
-                    columns = col_1 + col_2 + ['conditionalActionRules_count']
-
-                    exploded_df['conditionalActionRules_count'] = exploded_df['conditionalActionRules'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-                    all_keys = dataframe.extract_keys(exploded_df['conditionalActionRules'].dropna().sum())
-                    columns_to_explode = list(all_keys)
-                    self.logger.debug(columns_to_explode)
-                    for key in all_keys:
-                        exploded_df[key] = exploded_df['conditionalActionRules'].apply(lambda x: [d.get(key) for d in x] if isinstance(x, list) else [])
-
-                    exploded_data = dataframe.explode_cell(exploded_df, 'conditionalActionRules', columns_to_explode)
-                    new_df = pd.DataFrame(exploded_data)
-
-                    all_keys = dataframe.extract_keys(new_df['conditions'].dropna().sum())
-                    columns_to_explode = list(all_keys)
-
-                    for key in all_keys:
-                        new_df[key] = new_df['conditions'].apply(lambda x: [d.get(key) for d in x] if isinstance(x, list) else [])
-
-                    exploded_data = dataframe.explode_cell(new_df, 'conditions', columns_to_explode)
-                    conditions_df = pd.DataFrame(exploded_data)
-
-                    col_1 = ['challengeActions', 'customDenyActions', 'serveAlternateActions', 'challengeInjectionRules.injectJavaScript', 'challengeInterceptionRules.interceptAllRequests']
-                    col_2 = ['actionId', 'defaultAction', 'actionName', 'percentageOfTraffic', 'action']
-                    col_3 = ['checkIps', 'positiveMatch', 'type', 'value', 'host', 'valueCase', 'nameWildcard', 'valueWildcard']
-                    col_3 = [value for value in col_3 if value in columns_to_explode]
-                    cols = col_1 + col_2 + col_3 + ['IPs']
-                    conditions_df['IPs'] = conditions_df.apply(lambda row: network.get_network_list(row['value'])
-                                                            if row['type'] == 'networkListCondition' else '', axis=1)
-                    conditions_df['IPs'] = conditions_df.apply(lambda row: dataframe.split_elements_newline(row['IPs'])
-                                                            if row['type'] == 'networkListCondition' else '', axis=1)
-                    self.logger.debug(conditions_df[cols])
-                    return exploded_df[columns], new_df, conditions_df[cols]
+
+        original_keys.remove('conditionalActions')
+        df['conditionalActions_count'] = dataframe.count_items(df['conditionalActions'])
+        if df['conditionalActions_count'].sum() == 0:
+            return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+
+        # flatten each level once, actions -> rules -> conditions
+        action_df, action_keys = dataframe.explode_records(df, 'conditionalActions')
+        self.logger.debug(f'{feature:<40} {action_keys}')
+        col_2 = ['conditionalActions_count', 'conditionalActions'] + ['actionId', 'actionName', 'defaultAction', 'conditionalActionRules', 'description']
+        if 'description' not in action_keys:
+            col_2.remove('description')
+        columns = original_keys + col_2 + ['conditionalActionRules_count']
+        action_df['conditionalActionRules_count'] = dataframe.count_items(action_df['conditionalActionRules'])
+
+        rule_df, _ = dataframe.explode_records(action_df, 'conditionalActionRules')
+        conditions_df, condition_keys = dataframe.explode_records(rule_df, 'conditions')
+
+        col_1 = ['challengeActions', 'customDenyActions', 'serveAlternateActions', 'challengeInjectionRules.injectJavaScript', 'challengeInterceptionRules.interceptAllRequests']
+        col_2 = ['actionId', 'defaultAction', 'actionName', 'percentageOfTraffic', 'action']
+        col_3 = ['checkIps', 'positiveMatch', 'type', 'value', 'host', 'valueCase', 'nameWildcard', 'valueWildcard']
+        col_3 = [value for value in col_3 if value in condition_keys]
+        cols = col_1 + col_2 + col_3 + ['IPs']
+        conditions_df['IPs'] = self.network_list_ips(network, conditions_df['value'], conditions_df['type'] == 'networkListCondition')
+        self.logger.debug(conditions_df[cols])
+        return action_df[columns], rule_df, conditions_df[cols]
 
     def process_rulesets(self, data):
         feature = 'rulesets'
-        # extract rules column
+
+        # rules and attack groups are two views of the same normalized rulesets
         df = pd.json_normalize(data)
-        df['ruleset_id'] = df['id']
-        del df['id']
-        original_keys = df.columns.tolist()
-        if 'attackGroups' in df.columns.tolist():
-            original_keys.remove('attackGroups')
+        df = df.rename(columns={'id': 'ruleset_id'})
         if 'rules' not in df.columns.tolist():
             return None, None
-        else:
-            original_keys.remove('rules')
-        df['rules_count'] = df['rules'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-        all_keys = dataframe.extract_keys(df['rules'].dropna().sum())
-        if all_keys:
-            for key in all_keys:
-                df[key] = df['rules'].apply(lambda x: [d.get(key) for d in x] if isinstance(x, list) else [])
-            rules_columns = list(all_keys)
-            exploded_data = dataframe.explode_cell(df, 'rules', rules_columns)
-            rules_df = pd.DataFrame(exploded_data)
-            original_keys.remove('ruleset_id')
-            rules_columns = ['attackGroups', 'id', 'inspectRequestBody', 'inspectResponseBody', 'outdated', 'ruleVersion', 'score', 'tag', 'title']
-
-            rules_df = rules_df[['ruleset_id'] + original_keys + rules_columns]
-            rules_df = rules_df.sort_values(by='attackGroups')
-        # extract attackGroups column
-        df = pd.json_normalize(data)
-        df['ruleset_id'] = df['id']
-        original_keys = df.columns.tolist()
-
-        if 'id' in df.columns.tolist():
-            original_keys.remove('id')
-            del df['id']
-
-        '''
-        attack_group_df = pd.json_normalize(df['attackGroups'].explode().reset_index(drop=True))
-        attack_group_df['order'] = attack_group_df.index + 1
-        '''
-        if 'attackGroups' in df.columns.tolist():
-            original_keys.remove('attackGroups')
-            df['attackGroups_count'] = df['attackGroups'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-
-        all_keys = dataframe.extract_keys(df['attackGroups'].dropna().sum())
-        # col = ['attackGroups', 'attackGroups_count']
-        # self.logger.info(df[col])
-        if all_keys:
-            for key in all_keys:
-                df[key] = df['attackGroups'].apply(lambda x: [d.get(key) for d in x] if isinstance(x, list) else [])
-            group_columns = list(all_keys)
-
-        exploded_data = dataframe.explode_cell(df, 'attackGroups', group_columns)
-        attack_group_df = pd.DataFrame(exploded_data)
+        original_keys = [key for key in df.columns.tolist() if key not in ['ruleset_id', 'rules', 'attackGroups']]
+        group_keys = [key for key in df.columns.tolist() if key not in ['ruleset_id', 'attackGroups']]
+
+        rules_df = df.drop(columns=['attackGroups'], errors='ignore')
+        rules_df['rules_count'] = dataframe.count_items(rules_df['rules'])
+        rules_df, rules_keys = dataframe.explode_records(rules_df, 'rules')
+        self.logger.debug(f'{feature:<40} {rules_keys}')
+        rules_columns = ['attackGroups', 'id', 'inspectRequestBody', 'inspectResponseBody', 'outdated', 'ruleVersion', 'score', 'tag', 'title']
+        rules_df = rules_df[['ruleset_id'] + original_keys + rules_columns]
+        rules_df = rules_df.sort_values(by='attackGroups')
+
+        attack_group_df = df.copy()
+        attack_group_df['attackGroups_count'] = dataframe.count_items(attack_group_df['attackGroups'])
+        attack_group_df, _ = dataframe.explode_records(attack_group_df, 'attackGroups')
         group_columns = ['group', 'groupName', 'threshold']
-        original_keys.remove('ruleset_id')
-        attack_group_df = attack_group_df[['ruleset_id'] + original_keys + group_columns]
+        attack_group_df = attack_group_df[['ruleset_id'] + group_keys + group_columns]
 
         return rules_df, attack_group_df
 
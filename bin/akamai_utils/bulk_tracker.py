@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from akamai_api.edge_auth import parallel_map
+from utils import files
+
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = 'jobs.json'
+TIMEOUT = 3600
+
+# kind -> (PapiWrapper listing method, status field of its response)
+KINDS = {'search': ('list_bulk_search', 'searchTargetStatus'),
+         'create': ('list_bulk_create', 'bulkCreateVersionsStatus'),
+         'patch': ('list_bulk_patch', 'bulkPatchStatus'),
+         'activation': ('list_bulk_activation', 'bulkActivationStatus'),
+         'property_activation': (None, 'status'),
+         'property_version': (None, None)}
+
+FINAL_STATUS = ['COMPLETE', 'ACTIVE', 'INACTIVE', 'DEACTIVATED', 'READY',
+                'FAILED', 'ABORTED', 'ERROR', 'CANCELLED', 'SUBMISSION_ERROR', 'NOT_FOUND']
+
+
+class BulkJobTracker:
+    '''
+    Poll PAPI bulk jobs (search, create, patch, activation), single property activations
+    and new property versions together. Every due job is polled in one concurrent round,
+    each job backs off exponentially from `initial` to `maximum` seconds,
+    and a job is handed back as soon as it reaches a final status.
+
+    With an account folder, jobs are saved to output/<account>/bulk/jobs.json
+    so `bulk jobs` resumes tracking after the CLI exits.
+
+    sample:
+    tracker = BulkJobTracker(papi, account_folder, logger=logger).load()
+    tracker.add('patch', bulk_patch_id)
+    tracker.add('property_activation', activation_id, propertyId=property_id, label=property_name)
+    for job in tracker.as_completed():
+        print(job['kind'], job['id'], job['status'])
+    '''
+    def __init__(self, papi, account_folder: str | None = None, logger: logging.Logger = None,
+                 initial: float = 2, factor: float = 1.5, maximum: float = 60):
+        self.papi = papi
+        self.path = f'{account_folder}/bulk/{STATE_FILE}' if account_folder else None
+        self.logger = logger if logger else logging.getLogger(__name__)
+        self.initial = initial
+        self.factor = factor
+        self.maximum = maximum
+        self.jobs: dict[str, dict] = {}
+        # last listing response per job, bulk callers read results from it
+        self.responses: dict = {}
+
+    @staticmethod
+    def key(kind: str, job_id: int | str) -> str:
+        return f'{kind}:{job_id}'
+
+    def load(self) -> BulkJobTracker:
+        if self.path and Path(self.path).is_file():
+            self.jobs.update(files.load_json(self.path)['jobs'])
+        return self
+
+    def save(self) -> None:
+        if self.path:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            files.write_json(self.path, {'jobs': self.jobs})
+
+    def add(self, kind: str, job_id: int | str, label: str = '', **extra) -> str:
+        '''
+        Start tracking a job, extra fields are kept with the job ie. propertyId of a property activation
+        '''
+        if kind not in KINDS:
+            raise ValueError(f'unknown bulk job kind {kind}, expected one of {list(KINDS)}')
+        key = self.key(kind, job_id)
+        if key not in self.jobs:
+            self.jobs[key] = {'key': key, 'kind': kind, 'id': str(job_id), 'label': label,
+                              'status': 'SUBMITTED', 'done': False, 'polls': 0,
+                              'submitted': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'updated': None,
+                              **extra}
+            self.save()
+        return key
+
+    def pending(self) -> list[str]:
+        return [key for key, job in self.jobs.items() if not job['done']]
+
+    def clear(self) -> int:
+        '''
+        Forget finished jobs, return how many were removed
+        '''
+        finished = [key for key, job in self.jobs.items() if job['done']]
+        for key in finished:
+            del self.jobs[key]
+        self.save()
+        return len(finished)
+
+    def fetch_status(self, job: dict) -> str:
+        kind, job_id = job['kind'], job['id']
+        if kind == 'property_activation':
+            return self.papi.activation_detail(job['propertyId'], int(job_id)).get('status', 'PENDING')
+        if kind == 'property_version':
+            detail = self.papi.get_property_version_detail_json(job['propertyId'], int(job_id))
+            return 'READY' if 'versions' in detail else 'PENDING'
+
+        method, field = KINDS[kind]
+        resp = getattr(self.papi, method)(int(job_id))
+        self.responses[job['key']] = resp
+        if resp.ok:
+            return resp.json().get(field, 'UNKNOWN')
+        if resp.status_code == 404:
+            return 'NOT_FOUND'
+        if resp.status_code == 429 or resp.status_code >= 500:
+            return job['status']
+        return 'ERROR'
+
+    def poll(self, key: str) -> dict:
+        job = self.jobs[key]
+        try:
+            status = self.fetch_status(job)
+        except Exception as err:
+            # network hiccup, keep the job and try again at the next backoff step
+            self.logger.debug(f'{key:<40} {err}')
+            status = job['status']
+        if status != job['status']:
+            self.logger.info(f"{job['kind']:<20} {job['id']:<12} {job['label']:<40} {job['status']} -> {status}")
+        job['status'] = status
+        job['done'] = status in FINAL_STATUS
+        job['polls'] += 1
+        job['updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return job
+
+    def as_completed(self, keys: list[str] | None = None, timeout: float = TIMEOUT):
+        '''
+        Yield each job once it reaches a final status, in completion order
+        '''
+        pending = [key for key in (keys if keys is not None else self.jobs) if not self.jobs[key]['done']]
+        finished = [self.jobs[key] for key in (keys or []) if self.jobs[key]['done']]
+        yield from finished
+
+        schedule = {key: (0.0, self.initial) for key in pending}
+        deadline = time.monotonic() + timeout
+        while pending:
+            now = time.monotonic()
+            due = [key for key in pending if schedule[key][0] <= now]
+            parallel_map(self.poll, due)
+            completed = []
+            for key in due:
+                if self.jobs[key]['done']:
+                    completed.append(self.jobs[key])
+                    pending.remove(key)
+                else:
+                    _, delay = schedule[key]
+                    schedule[key] = (now + delay, min(delay * self.factor, self.maximum))
+            self.save()
+            yield from completed
+
+            if pending:
+                if time.monotonic() >= deadline:
+                    self.logger.warning(f'{len(pending)} jobs still running after {timeout:.0f} seconds, '
+                                        'run akamai util bulk jobs to resume')
+                    return
+                next_poll = min(schedule[key][0] for key in pending)
+                time.sleep(max(0, min(next_poll, deadline) - time.monotonic()))
+
+    def wait(self, keys: list[str] | None = None, timeout: float = TIMEOUT) -> dict[str, dict]:
+        '''
+        Block until every job is final or the timeout expires, return the finished jobs by key
+        '''
+        return {job['key']: job for job in self.as_completed(keys, timeout)}
+
+    def to_dataframe(self) -> pd.DataFrame:
+        columns = ['kind', 'id', 'label', 'status', 'done', 'polls', 'submitted', 'updated']
+        return pd.DataFrame(list(self.jobs.values()), columns=columns)
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+from akamai_api.edge_auth import parallel_map
+
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_CONFIG = {'folder': None,
+                     'resume': False}
+
+SCOPE_KEY = '__scope__'
+# arguments that change how a run goes, not what it collects
+RUN_OPTIONS = ['resume', 'log_level', 'show', 'output', 'output_format', 'constant_memory', 'concurrency',
+               'connect_timeout', 'read_timeout', 'no_keep_alive', 'no_cache', 'refresh', 'snapshot',
+               'dns_backend', 'dns_server', 'dns_concurrency', 'syntax_css', 'print_width']
+
+
+class Journal:
+    '''
+    Append-only JSONL journal of finished units of work (property, group, enrollment, bulk patch id),
+    one line {"key", "value", "time"} per unit, flushed as soon as the unit finishes.
+
+    --resume : load the journal of the previous run, finished units are not fetched again
+    otherwise the previous journal is discarded
+
+    The first line records the scope of the run (command arguments),
+    a journal written with another scope is never resumed.
+
+    sample:
+    journal = checkpoint.get_journal('delivery', scope=checkpoint.command_scope(args))
+    df['ruletree'] = journal.map(lambda row: papi.get_property_ruletree(row['propertyId'], row['version']),
+                                 df.to_dict('records'), key=lambda row: f"ruletree:{row['propertyId']}:{row['version']}")
+    '''
+    def __init__(self, path: str | None, scope: Any = None, resume: bool = False, logger: logging.Logger = None):
+        self.path = path
+        self.scope = json.loads(json.dumps(scope, default=str))
+        self.logger = logger if logger else logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        self.entries: dict[str, Any] = {}
+        if path is None:
+            return
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        if resume and Path(path).is_file():
+            self.load()
+            if self.entries.pop(SCOPE_KEY, None) != self.scope:
+                self.logger.warning(f'{path} was written with other arguments, starting over')
+                self.entries = {}
+            elif self.entries:
+                self.logger.warning(f'Resuming {len(self.entries):,} finished units from {path}')
+        if not self.entries:
+            Path(path).unlink(missing_ok=True)
+            self.write(SCOPE_KEY, self.scope)
+
+    def load(self) -> None:
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # last line of an interrupted run
+                    continue
+                self.entries[entry['key']] = entry['value']
+
+    def write(self, key: str, value: Any) -> None:
+        line = json.dumps({'key': key, 'value': value, 'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}, default=str)
+        with open(self.path, 'a') as f:
+            f.write(f'{line}\n')
+
+    def done(self, key: str) -> bool:
+        return key in self.entries
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.entries.get(key, default)
+
+    def record(self, key: str, value: Any) -> Any:
+        with self.lock:
+            self.entries[key] = value
+            if self.path:
+                self.write(key, value)
+        return value
+
+    def map(self, func, items, key, concurrency: int | None = None, progress: str | None = None, valid=None) -> list:
+        '''
+        parallel_map that skips items already journaled and journals every other result as soon as it returns,
+        results must be JSON serializable, results failing `valid` are returned but not journaled
+        '''
+        items = list(items)
+        keys = [key(item) for item in items]
+        finished = sum(1 for x in keys if x in self.entries)
+        if finished:
+            self.logger.info(f'{finished:,} of {len(items):,} {progress or "units"} read from the journal')
+
+        def run(pair):
+            unit, item = pair
+            if unit in self.entries:
+                return self.entries[unit]
+            value = func(item)
+            if valid is not None and not valid(value):
+                return value
+            return self.record(unit, value)
+
+        return parallel_map(run, list(zip(keys, items)), concurrency=concurrency, progress=progress)
+
+    @staticmethod
+    def to_records(df: pd.DataFrame) -> list[dict]:
+        '''
+        DataFrame rows as plain JSON values, numpy scalars and timestamps included
+        '''
+        return json.loads(df.to_json(orient='records', date_format='iso', default_handler=str))
+
+
+def command_scope(args) -> dict:
+    '''
+    Arguments that decide what a command collects, a journal is only resumed by the same scope
+    '''
+    return {k: v for k, v in sorted(vars(args).items()) if k not in RUN_OPTIONS}
+
+
+_journals: dict[str, Journal] = {}
+
+
+def configure_checkpoint(account_folder: str, resume: bool = False) -> None:
+    CHECKPOINT_CONFIG['folder'] = f'{account_folder}/checkpoint'
+    CHECKPOINT_CONFIG['resume'] = resume
+    _journals.clear()
+
+
+def get_journal(name: str, scope: Any = None, logger: logging.Logger = None) -> Journal:
+    '''
+    Journal of one command under output/<account>/checkpoint/<name>.jsonl,
+    in memory only when no account folder is configured
+    '''
+    if name not in _journals:
+        folder = CHECKPOINT_CONFIG['folder']
+        path = f'{folder}/{name}.jsonl' if folder else None
+        _journals[name] = Journal(path, scope=scope, resume=CHECKPOINT_CONFIG['resume'], logger=logger)
+    return _journals[name]
+
+
+if __name__ == '__main__':
+    pass
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 import logging
+import threading
 
 from akamai_api.cpcode import CpCode
+from utils import cache
+
+
+DIRECTORY_TTL = 86400  # cpcode names rarely change, reload the account directory once a day
 
 
 class CpCodeWrapper(CpCode):
@@ -14,8 +19,14 @@ class CpCodeWrapper(CpCode):
         super().__init__(account_switch_key=account_switch_key, section=section, edgerc=edgerc)
         self.account_switch_key = account_switch_key
         self.logger = logger
+        self.directory: dict[int, str] | None = None
+        self.directory_lock = threading.Lock()
         print()
 
+    @property
+    def cache_account(self) -> str:
+        return self.account_switch_key if self.account_switch_key else self.section
+
     def list_cpcode(self):
         resp = super().list_cpcode()
         if not resp.ok:
@@ -23,12 +34,48 @@ class CpCodeWrapper(CpCode):
         else:
             return resp.json()
 
+    def load_directory(self) -> dict[int, str]:
+        '''
+        cpcode id -> name for the whole account from one list call,
+        kept in memory for the run and on disk for DIRECTORY_TTL seconds
+        '''
+        with self.directory_lock:
+            if self.directory is not None:
+                return self.directory
+
+            directory = cache.get_cache().get(self.cache_account, 'cpcodes', 0, '', 'cpcodes', max_age=DIRECTORY_TTL)
+            if directory is None:
+                # without the filters list_cpcode command may have set on self._params
+                resp = super().list_cpcode(self.params)
+                if not resp.ok:
+                    if self.logger:
+                        self.logger.error(f'unable to list cpcodes {resp.status_code}')
+                    directory = {}
+                else:
+                    directory = {str(x['cpcodeId']): x['cpcodeName'] for x in resp.json().get('cpcodes', [])}
+                    cache.get_cache().set(self.cache_account, 'cpcodes', 0, '', 'cpcodes', directory)
+            self.directory = {int(k): v for k, v in directory.items()}
+            if self.logger:
+                self.logger.debug(f'cpcode directory {len(self.directory):,} cpcodes')
+            return self.directory
+
     def get_cpcode_name(self, cpcode: int) -> dict:
+        try:
+            cpcode = int(cpcode)
+        except (TypeError, ValueError):
+            return None
+        name = self.load_directory().get(cpcode)
+        if name is not None:
+            return name
+
+        # cpcode created after the directory was loaded, or not listed for this account
         resp = super().get_cpcode(cpcode)
         if not resp.ok:
             self.logger.error(resp.json())
         else:
-            return resp.json()['cpcodeName']
+            name = resp.json()['cpcodeName']
+            self.directory[cpcode] = name
+            return name
 
     def create_reporting_group(self, payload: dict) -> dict:
         return super().create_reporting_group(payload)
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import logging
+
+import pandas as pd
+
+
+class GroupIndex:
+    '''
+    groupId -> group for the whole account, each path "Top > Child > Grandchild" is built once
+    by walking parentGroupId links and reusing the path of the parent already built
+
+    sample:
+    index = GroupIndex(groups)
+    index.path(group_id)
+    df = index.to_dataframe()
+    '''
+    def __init__(self, groups: list[dict], logger: logging.Logger = None):
+        self.items = groups
+        self.groups = {group['groupId']: group for group in groups}
+        self.logger = logger if logger else logging.getLogger(__name__)
+        self.paths: dict[int, str] = {}
+        for group_id in self.groups:
+            self.path(group_id)
+
+    def path(self, group_id: int) -> str:
+        chain = []
+        current = group_id
+        # climb until the root or a group whose path is already known
+        while current in self.groups and current not in self.paths and current not in chain:
+            chain.append(current)
+            current = self.groups[current].get('parentGroupId')
+        if current in chain:
+            self.logger.error(f'group {current} is its own ancestor')
+        prefix = self.paths.get(current)
+        for member in reversed(chain):
+            name = self.groups[member]['groupName']
+            prefix = f'{prefix} > {name}' if prefix else name
+            self.paths[member] = prefix
+        return self.paths.get(group_id, '')
+
+    def to_dataframe(self) -> pd.DataFrame:
+        '''
+        One row per group with path, level and one L<n> column per level of the tree
+        '''
+        df = pd.DataFrame(self.items)
+        df['path'] = [self.paths.get(x, '') for x in df['groupId']]
+        df['level'] = df['path'].str.count('>')
+        parts = df['path'].str.split(' > ')
+        for level in range(df['level'].max() + 1):
+            df[f'L{level}'] = parts.str[level].fillna('')
+        return df
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import logging
+
+import pandas as pd
+
+
+class HostnameIndex:
+    '''
+    In memory hostname -> property lookup for the whole account,
+    built from one paged PAPI account hostnames listing instead of a find-by-value search per hostname
+
+    sample:
+    index = HostnameIndex(papi, logger=logger).build()
+    df['property_name'] = df['hostname'].map(index.property_name)
+    '''
+    def __init__(self, papi, logger: logging.Logger = None):
+        self.papi = papi
+        self.logger = logger if logger else logging.getLogger(__name__)
+        self.index: dict[str, list[dict]] = {}
+
+    def build(self) -> HostnameIndex:
+        items = self.papi.get_account_hostnames()
+        if not isinstance(items, list):
+            self.logger.error(f'unable to list account hostnames {items}')
+            return self
+
+        for item in items:
+            hostname = item.get('cnameFrom')
+            if not hostname:
+                continue
+            networks = []
+            if item.get('productionEdgeHostnameId') or item.get('productionCnameTo'):
+                networks.append('production')
+            if item.get('stagingEdgeHostnameId') or item.get('stagingCnameTo'):
+                networks.append('staging')
+            self.add(hostname, {'propertyId': item.get('propertyId'),
+                                'propertyName': item.get('propertyName'),
+                                'contractId': item.get('contractId'),
+                                'groupId': item.get('groupId'),
+                                'latestVersion': item.get('latestVersion'),
+                                'stagingVersion': item.get('stagingVersion'),
+                                'productionVersion': item.get('productionVersion'),
+                                'version': item.get('productionVersion') if 'production' in networks else item.get('stagingVersion'),
+                                'network': networks,
+                                'cnameTo': item.get('productionCnameTo', item.get('stagingCnameTo'))})
+        self.logger.info(f'hostname index {len(self.index):,} hostnames')
+        return self
+
+    def add(self, hostname: str, record: dict) -> None:
+        record = dict(record, hostname=hostname.lower())
+        records = self.index.setdefault(hostname.lower(), [])
+        if all(x['propertyId'] != record['propertyId'] for x in records):
+            records.append(record)
+
+    def lookup(self, hostname: str) -> list[dict]:
+        '''
+        Exact match first, then the wildcard hostname covering it
+        '''
+        if not isinstance(hostname, str):
+            return []
+        hostname = hostname.lower().rstrip('.')
+        records = self.index.get(hostname)
+        if records is None and '.' in hostname:
+            records = self.index.get(f"*.{hostname.split('.', 1)[1]}")
+        return records if records else []
+
+    def get(self, hostname: str) -> dict | None:
+        # prefer the property serving the hostname on production
+        records = self.lookup(hostname)
+        for record in records:
+            if 'production' in record['network']:
+                return record
+        return records[0] if records else None
+
+    def property_name(self, hostname: str) -> str:
+        record = self.get(hostname)
+        return record['propertyName'] if record else 'NOT_FOUND'
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame([record for records in self.index.values() for record in records])
+
+
+if __name__ == '__main__':
+    pass
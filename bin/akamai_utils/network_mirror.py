@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import ipaddress
+import logging
+import threading
+from bisect import bisect_right
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from akamai_api.edge_auth import parallel_map
+from utils import files
+
+
+logger = logging.getLogger(__name__)
+
+MIRROR_FILE = 'network_lists.json'
+LIST_FIELDS = ['name', 'type', 'syncPoint', 'elementCount']
+
+
+class NetworkListMirror:
+    '''
+    Local copy of the account network lists keyed by uniqueId, saved under output/<account>/security/network_lists.json
+
+    One listing call returns the current syncPoint of every list, a list is downloaded again
+    only when its syncPoint moved. IP lists are also kept as sorted, merged integer ranges per IP version
+    and indexed into boundaries and owners so "which lists contain this IP/CIDR" is one bisect.
+
+    sample:
+    mirror = NetworkListMirror(account_folder, logger=logger).load()
+    mirror.list_versions(network)
+    changes = mirror.sync(network, concurrency=10)
+    mirror.lookup('192.0.2.10')
+    mirror.save()
+    '''
+    def __init__(self, account_folder: str, logger: logging.Logger = None):
+        self.path = f'{account_folder}/{MIRROR_FILE}'
+        self.logger = logger if logger else logging.getLogger(__name__)
+        self.data = {'refreshed': None, 'lists': {}}
+        # uniqueId -> listing entry with the current syncPoint, empty until list_versions
+        self.versions: dict[str, dict] = {}
+        # uniqueId downloaded during this run, current whatever the listing said
+        self.fresh: set[str] = set()
+        self.lock = threading.Lock()
+        self.index: dict[int, tuple[list[int], list[frozenset]]] | None = None
+
+    @property
+    def refreshed(self) -> str | None:
+        return self.data['refreshed']
+
+    @property
+    def lists(self) -> dict[str, dict]:
+        return self.data['lists']
+
+    def load(self) -> NetworkListMirror:
+        if Path(self.path).is_file():
+            self.data.update(files.load_json(self.path))
+        return self
+
+    def save(self) -> None:
+        self.data['refreshed'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        files.write_json(self.path, self.data)
+
+    @staticmethod
+    def to_ranges(elements: list[str]) -> dict[str, list[list[int]]]:
+        '''
+        IP/CIDR elements as sorted, non overlapping [first, last] integer ranges per IP version
+        '''
+        networks = {4: [], 6: []}
+        for element in elements:
+            try:
+                network = ipaddress.ip_network(element.strip(), strict=False)
+            except ValueError:
+                continue
+            networks[network.version].append(network)
+
+        ranges = {}
+        for version, items in networks.items():
+            merged = []
+            for network in ipaddress.collapse_addresses(items):
+                first, last = int(network.network_address), int(network.broadcast_address)
+                # collapse_addresses keeps adjacent blocks that do not form a bigger CIDR apart
+                if merged and merged[-1][1] + 1 >= first:
+                    merged[-1][1] = max(merged[-1][1], last)
+                else:
+                    merged.append([first, last])
+            ranges[str(version)] = merged
+        return ranges
+
+    def list_versions(self, network) -> dict[str, dict]:
+        '''
+        One listing call, elements are not included
+        '''
+        status, resp = network.get_all_network_list()
+        if status != 200:
+            self.logger.error(f'network lists {status} {resp}')
+            return self.versions
+        self.versions = {item['uniqueId']: item for item in resp.get('networkLists', [])}
+        return self.versions
+
+    def stale(self, id: str) -> bool:
+        '''
+        Without a listing there is no syncPoint to trust the disk copy with
+        '''
+        if id in self.fresh:
+            return False
+        if id not in self.lists or not self.versions:
+            return True
+        return id in self.versions and self.versions[id].get('syncPoint') != self.lists[id].get('syncPoint')
+
+    def download(self, network, id: str) -> dict | None:
+        status, resp = network.download_network_list(id)
+        if status != 200:
+            self.logger.error(f'{id:<40} {status}')
+            return None
+        item = {field: resp.get(field) for field in LIST_FIELDS}
+        item['list'] = sorted(resp.get('list', []))
+        item['ranges'] = self.to_ranges(item['list']) if item['type'] == 'IP' else {}
+        with self.lock:
+            self.lists[id] = item
+            self.fresh.add(id)
+            self.index = None
+        return item
+
+    def get(self, network, id: str) -> dict | None:
+        '''
+        Mirrored list, downloaded first when it is missing or its syncPoint moved
+        '''
+        with self.lock:
+            item = None if self.stale(id) else self.lists[id]
+        return item if item else self.download(network, id)
+
+    def sync(self, network, concurrency: int | None = None) -> pd.DataFrame:
+        '''
+        Mirror every list of the account, return one row per new, updated or removed list
+        '''
+        if not self.list_versions(network):
+            return pd.DataFrame(columns=['uniqueId', 'name', 'change'])
+
+        changes = []
+        for id in [id for id in self.lists if id not in self.versions]:
+            changes.append({'uniqueId': id, 'name': self.lists[id]['name'], 'change': 'removed'})
+            del self.lists[id]
+            self.index = None
+
+        stale = [id for id in self.versions if self.stale(id)]
+        changes.extend({'uniqueId': id, 'name': self.versions[id].get('name'),
+                        'change': 'updated' if id in self.lists else 'new'} for id in stale)
+        self.logger.warning(f'{len(self.versions)} network lists, {len(stale)} to download')
+        parallel_map(lambda id: self.download(network, id), stale, concurrency=concurrency, progress='network list')
+        return pd.DataFrame(changes, columns=['uniqueId', 'name', 'change'])
+
+    def build_index(self) -> dict[int, tuple[list[int], list[frozenset]]]:
+        '''
+        Per IP version, sorted boundaries and the lists covering [boundaries[i], boundaries[i + 1])
+        '''
+        index = {}
+        for version in (4, 6):
+            events = {}
+            for id, item in self.lists.items():
+                for first, last in item.get('ranges', {}).get(str(version), []):
+                    events.setdefault(first, []).append((id, 1))
+                    events.setdefault(last + 1, []).append((id, -1))
+
+            boundaries, owners = [], []
+            active: dict[str, int] = {}
+            for point in sorted(events):
+                for id, step in events[point]:
+                    active[id] = active.get(id, 0) + step
+                    if active[id] == 0:
+                        del active[id]
+                boundaries.append(point)
+                owners.append(frozenset(active))
+            index[version] = (boundaries, owners)
+        return index
+
+    def lookup(self, value: str) -> list[str]:
+        '''
+        uniqueId of every list that fully contains the IP or CIDR, O(log n) bisect on the range boundaries
+        '''
+        network = ipaddress.ip_network(value.strip(), strict=False)
+        with self.lock:
+            if self.index is None:
+                self.index = self.build_index()
+            boundaries, owners = self.index[network.version]
+
+        first, last = int(network.network_address), int(network.broadcast_address)
+        start = bisect_right(boundaries, first) - 1
+        end = bisect_right(boundaries, last) - 1
+        if start < 0:
+            return []
+        found = set(owners[start])
+        for position in range(start + 1, end + 1):
+            found &= owners[position]
+        return sorted(found)
+
+    def lookup_many(self, values: list[str]) -> pd.DataFrame:
+        '''
+        One row per value and containing list, values not in any list keep one row with empty list columns
+        '''
+        rows = []
+        for value in values:
+            try:
+                found = self.lookup(value)
+            except ValueError:
+                self.logger.error(f'{value:<40} is not an IP address or CIDR')
+                continue
+            if not found:
+                rows.append({'query': value})
+            for id in found:
+                rows.append({'query': value, 'uniqueId': id, 'name': self.lists[id]['name'],
+                             'syncPoint': self.lists[id].get('syncPoint'), 'elementCount': self.lists[id]['elementCount']})
+        df = pd.DataFrame(rows, columns=['query', 'uniqueId', 'name', 'syncPoint', 'elementCount'])
+        return df.astype({'syncPoint': 'Int64', 'elementCount': 'Int64'})
+
+    def summary(self) -> pd.DataFrame:
+        df = pd.DataFrame([{'uniqueId': id, **{field: item.get(field) for field in LIST_FIELDS},
+                            'ranges': sum(len(x) for x in item.get('ranges', {}).values())}
+                           for id, item in self.lists.items()],
+                          columns=['uniqueId'] + LIST_FIELDS + ['ranges'])
+        return df.sort_values(by=['type', 'name']).reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    pass
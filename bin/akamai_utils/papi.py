@@ -1,12 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import concurrent.futures
 import copy
 import json
 import logging
 import re
 import sys
-import time
+import threading
 from pathlib import Path
 from time import perf_counter
 from typing import Any
@@ -15,12 +16,16 @@ from typing import Optional
 from typing import SupportsIndex
 
 import emojis
-import numpy as np
 import pandas as pd
+from akamai_api.edge_auth import parallel_map
+from akamai_api.edge_auth import POOL_CONFIG
 from akamai_api.papi import Papi
+from akamai_utils import snapshot
+from akamai_utils.bulk_tracker import BulkJobTracker
 from akamai_utils.cpcode import CpCodeWrapper
+from akamai_utils.group_index import GroupIndex
+from akamai_utils.ruletree import RuleTreeVisitor
 from jsonpath_ng.ext import parse
-from pandarallel import pandarallel
 from pandas import DataFrame
 from rich import print_json
 from rich.console import Console
@@ -39,6 +44,73 @@ class PapiWrapper(Papi):
         self.account_switch_key = account_switch_key
         self.logger = logger
 
+        # one version payload per (propertyId, version) for the whole run
+        self.version_memo: dict[tuple[int, int], concurrent.futures.Future] = {}
+        self.latest_memo: dict[int, concurrent.futures.Future] = {}
+        self.memo_lock = threading.Lock()
+        # bulk commands replace it with a tracker saved under the account folder
+        self.tracker: BulkJobTracker | None = None
+
+    def memoize(self, memo: dict, key, fetch):
+        '''
+        Return memo[key], only the first caller fetches, concurrent callers wait for the same result
+        '''
+        with self.memo_lock:
+            future = memo.get(key)
+            owner = future is None
+            if owner:
+                future = concurrent.futures.Future()
+                memo[key] = future
+        if owner:
+            try:
+                future.set_result(fetch())
+            except Exception as e:
+                with self.memo_lock:
+                    memo.pop(key, None)
+                future.set_exception(e)
+        return future.result()
+
+    async def async_memoize(self, memo: dict, key, fetch):
+        '''
+        Awaitable memoize sharing the same memo, fetch returns a coroutine and only the first caller awaits it
+        '''
+        with self.memo_lock:
+            future = memo.get(key)
+            owner = future is None
+            if owner:
+                future = concurrent.futures.Future()
+                memo[key] = future
+        if not owner:
+            return await asyncio.wrap_future(future)
+        try:
+            future.set_result(await fetch())
+        except Exception as e:
+            with self.memo_lock:
+                memo.pop(key, None)
+            future.set_exception(e)
+        return future.result()
+
+    def forget_property_version(self, property_id: int, version: int | None = None) -> None:
+        with self.memo_lock:
+            self.latest_memo.pop(int(property_id), None)
+            if version is not None:
+                self.version_memo.pop((int(property_id), int(version)), None)
+
+    def property_version_payload(self, property_id: int, version: int) -> dict:
+        detail = self.memoize(self.version_memo, (int(property_id), int(version)),
+                              lambda: super(PapiWrapper, self).get_property_version_detail(property_id, int(version)))
+        if 'versions' not in detail:
+            # keep error responses out of the memo so the next caller retries
+            self.forget_property_version(property_id, version)
+        return detail
+
+    async def async_property_version_payload(self, property_id: int, version: int) -> dict:
+        detail = await self.async_memoize(self.version_memo, (int(property_id), int(version)),
+                                          lambda: super(PapiWrapper, self).async_get_property_version_detail(property_id, int(version)))
+        if 'versions' not in detail:
+            self.forget_property_version(property_id, version)
+        return detail
+
     def get_account_id(self) -> str:
         return super().get_account_id()
 
@@ -55,6 +127,9 @@ class PapiWrapper(Papi):
         return super().get_edgehostnames(contract_id, group_id)
 
     def get_account_hostnames(self) -> list[str]:
+        stored = snapshot.get_snapshot()
+        if stored:
+            return stored.hostnames
         return super().get_account_hostnames()
 
     def list_bulk_search(self, id: int):
@@ -69,6 +144,17 @@ class PapiWrapper(Papi):
     def list_bulk_create(self, id: int):
         return super().list_bulk_create(id)
 
+    def wait_bulk_job(self, kind: str, bulk_id: int):
+        '''
+        Poll one bulk job with backoff until it is final, return its last listing response
+        '''
+        if self.tracker is None:
+            self.tracker = BulkJobTracker(self, logger=self.logger)
+        key = self.tracker.add(kind, bulk_id)
+        self.tracker.wait([key])
+        resp = self.tracker.responses.get(key)
+        return resp if resp is not None else getattr(self, f'list_bulk_{kind}')(bulk_id)
+
     def bulk_search(self, query: dict):
         resp = super().bulk_search_properties(query)
         if not resp.ok:
@@ -81,20 +167,40 @@ class PapiWrapper(Papi):
                 self.logger.error('bulk_id not found in the URL')
             else:
                 bulk_id = match.group(1)
-                count = 0
-                status = 'initial'
-                while (status != 'COMPLETE'):
-                    count += 1
-                    _resp = super().list_bulk_search(bulk_id)
-                    # print_json(data=_resp.json())
-                    status = _resp.json()['searchTargetStatus']
-                    if count > 5:
-                        continue
+                _resp = self.wait_bulk_job('search', bulk_id)
 
             self.logger.critical(f'bulkSearchId: {bulk_id}')
 
             return _resp
 
+    def bulk_search_many(self, query: dict, group_ids: list) -> dict:
+        '''
+        Submit the same bulk search for every group at once and poll them together,
+        returns groupId -> final search response, None when the submission failed
+        '''
+        if self.tracker is None:
+            self.tracker = BulkJobTracker(self, logger=self.logger)
+        submitted = parallel_map(lambda x: super(PapiWrapper, self).bulk_search_properties(query, params={'groupId': x}), group_ids)
+        keys = {}
+        for group_id, resp in zip(group_ids, submitted):
+            if not resp.ok:
+                self.logger.error(f'{group_id:<30} {resp.status_code} {resp.text}')
+                continue
+            bulk_id = int(resp.json()['bulkSearchLink'].split('?')[0].split('/')[-1])
+            self.logger.critical(f'{group_id:<30} bulkSearchId: {bulk_id}')
+            keys[group_id] = (bulk_id, self.tracker.add('search', bulk_id, label=f'group {group_id}'))
+
+        self.tracker.wait([key for _, key in keys.values()])
+        results = {}
+        for group_id in group_ids:
+            if group_id in keys:
+                bulk_id, key = keys[group_id]
+                resp = self.tracker.responses.get(key)
+                results[group_id] = resp if resp is not None else self.list_bulk_search(bulk_id)
+            else:
+                results[group_id] = None
+        return results
+
     def bulk_create_properties(self, property: list[str, int]):
         resp = super().bulk_create_properties(property)
         if resp.ok:
@@ -104,22 +210,14 @@ class PapiWrapper(Papi):
             if match:
                 bulk_id = match.group(1)
                 self.logger.critical(f'bulkCreateId: {bulk_id}')
-                count = 0
-                status = 'initial'
-                while (status != 'COMPLETE'):
-                    count += 1
-                    _resp = super().list_bulk_create(bulk_id)
-                    status = _resp.json()['bulkCreateVersionsStatus']
-                    if count > 20:
-                        break
-                resp = _resp
+                resp = self.wait_bulk_job('create', bulk_id)
             else:
                 self.logger.error('bulk_id not found in the URL')
         else:
             self.logger.error(print_json(data=resp.json()))
         return resp
 
-    def bulk_update_behavior(self, property: list, patch_json: dict):
+    def bulk_update_behavior(self, property: list, patch_json: dict, on_submit=None):
         resp = super().bulk_update_behavior(property, patch_json)
         self.logger.debug(resp.status_code)
         if not resp.ok:
@@ -128,22 +226,16 @@ class PapiWrapper(Papi):
             return_url = resp.json()['bulkPatchLink']
             bulk_id = int(return_url.split('?')[0].split('/')[-1])
             if bulk_id:
-                count = 0
-                status = 'initial'
-                while (status != 'COMPLETE'):
-                    count += 1
-                    _resp = super().list_bulk_patch(bulk_id)
-                    status = _resp.json()['bulkPatchStatus']
-                    if count > 5:
-                        break
-                resp = _resp
+                if on_submit:
+                    on_submit(bulk_id)
+                resp = self.wait_bulk_job('patch', bulk_id)
             else:
                 self.logger.error('bulk_id not found in the URL')
 
         self.logger.critical(f'bulkPatchId: {bulk_id}')
         return resp
 
-    def bulk_delete_add_behavior(self, property: list):
+    def bulk_delete_add_behavior(self, property: list, on_submit=None):
         resp = super().bulk_delete_add_behavior(property)
         self.logger.debug(resp.status_code)
         if not resp.ok:
@@ -152,15 +244,9 @@ class PapiWrapper(Papi):
             return_url = resp.json()['bulkPatchLink']
             bulk_id = int(return_url.split('?')[0].split('/')[-1])
             if bulk_id:
-                count = 0
-                status = 'initial'
-                while (status != 'COMPLETE'):
-                    count += 1
-                    _resp = super().list_bulk_patch(bulk_id)
-                    status = _resp.json()['bulkPatchStatus']
-                    if count > 5:
-                        break
-                resp = _resp
+                if on_submit:
+                    on_submit(bulk_id)
+                resp = self.wait_bulk_job('patch', bulk_id)
             else:
                 self.logger.error('bulk_id not found in the URL')
 
@@ -176,15 +262,7 @@ class PapiWrapper(Papi):
             return_url = resp.json()['bulkActivationLink']
             activation_id = int(return_url.split('?')[0].split('/')[-1])
             if activation_id:
-                status = 'initial'
-                count = 0
-                while (status != 'COMPLETE') and count <= 5:
-                    count += 1
-                    _resp = super().list_bulk_activation(activation_id)
-                    status = _resp.json()['bulkActivationStatus']
-                    if count > 5:
-                        continue
-                resp = _resp
+                resp = self.wait_bulk_job('activation', activation_id)
             else:
                 self.logger.error('bulk_id not found in the URL')
         self.logger.critical(f'bulkActivationId: {activation_id}')
@@ -198,16 +276,8 @@ class PapiWrapper(Papi):
             return_url = resp.json()['bulkPatchLink']
             bulk_id = int(return_url.split('?')[0].split('/')[-1])
             if bulk_id:
-                count = 0
-                status = 'initial'
                 self.logger.critical(f'bulkPatchId: {bulk_id}')
-                while (status != 'COMPLETE'):
-                    count += 1
-                    _resp = super().list_bulk_patch(bulk_id)
-                    status = _resp.json()['bulkPatchStatus']
-                    if count > 5:
-                        continue
-                resp = _resp
+                resp = self.wait_bulk_job('patch', bulk_id)
             else:
                 self.logger.error('bulk_id not found in the URL')
 
@@ -218,77 +288,17 @@ class PapiWrapper(Papi):
         return f'https://control.akamai.com/apps/property-manager/#/groups/{group_id}/properties'
 
     def create_groups_dataframe(self, groups: list[str]) -> DataFrame:
-        df = pd.DataFrame(groups)
-        df['path'] = df.apply(lambda row: self.build_path(row, groups), axis=1)
-        df['level'] = df['path'].str.count('>')
-        max_levels = df['level'].max() + 1
-        for level in range(max_levels):
-            df[f'L{level}'] = df['path'].apply(lambda x: self.get_level_value(x, level))
-        return df
+        return GroupIndex(groups, logger=self.logger).to_dataframe()
 
-    def build_path(self, row: pd.Series[str], groups: list[str]) -> str:
-        path = row['groupName']
-        parent_group_id = row['parentGroupId'] if 'parentGroupId' in row else 0
-        while parent_group_id and parent_group_id in [group['groupId'] for group in groups]:
-            parent_group = next(group for group in groups if group['groupId'] == parent_group_id)
-            path = f"{parent_group['groupName']} > {path}"
-            parent_group_id = parent_group.get('parentGroupId')
-        return path
-
-    def update_path(self, df: pd.DataFrame, row: pd.Series, column_name: str) -> str:
+    def group_property_counts(self, group_ids: list[int], contract_ids: list[list[str]]) -> dict[tuple[int, str], int]:
         '''
-        Function to update the path based on contractId
+        Number of properties per (groupId, contractId), one concurrent property listing per pair
         '''
-        if row.name > 0 and row[column_name] == df.at[row.name - 1, column_name]:
-            return df.at[row.name - 1, column_name] + '_' + row['contractId']
-        elif row.name < len(df) - 1 and row[column_name] == df.at[row.name + 1, column_name]:
-            return row[column_name] + '_' + row['contractId']
-        return row[column_name]
-
-    def get_level_value(self, path: str, level: int) -> str:
-        path_parts = path.split(' > ')
-        if len(path_parts) > level:
-            return path_parts[level]
-        return ''
-
-    def get_properties_count(self, row: pd.Series) -> int:
-        group_id = int(row['groupId'])
-        if 'contractIds' in list(row.index.values):
-            contract_ids = row['contractIds']
-        elif 'contractId' in list(row.index.values):
-            try:
-                contract_ids = row['contractId']
-            except:
-                contract_ids = None
-        count = 0
-        if contract_ids == 0 or contract_ids == '' or contract_ids is None:
-            count = 0
-        elif isinstance(contract_ids, list):
-            for contract_id in contract_ids:
-                count += self.get_properties_count_in_group(group_id, contract_id)
-        elif isinstance(contract_ids, str):
-            if contract_ids == ' ':
-                count = 0
-            else:
-                count = self.get_properties_count_in_group(group_id, contract_ids)
-        return count
-
-    def get_valid_contract(self, row: pd.Series) -> list[str]:
-
-        group_id = int(row['groupId'])
-        contract_ids = row['contractIds']
-        contracts = []
-        for contract_id in contract_ids:
-            properties = self.get_properties_count_in_group(group_id, contract_id)
-            if properties > 0:
-                contracts.append(contract_id)
-
-        if len(contracts) == 1:
-            return contracts[0]
-        elif len(contracts) > 1:
-            return contracts
-        else:
-            return []
+        pairs = list(dict.fromkeys((int(group_id), contract_id) for group_id, contracts in zip(group_ids, contract_ids)
+                                   if isinstance(contracts, list) for contract_id in contracts))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=POOL_CONFIG['pool_size']) as executor:
+            listings = executor.map(lambda x: self.list_group_properties(*x), pairs)
+            return {pair: len(items) if isinstance(items, list) else 0 for pair, items in zip(pairs, listings)}
 
     def get_top_groups(self) -> tuple[list[int], DataFrame]:
         status, groups = super().get_groups()
@@ -307,6 +317,9 @@ class PapiWrapper(Papi):
         return groups, df
 
     def get_all_groups(self) -> tuple[int, str]:
+        stored = snapshot.get_snapshot()
+        if stored:
+            return 200, stored.groups
         return super().get_groups()
 
     def get_groups(self) -> tuple[list[int], DataFrame]:
@@ -325,6 +338,15 @@ class PapiWrapper(Papi):
             df = pd.DataFrame()
         return groups, df
 
+    def group_names(self) -> dict[int, str]:
+        '''
+        groupId -> groupName from one group listing
+        '''
+        status, groups = self.get_all_groups()
+        if status != 200:
+            return {}
+        return {x['groupId']: x['groupName'] for x in groups}
+
     def get_group_name(self, group_id: int) -> str:
         status, groups = super().get_groups()
         if status == 200:
@@ -356,7 +378,7 @@ class PapiWrapper(Papi):
     def get_parent_group_id(self, group_id: int) -> int:
         '''
         sample
-        df['parentGroupId'] = df[['groupId']].parallel_apply(lambda x: papi.get_parent_group_id(*x), axis=1)
+        df['parentGroupId'] = parallel_map(papi.get_parent_group_id, df['groupId'])
         '''
         status, groups = super().get_groups()
         parent_group_id = 0
@@ -395,9 +417,18 @@ class PapiWrapper(Papi):
         properties = self.get_propertyname_per_group(group_id, contract_id)
         return len(properties)
 
+    def list_group_properties(self, group_id: int, contract_id: str) -> list[dict]:
+        '''
+        PAPI property listing of one group, read from the account snapshot with --snapshot
+        '''
+        stored = snapshot.get_snapshot()
+        if stored:
+            return stored.group_properties(group_id, contract_id)
+        return super().get_propertyname_per_group(group_id, contract_id)
+
     def get_propertyname_per_group(self, group_id: int, contract_id: str) -> list[str]:
         self.logger.debug(f'{group_id=} {contract_id=}')
-        properties_json = super().get_propertyname_per_group(group_id, contract_id)
+        properties_json = self.list_group_properties(group_id, contract_id)
         property_df = pd.DataFrame(properties_json)
         properties = []
         if not property_df.empty:
@@ -406,7 +437,7 @@ class PapiWrapper(Papi):
 
     def get_properties_detail_per_group(self, group_id: int, contract_id: str) -> DataFrame:
         self.logger.debug(f'{group_id=} {contract_id=}')
-        properties_json = super().get_propertyname_per_group(group_id, contract_id)
+        properties_json = self.list_group_properties(group_id, contract_id)
         property_df = pd.DataFrame(properties_json)
         if not property_df.empty:
             property_df = property_df.sort_values(by='propertyName')
@@ -463,12 +494,15 @@ class PapiWrapper(Papi):
     def search_property_by_name(self, property_name: str) -> tuple[int, str]:
         return super().search_property_by_name(property_name)
 
+    async def async_search_property_by_name(self, property_name: str) -> tuple[int, str]:
+        return await super().async_search_property_by_name(property_name)
+
     def search_property_by_hostname(self, hostname: str) -> str:
         return super().search_property_by_hostname(hostname)
 
     # PROPERTIES
     def get_property_version_latest(self, property_id: int) -> dict:
-        return super().get_property_version_latest(property_id)
+        return self.memoize(self.latest_memo, int(property_id), lambda: super(PapiWrapper, self).get_property_version_latest(property_id))
 
     def property_url(self, asset_id: int, group_id: int) -> str:
         return f'https://control.akamai.com/apps/property-manager/#/property/{asset_id}?gid={group_id}'
@@ -491,12 +525,27 @@ class PapiWrapper(Papi):
     def get_property_hostnames(self, property_id: int) -> list[str]:
         '''
         sample:
-        df['hostname'] = df[['propertyId']].parallel_apply(lambda x: papi.get_property_hostnames(*x), axis=1)
+        df['hostname'] = parallel_map(papi.get_property_hostnames, df['propertyId'])
         df['hostname_count'] = df['hostname'].str.len()
         '''
+        hostnames = self.fetch_property_hostnames(property_id)
+        return hostnames if hostnames is not None else []
+
+    def fetch_property_hostnames(self, property_id: int) -> list[str] | None:
+        '''
+        Same as get_property_hostnames but None when the lookup failed, so callers can retry it
+        '''
+        return self.unique_cname_from(property_id, super().get_property_hostnames(property_id))
+
+    async def async_get_property_hostnames(self, property_id: int) -> list[str]:
+        hostnames = self.unique_cname_from(property_id, await super().async_get_property_hostnames(property_id))
+        return hostnames if hostnames is not None else []
+
+    def unique_cname_from(self, property_id: int, data: list | None) -> list[str] | None:
+        if data is None:
+            return None
         hostnames = []
-        data = super().get_property_hostnames(property_id)
-        if data and len(data) > 0:
+        if len(data) > 0:
             df = pd.DataFrame(data)
             if 'cnameFrom' not in df.columns:
                 self.logger.info(f'{property_id=} without cName')
@@ -511,22 +560,52 @@ class PapiWrapper(Papi):
 
     def get_property_version_full_detail(self, property_id: int, version: int, dict_key: str | None = None):
         self.logger.debug(f'{property_id} {version}')
-        data = super().get_property_version_full_detail(property_id, version)
+        data = self.property_version_payload(property_id, version)
         return data[dict_key]
 
+    def property_version_details(self, property_ids: list, versions: list, concurrency: int | None = None) -> DataFrame:
+        '''
+        contractId, groupId, assetId, productId and ruleFormat per row,
+        one version payload per distinct (propertyId, version)
+
+        sample:
+        details = papi.property_version_details(df['propertyId'], df['propertyVersion'])
+        '''
+        pairs = [(int(x), int(y)) for x, y in zip(property_ids, versions)]
+        unique = list(dict.fromkeys(pairs))
+        payloads = dict(zip(unique, parallel_map(lambda x: self.property_version_payload(*x), unique,
+                                                 concurrency=concurrency, progress='property version detail')))
+        rows = []
+        for pair in pairs:
+            detail = payloads[pair]
+            version = (detail.get('versions', {}).get('items') or [{}])[0]
+            rows.append({'contractId': detail.get('contractId'),
+                         'groupId': detail.get('groupId'),
+                         'assetId': detail.get('assetId'),
+                         'productId': version.get('productId'),
+                         'ruleFormat': version.get('ruleFormat')})
+        return pd.DataFrame(rows, columns=['contractId', 'groupId', 'assetId', 'productId', 'ruleFormat'])
+
     def get_property_version_detail_json(self, property_id: int, version: int):
-        return super().get_property_version_full_detail(property_id, version)
+        return self.property_version_payload(property_id, version)
 
     def get_property_version_detail(self, property_id: int, version: int, dict_key: str) -> int:
         '''
-        df['ruleFormat'] = df.parallel_apply(
+        df['ruleFormat'] = parallel_map(
             lambda row: papi.get_property_version_detail(
             row['propertyId'],
             int(row['productionVersion'])
             if pd.notnull(row['productionVersion']) else row['latestVersion'],
-            'ruleFormat'), axis=1)
+            'ruleFormat'), df.to_dict('records'))
         '''
-        detail = super().get_property_version_detail(property_id, int(version))
+        detail = self.property_version_payload(property_id, version)
+        return self.version_detail_value(property_id, version, dict_key, detail)
+
+    async def async_get_property_version_detail(self, property_id: int, version: int, dict_key: str):
+        detail = await self.async_property_version_payload(property_id, version)
+        return self.version_detail_value(property_id, version, dict_key, detail)
+
+    def version_detail_value(self, property_id: int, version: int, dict_key: str, detail: dict):
         if dict_key == 'updatedDate':
             try:
                 propertyName = detail['propertyName']
@@ -642,128 +721,132 @@ class PapiWrapper(Papi):
         df = df.drop(['level'], axis=1)
         df = df.fillna('')
         df = df.reset_index(drop=True)
+        levels = [col for col in df.columns if col.startswith('L')]  # get hierachy
 
-        pandarallel.initialize(progress_bar=False, verbose=0)
+        # one row per group and contract with properties, groups without any property are left out
+        counts = self.group_property_counts(df['groupId'], df['contractIds'])
         df['account'] = self.account_switch_key
-        df['propertyCount'] = df.parallel_apply(lambda row: self.get_properties_count(row), axis=1)
-        df['contractId'] = df.parallel_apply(lambda row: self.get_valid_contract(row), axis=1)
+        df['contractId'] = [[contract_id for contract_id in contracts if counts.get((group_id, contract_id), 0) > 0]
+                            if isinstance(contracts, list) else []
+                            for group_id, contracts in zip(df['groupId'], df['contractIds'])]
+        df = df.explode('contractId').dropna(subset=['contractId']).reset_index(drop=True)
+        df['propertyCount'] = [counts[(group_id, contract_id)] for group_id, contract_id in zip(df['groupId'], df['contractId'])]
 
-        columns = df.columns.tolist()
-        levels = [col for col in columns if col.startswith('L')]  # get hierachy
+        # the same path under several contracts is told apart by a contractId suffix
+        duplicated = (df['path'] == df['path'].shift(1)) | (df['path'] == df['path'].shift(-1))
+        df['group_structure'] = df['path'].where(~duplicated, df['path'] + '_' + df['contractId'])
 
         if 'parentGroupId' in df.columns.values.tolist():
-            columns = ['path'] + levels + ['account', 'groupName', 'groupId', 'parentGroupId', 'contractId', 'propertyCount', 'name']
-        else:
-            columns = ['path'] + levels + ['account', 'groupName', 'groupId', 'contractId', 'propertyCount', 'name']
-        stag_df = df[columns].copy()
-
-        # Split rows some groups/folders have multiple contracts
-        stag_df = stag_df.apply(lambda row: dataframe.split_rows(row, column_name='contractId'), axis=1)
-        stag_df = pd.concat(list(stag_df), ignore_index=True)
-
-        df = stag_df[columns].copy()
-        df = df.reset_index(drop=True)
-        df['propertyCount'] = df.parallel_apply(lambda row: self.get_properties_count(row), axis=1)
-
-        allgroups_df = df.copy()
-
-        allgroups_df = allgroups_df.reset_index(drop=True)
-
-        if 'parentGroupId' in allgroups_df.columns.values.tolist():
-            columns = ['index_1', 'updated_path', 'groupName', 'groupId', 'parentGroupId', 'contractId', 'propertyCount'] + levels
-        else:
-            columns = ['index_1', 'updated_path', 'groupName', 'groupId', 'contractId', 'propertyCount'] + levels
-
-        allgroups_df['updated_path'] = allgroups_df.parallel_apply(lambda row: self.update_path(allgroups_df, row, column_name='path'), axis=1)
-        allgroups_df['index_1'] = allgroups_df.index
-        allgroups_df = allgroups_df[columns].copy()
-        first_non_empty = allgroups_df.replace('', np.nan).ffill(axis=1).iloc[:, -1]
-        allgroups_df['excel_sheet'] = ''
-        allgroups_df['excel_sheet'] = np.where(first_non_empty == '', allgroups_df['L0'], first_non_empty)
-
-        pattern = r'[A-Z0-9]-[A-Z0-9]+'
-        allgroups_df['excel_sheet'] = allgroups_df['excel_sheet'].parallel_apply(lambda x: re.sub(pattern, '', x))
-        allgroups_df['excel_sheet'] = allgroups_df['excel_sheet'].parallel_apply(lambda x: files.prepare_excel_sheetname(x))
-        allgroups_df = allgroups_df.sort_values(by='excel_sheet')
-        allgroups_df = allgroups_df.reset_index(drop=True)
-        columns = columns + ['excel_sheet']
-
-        allgroups_df = allgroups_df[columns].copy()
-        allgroups_df['sheet'] = ''
-        allgroups_df = files.update_sheet_column(allgroups_df)
-
-        if 'parentGroupId' in allgroups_df.columns.values.tolist():
-            columns = ['index_1', 'updated_path'] + ['groupName', 'groupId', 'parentGroupId', 'contractId', 'propertyCount', 'sheet']
-        else:
-            columns = ['index_1', 'updated_path'] + ['groupName', 'groupId', 'contractId', 'propertyCount', 'sheet']
-
-        allgroups_df = allgroups_df[columns].copy()
-        allgroups_df = allgroups_df.sort_values(by='index_1')
-        allgroups_df = allgroups_df.reset_index(drop=True)
-
-        if 'parentGroupId' in allgroups_df.columns.values.tolist():
             columns = ['group_structure', 'groupName', 'groupId', 'parentGroupId', 'contractId', 'propertyCount']
-            allgroups_df['parentGroupId'] = allgroups_df['parentGroupId'].astype(str)
+            df['parentGroupId'] = df['parentGroupId'].astype(str)
         else:
             columns = ['group_structure', 'groupName', 'groupId', 'contractId', 'propertyCount']
-        allgroups_df = allgroups_df.rename(columns={'updated_path': 'group_structure'})
-        allgroups_df = allgroups_df[columns].copy()
+        self.logger.debug(f'{len(df)} groups with properties, {len(levels)} levels')
+        allgroups_df = df[columns].copy()
         return allgroups_df, columns
 
-    def property_summary(self, df: pd.DataFrame, concurrency: int | None = 1) -> list:
-        account_properties = []
-
-        def process_row(row: pd.Series):
-            msg = f"{row.name:<5} {row['groupId']:<13} {row['group_structure']}"
+    def property_summary(self, df: pd.DataFrame, concurrency: int | None = 1, journal=None) -> list:
+        '''
+        Collect property details for every group in df through one work queue.
+        Group listings and per property lookups (hostname, productId/ruleFormat, updatedDate)
+        share the same worker threads, results are written into each group DataFrame as they finish.
+        With a checkpoint journal, each group is journaled once all its lookups succeeded and skipped on --resume,
+        a group with a failed lookup is collected again.
+        '''
+        concurrency = int(concurrency) if concurrency else 1
+        groups = []
+        for index, row in df.iterrows():
+            msg = f"{index:<5} {row['groupId']:<13} {row['group_structure']}"
             if row['propertyCount'] == 0:
                 self.logger.info(f'{msg} no property to collect')
             else:
                 total = f"{row['propertyCount']:<5} properties"
                 self.logger.warning(f'{total:<20} {msg}')
-                properties = self.get_properties_detail_per_group(row['groupId'], row['contractId'])
-
-                if not properties.empty:
-                    properties['propertyId'] = properties['propertyId'].astype('Int64')
-                    properties['groupName'] = row['group_structure']
-
-                    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
-                        # 'append _vXXX to propertyName
-                        properties['property_with_version'] = list(executor.map(self.build_propertyname_with_version, properties.itertuples()))
-
-                        # 'collecting hostname'
-                        properties['hostname'] = list(executor.map(self.get_property_hostnames, properties['propertyId']))
-                        properties['hostname_count'] = properties['hostname'].str.len()
-                        time.sleep(3)
-
-                        # 'collecting productId'
-                        properties['productId'] = list(executor.map(self.get_property_version_detail, properties['propertyId'],
-                                                                    properties['productionVersion'].fillna(properties['latestVersion']),
-                                                                    ['productId'] * len(properties)))
-
-                        # 'collecting ruleFormat'
-                        properties['ruleFormat'] = list(executor.map(self.get_property_version_detail, properties['propertyId'],
-                                                                    properties['productionVersion'].fillna(properties['latestVersion']),
-                                                                    ['ruleFormat'] * len(properties)))
-                        time.sleep(3)
-
-                        # 'collecting property url'
-                        properties['propertyURL'] = list(executor.map(self.property_url, properties['assetId'], properties['groupId']))
-                        properties['url'] = list(executor.map(files.make_xlsx_hyperlink_to_external_link,
-                                                              properties['propertyURL'], properties['propertyName']))
+                groups.append(row)
 
-                        # 'collecting updatedDate'
-                        properties['updatedDate'] = list(executor.map(self.get_property_version_detail, properties['propertyId'],
-                                                                    properties['latestVersion'],
-                                                                    ['updatedDate'] * len(properties)))
+        account_properties = {}
+        lookups = {}
+        remaining = {}
+        failed = set()
 
-                        # 'determining environment type'
-                        properties['env'] = list(executor.map(self.guestimate_env_type, properties['propertyName']))
+        def unit(row) -> str:
+            return f"group:{row['groupId']}:{row['contractId']}"
 
-                        time.sleep(3)
-
-                    account_properties.append(properties)
-        df.apply(process_row, axis=1)
-        return account_properties
+        def finish(i: int, row) -> None:
+            if journal is None:
+                return
+            if i in failed:
+                self.logger.warning(f"{row['groupId']:<13} {row['group_structure']} has failed lookups, not journaled")
+            else:
+                journal.record(unit(row), journal.to_records(account_properties[i]))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            listings = {}
+            for i, row in enumerate(groups):
+                if journal is not None and journal.done(unit(row)):
+                    properties = pd.DataFrame(journal.get(unit(row)))
+                    if not properties.empty:
+                        properties['propertyId'] = properties['propertyId'].astype('Int64')
+                        account_properties[i] = properties
+                else:
+                    listings[executor.submit(self.get_properties_detail_per_group, row['groupId'], row['contractId'])] = (i, row)
+
+            # queue property lookups as soon as a group listing arrives
+            for future in concurrent.futures.as_completed(listings):
+                i, row = listings[future]
+                properties = future.result()
+                if properties.empty:
+                    if journal is not None:
+                        journal.record(unit(row), [])
+                    continue
+
+                properties['propertyId'] = properties['propertyId'].astype('Int64')
+                properties['groupName'] = row['group_structure']
+                properties['property_with_version'] = [self.build_propertyname_with_version(x) for x in properties.itertuples()]
+                properties['propertyURL'] = [self.property_url(asset_id, group_id)
+                                             for asset_id, group_id in zip(properties['assetId'], properties['groupId'])]
+                properties['url'] = [files.make_xlsx_hyperlink_to_external_link(url, name)
+                                     for url, name in zip(properties['propertyURL'], properties['propertyName'])]
+                properties['env'] = [self.guestimate_env_type(name) for name in properties['propertyName']]
+                for column in ['hostname', 'productId', 'ruleFormat', 'updatedDate']:
+                    properties[column] = pd.Series([None] * len(properties), index=properties.index, dtype=object)
+                account_properties[i] = properties
+
+                active_version = properties['productionVersion'].fillna(properties['latestVersion'])
+                remaining[i] = (3 * len(properties), row)
+                for label, property_id in properties['propertyId'].items():
+                    version = active_version[label]
+                    latest = properties.at[label, 'latestVersion']
+                    lookups[executor.submit(self.fetch_property_hostnames, property_id)] = (i, label, version, ['hostname'])
+                    # productId and ruleFormat come from the same memoized version payload
+                    lookups[executor.submit(self.get_property_version_detail_json, property_id, version)] = \
+                        (i, label, version, ['productId', 'ruleFormat'])
+                    lookups[executor.submit(self.get_property_version_detail_json, property_id, latest)] = (i, label, latest, ['updatedDate'])
+
+            total = len(lookups)
+            for count, future in enumerate(concurrent.futures.as_completed(lookups), 1):
+                i, label, version, columns = lookups[future]
+                properties = account_properties[i]
+                value = future.result()
+                if columns == ['hostname']:
+                    if value is None:
+                        failed.add(i)
+                    properties.at[label, 'hostname'] = value if value is not None else []
+                else:
+                    if 'versions' not in value:
+                        failed.add(i)
+                    for column in columns:
+                        properties.at[label, column] = self.version_detail_value(properties.at[label, 'propertyId'], version, column, value)
+                left, row = remaining[i]
+                remaining[i] = (left - 1, row)
+                if left == 1:
+                    finish(i, row)
+                if count % 500 == 0 or count == total:
+                    self.logger.info(f'{count:>6,}/{total:,} property lookups completed')
+
+        for properties in account_properties.values():
+            properties['hostname_count'] = properties['hostname'].str.len()
+        return [account_properties[i] for i in sorted(account_properties)]
 
     def guestimate_env_type(self, name: str):
         lower = ['-qa', '-it', 'stg', 'test', '-stage.', 'stage-', 'staging', '.stage.', '-dev-', 'nonprod', '.dev.', '.qa.']
@@ -773,7 +856,7 @@ class PapiWrapper(Papi):
     def get_properties_ruletree_digest(self, property_id: int, version: int) -> dict:
         '''
         sample
-        df['ruleFormat'] = df[['propertyId', 'latestVersion']].parallel_apply(lambda x: papi.get_properties_ruletree_digest(*x), axis=1)
+        df['ruleFormat'] = parallel_map(lambda x: papi.get_properties_ruletree_digest(*x)['ruleFormat'], df[['propertyId', 'latestVersion']].values.tolist())
         '''
         return super().get_properties_ruletree_digest(property_id, version)
 
@@ -781,8 +864,37 @@ class PapiWrapper(Papi):
         limit, full_ruletree = super().property_rate_limiting(property_id, version)
         return limit, full_ruletree
 
+    def memoized_version_locked(self, property_id: int, version: int) -> bool | None:
+        '''
+        Read-only state from the version payload already fetched in this run, None when there is none yet
+        '''
+        with self.memo_lock:
+            future = self.version_memo.get((int(property_id), int(version)))
+        if future is None or not future.done() or future.exception() is not None:
+            return None
+        detail = future.result()
+        return self.version_locked(detail) if 'versions' in detail else None
+
+    def property_ruletree(self, property_id: int, version: int, remove_tags: list | None = None, locked: bool | None = None):
+        if locked is None:
+            locked = self.memoized_version_locked(property_id, version)
+        return super().property_ruletree(property_id, version, remove_tags, locked)
+
+    async def async_property_ruletree(self, property_id: int, version: int, remove_tags: list | None = None, locked: bool | None = None):
+        if locked is None:
+            locked = self.memoized_version_locked(property_id, version)
+        return await super().async_property_ruletree(property_id, version, remove_tags, locked)
+
     def get_property_ruletree(self, property_id: int, version: int, remove_tags: list | None = None) -> dict:
-        status, ruletree = super().property_ruletree(property_id, version, remove_tags)
+        status, ruletree = self.property_ruletree(property_id, version, remove_tags)
+        if status == 200:
+            return ruletree
+        else:
+            self.logger.error(f'{property_id=} {version=}')
+            return {'rules': ''}
+
+    async def async_get_property_ruletree(self, property_id: int, version: int, remove_tags: list | None = None) -> dict:
+        status, ruletree = await self.async_property_ruletree(property_id, version, remove_tags)
         if status == 200:
             return ruletree
         else:
@@ -802,6 +914,7 @@ class PapiWrapper(Papi):
 
         self.logger.debug(f'{property_id} {version} {rule_format=}')
         resp = super().update_property_ruletree(property_id, version, rule_format, payload, version_notes, group_id, contract_id)
+        self.forget_property_version(property_id, version)
 
         if not resp.ok:
             self.logger.error(f'{property_id=} {version=} {resp} {resp.url}')
@@ -896,168 +1009,41 @@ class PapiWrapper(Papi):
         except KeyError:
             pass
 
-    def get_property_path_n_behavior(self, json: dict) -> list:
-        navigation = []
-        visited_paths = set()
-
-        def traverse_json(json: dict[str, Any], path: str | None = '') -> list[dict[str, Any]]:
-            if isinstance(json, dict):
-                if 'behaviors' in json and len(json['behaviors']) > 0:
-                    current_path = f'{path} {json["name"]}'.strip()
-                    current_path = current_path.replace('default default', 'default')
-                    if current_path not in visited_paths:
-                        visited_paths.add(current_path)
-                        navigation.append({current_path: json['behaviors']})
-
-                for k, v in json.items():
-                    if k in ['children', 'behaviors']:
-                        traverse_json(v, f'{path} {json["name"]} {k}')
-            elif isinstance(json, list):
-                for i, item in enumerate(json):
-                    index = i + 1
-                    traverse_json(item, f'{path} [{index:>3}] > ')
-            return navigation
-        traverse_json(json)
-        return navigation
+    def collect_property_rules(self, property_name: str, json: dict) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        '''
+        behavior, criteria and criteriaMustSatisfy rows from a single walk of the rule tree
+        '''
+        result = RuleTreeVisitor(records=True).visit(property_name, json)
+        custom_behaviors = {}
 
-    def collect_property_behavior(self, property_name: str, json: dict) -> pd.DataFrame:
-        _behavior = self.get_property_path_n_behavior(json)
+        behavior = pd.DataFrame(result['behavior_records'], columns=['path', 'jsonpath', 'name', 'json'])
+        behavior['property'] = property_name
+        behavior['type'] = 'behavior'
+        behavior['behavior'] = behavior['name']
+        behavior['custom_behaviorId'] = [self.extract_custom_behavior_id(row) for row in behavior.to_dict('records')]
+        behavior['json_or_xml'] = [self.extract_behavior_json(row, custom_behaviors) for row in behavior.to_dict('records')]
 
-        flat = pd.json_normalize(_behavior)
-        dx = pd.DataFrame()
-        dx = pd.DataFrame(flat)
-        dx = dx.melt(var_name='path', value_name='json')
-        dx = dx.dropna(subset=['json'])
-        dx['property'] = property_name
+        criteria = pd.DataFrame(result['criteria_records'], columns=['path', 'jsonpath', 'name', 'json'])
+        criteria['property'] = property_name
+        criteria['type'] = 'criteria'
+        criteria['json_or_xml'] = [self.extract_criteria_json(row) for row in criteria.to_dict('records')]
 
-        behavior = pd.DataFrame()
-        behavior = dx.explode('json').reset_index(drop=True)
-        behavior['type'] = 'behavior'
-        behavior['index'] = behavior.groupby(['property', 'path']).cumcount() + 1
-        behavior['path'] = behavior.apply(lambda row: f"{row['path']} [{str(row['index']):>3}]", axis=1)
-        behavior['behavior'] = behavior.apply(lambda row: f"{row['json']['name']}", axis=1)
-        behavior['custom_behaviorId'] = behavior.apply(lambda row: self.extract_custom_behavior_id(row), axis=1)
-        behavior['json_or_xml'] = behavior.apply(lambda row: self.extract_behavior_json(row), axis=1)
-        behavior = behavior.rename(columns={'behavior': 'name'})
-        behavior['jsonpath'] = behavior.apply(
-            lambda row: self.get_jsonpath_match_behavior(
-                self.find_jsonpath_behavior(json, behavior=row['name']),
-                behavior=row['name'],
-                navigation=row['path'],
-                data=row['json_or_xml']), axis=1)
-
-        columns = ['property', 'path', 'jsonpath', 'type', 'name', 'json_or_xml', 'custom_behaviorId']
-        return behavior[columns]
-
-    def get_property_path_n_criteria(self, json: dict) -> list:
-        navigation = []
-        visited_paths = set()
-
-        def traverse_json(json: dict, path: str | None = '') -> list[dict]:
-            if isinstance(json, dict):
-                if 'criteria' in json and len(json['criteria']) > 0:
-                    current_path = f'{path} {json["name"]}'.strip()
-                    if current_path not in visited_paths:
-                        visited_paths.add(current_path)
-                        navigation.append({current_path: json['criteria']})
-
-                for k, v in json.items():
-                    if k in ['children', 'behaviors']:
-                        traverse_json(v, f'{path} {json["name"]} {k}')
-
-            elif isinstance(json, list):
-                for i, item in enumerate(json):
-                    index = i + 1
-                    traverse_json(item, f'{path} [{index:>3}] > ')
-
-            return navigation
-
-        traverse_json(json)
-        return navigation
+        condition = pd.DataFrame(result['condition_records'], columns=['path', 'jsonpath', 'name', 'json'])
+        condition['property'] = property_name
+        condition['type'] = 'criteria_condition'
+        condition['json_or_xml'] = condition['json']
+
+        columns = ['property', 'path', 'jsonpath', 'type', 'name', 'json_or_xml']
+        return behavior[[*columns, 'custom_behaviorId']], criteria[columns], condition[columns]
+
+    def collect_property_behavior(self, property_name: str, json: dict) -> pd.DataFrame:
+        return self.collect_property_rules(property_name, json)[0]
 
     def collect_property_criteria(self, property_name: str, json: dict) -> pd.DataFrame:
-        criteria_list = self.get_property_path_n_criteria(json)
-        dx = pd.DataFrame()
-        if len(criteria_list) > 0:
-            flat = pd.json_normalize(criteria_list)
-            dx = pd.DataFrame(flat)
-            dx = dx.melt(var_name='path', value_name='json')
-            dx = dx.dropna(subset=['json'])
-            dx['property'] = property_name
-
-        criteria = pd.DataFrame()
-        if not dx.empty:
-            criteria = dx.explode('json').reset_index(drop=True)
-            criteria['type'] = 'criteria'
-            criteria['index'] = criteria.groupby(['property', 'path']).cumcount() + 1
-            try:
-                criteria['name'] = criteria.apply(lambda row: f"{row['json']['name']}", axis=1)
-            except:
-                print_json(data=json)
-                self.logger.warning(criteria)
-                self.logger.error(flat)
-
-        if not criteria.empty:
-            criteria['json_or_xml'] = criteria.apply(lambda row: self.extract_criteria_json(row), axis=1)
-            criteria['path'] = criteria.apply(lambda row: f"{row['path']} [{str(row['index']):>3}]", axis=1)
-            criteria['jsonpath'] = criteria.apply(
-                lambda row: self.get_jsonpath_match_criteria(
-                    self.find_jsonpath_criteria(json, criterion=row['name']),
-                    navigation=row['path'], data=row['json_or_xml']), axis=1)
-            columns = ['property', 'path', 'jsonpath', 'type', 'name', 'json_or_xml']
-            return criteria[columns]
-        return criteria
-
-    def get_property_path_n_criteria_condition(self, json: dict) -> list[dict]:
-        navigation = []
-        visited_paths = set()
-
-        def traverse_json(json: dict[str, Any], path: str | None = '') -> list[dict[str, Any]]:
-            if isinstance(json, dict):
-                if 'criteriaMustSatisfy' in json:
-                    current_path = f'{path} {json["name"]}'.strip()
-                    if current_path not in visited_paths:
-                        visited_paths.add(current_path)
-                        navigation.append({current_path: json['criteriaMustSatisfy']})
-
-                for k, v in json.items():
-                    if k in ['children']:
-                        traverse_json(v, f'{path} {json["name"]} {k}')
-
-            elif isinstance(json, list):
-                for i, item in enumerate(json):
-                    index = i + 1
-                    traverse_json(item, f'{path} [{index:>3}] > ')
-            return navigation
-
-        traverse_json(json)
-        return navigation
+        return self.collect_property_rules(property_name, json)[1]
 
     def collect_property_criteria_condition(self, property_name: str, json: dict) -> pd.DataFrame:
-        criteria_list = self.get_property_path_n_criteria_condition(json)
-        dx = pd.DataFrame()
-        if len(criteria_list) > 0:
-            flat = pd.json_normalize(criteria_list)
-            dx = pd.DataFrame(flat)
-            dx = dx.melt(var_name='path', value_name='json')
-            dx = dx.dropna(subset=['json'])
-            dx['property'] = property_name
-
-        criteria = pd.DataFrame()
-        if not dx.empty:
-            criteria = dx.explode('json').reset_index(drop=True)
-            criteria['type'] = 'criteria_condition'
-            criteria['index'] = criteria.groupby(['property', 'path']).cumcount() + 1
-            criteria['name'] = 'criteriaMustSatisfy'
-        if not criteria.empty:
-            criteria['json_or_xml'] = criteria['json']
-            criteria['path'] = criteria.apply(lambda row: f"{row['path']} [{str(row['index']):>3}]", axis=1)
-            criteria['jsonpath'] = criteria.apply(
-                lambda row: self.get_jsonpath_match_criteria_condition(
-                    self.find_jsonpath_criteria_condition(json), navigation=row['path']), axis=1)
-            columns = ['property', 'path', 'jsonpath', 'type', 'name', 'json_or_xml']
-            return criteria[columns]
-        return criteria
+        return self.collect_property_rules(property_name, json)[2]
 
     def get_product_schema(self, product_id: str, format_version: str | None = 'latest') -> dict:
         status, response = super().get_ruleformat_schema(product_id, format_version)
@@ -1094,263 +1080,52 @@ class PapiWrapper(Papi):
             else:
                 return value
 
-    def check_criteria(self, criteria: list[str], df: pd.DataFrame) -> pd.DataFrame:
+    def check_rules(self, behaviors: list[str], criteria: list[str], df: pd.DataFrame,
+                    cpcode: CpCodeWrapper | None = None) -> pd.DataFrame:
+        '''
+        Fill every requested behavior and criteria column from one walk of each property rule tree
+        '''
+        visitor = RuleTreeVisitor(behaviors=behaviors, criteria=criteria)
+        results = [visitor.visit(property_name, ruletree.get('rules') if isinstance(ruletree, dict) else None)
+                   for property_name, ruletree in zip(df['propertyName'], df['ruletree'])]
+
         for criterion in criteria:
             if criterion == 'cloudletsOrigin':
-                df[criterion] = df.apply(lambda row: self.cloudlets_origin_value(row['ruletree']['rules']), axis=1)
-                df[f'{criterion}_count'] = df[criterion].str.len()
-                df[criterion] = df[[criterion]].parallel_apply(lambda x: dataframe.split_elements_newline(x[0]) if len(x[0]) > 0 else '', axis=1)
+                values = [x[criterion] for x in results]
+                df[f'{criterion}_count'] = [len(x) for x in values]
+                df[criterion] = [dataframe.split_elements_newline(x) if len(x) > 0 else '' for x in values]
                 self.logger.debug(f'\n{df}')
             if criterion == 'path':
-                df[criterion] = df.apply(lambda row: self.path_value(row['ruletree']['rules']), axis=1)
-                df[criterion] = df[[criterion]].parallel_apply(lambda x: dataframe.flat_list(x[0]) if len(x[0]) > 0 else '', axis=1)
-                df[f'{criterion}_count'] = df[criterion].parallel_apply(lambda x: len(x))
+                values = [dataframe.flat_list(x[criterion]) if len(x[criterion]) > 0 else '' for x in results]
+                df[criterion] = values
+                df[f'{criterion}_count'] = [len(x) for x in values]
                 self.logger.debug(f'\n{df}')
                 print(df[[criterion, f'{criterion}_count']])
-                df[criterion] = df[[criterion]].parallel_apply(lambda x: dataframe.split_elements_newline(x[0]) if len(x[0]) > 0 else '', axis=1)
-        return df
-
-    def cloudlets_origin_value(self, json: dict) -> list[str]:
-        origins = []
-
-        def traverse_json(json: dict) -> list[str]:
-            if isinstance(json, dict):
-                if 'criteria' in json and len(json['criteria']) > 0:
-                    for x in json['criteria']:
-                        try:
-                            if x['name'] == 'cloudletsOrigin':
-                                origins.extend(x['options']['originId'])
-                        except:
-                            pass
-                for k, v in json.items():
-                    if k in ['children', 'behaviors']:
-                        traverse_json(v)
-            elif isinstance(json, list):
-                for i, item in enumerate(json):
-                    index = i + 1
-                    traverse_json(item)
-            return origins
-
-        traverse_json(json)
-        return origins
-
-    def path_value(self, json: dict) -> list[str]:
-        origins = []
-
-        def traverse_json(json: dict) -> list[str]:
-            if isinstance(json, dict):
-                if 'criteria' in json and len(json['criteria']) > 0:
-                    for x in json['criteria']:
-                        try:
-                            if x['name'] == 'path':
-                                origins.append(x['options']['values'])
-                        except:
-                            pass
-                for k, v in json.items():
-                    if k in ['children', 'behaviors']:
-                        traverse_json(v)
-            elif isinstance(json, list):
-                for i, item in enumerate(json):
-                    index = i + 1
-                    traverse_json(item)
-            return origins
-
-        traverse_json(json)
-        return origins
+                df[criterion] = [dataframe.split_elements_newline(x) if len(x) > 0 else '' for x in values]
 
-    def check_behavior(self, behaviors: list[str], df: pd.DataFrame, cpcode: CpCodeWrapper) -> DataFrame:
         for behavior in behaviors:
-            if behavior == 'origin':
-                df[behavior] = df.parallel_apply(lambda row: self.origin_value(row['propertyName'], row['ruletree']['rules']), axis=1)
-                df[f'{behavior}_count'] = df[behavior].str.len()
-                df[behavior] = df[[behavior]].parallel_apply(lambda x: dataframe.split_elements_newline(x[0]) if len(x[0]) > 0 else '', axis=1)
-            elif behavior == 'setvariable':
-                df[behavior] = df.parallel_apply(lambda row: self.setvariable_value(row['propertyName'], row['ruletree']['rules']), axis=1)
-                df[f'{behavior}_count'] = df[behavior].str.len()
-                df[behavior] = df[[behavior]].parallel_apply(lambda x: dataframe.split_elements_newline(x[0]) if len(x[0]) > 0 else '', axis=1)
-            elif behavior == 'edgeConnect':
-                # cloudlets
-                df[behavior] = df.parallel_apply(lambda row: self.cloudlets_value(row['propertyName'], row['ruletree']['rules']), axis=1)
-
-            elif behavior == 'siteshield':
-                df[behavior] = df.parallel_apply(lambda row: self.siteshield_value(row['propertyName'], row['ruletree']['rules']), axis=1)
-                df[behavior] = df[[behavior]].parallel_apply(lambda x: dataframe.split_elements_newline(x[0]) if len(x[0]) > 0 else '', axis=1)
-            elif behavior == 'sureroute':
-                df[behavior] = df.parallel_apply(lambda row: self.sureroute_value(row['propertyName'], row['ruletree']['rules']), axis=1)
-                df[behavior] = df[[behavior]].parallel_apply(lambda x: dataframe.split_elements_newline(x[0]) if len(x[0]) > 0 else '', axis=1)
-            elif behavior == 'custombehavior':
-                try:
-                    df[behavior] = df.parallel_apply(lambda row: self.custom_behavior_value(row['propertyName'], row['ruletree']['rules']), axis=1)
-                    df[behavior] = df[[behavior]].parallel_apply(lambda x: dataframe.split_elements_newline(x[0]) if len(x[0]) > 0 else '', axis=1)
-                except:
-                    self.logger.error(behavior)
+            if behavior in ['origin', 'setvariable']:
+                values = [x[behavior] for x in results]
+                df[f'{behavior}_count'] = [len(x) for x in values]
+                df[behavior] = [dataframe.split_elements_newline(x) if len(x) > 0 else '' for x in values]
+            elif behavior in ['siteshield', 'sureroute', 'custombehavior']:
+                df[behavior] = [dataframe.split_elements_newline(x[behavior]) if len(x[behavior]) > 0 else '' for x in results]
             elif behavior == 'cpcode':
-                df[behavior] = df.parallel_apply(lambda row: self.cpcode_value(row['propertyName'], row['ruletree']['rules']), axis=1)
-                df['cpcode_count'] = df[behavior].str.len()
-                df[f'{behavior}_name'] = df['cpcode'].parallel_apply(lambda x: [cpcode.get_cpcode_name(cp) for cp in x])
-                df[behavior] = df[[behavior]].parallel_apply(
-                    lambda x: dataframe.split_elements_newline(x[0]) if len(x[0]) > 0 else '', axis=1)
-                df['cpcode_name'] = df[['cpcode_name']].parallel_apply(
-                    lambda x: dataframe.split_elements_newline(x[0]) if len(x[0]) > 0 else '', axis=1)
+                values = [x[behavior] for x in results]
+                df['cpcode_count'] = [len(x) for x in values]
+                names = [[cpcode.get_cpcode_name(cp) for cp in x] for x in values]
+                df[behavior] = [dataframe.split_elements_newline(x) if len(x) > 0 else '' for x in values]
+                df['cpcode_name'] = [dataframe.split_elements_newline(x) if len(x) > 0 else '' for x in names]
             else:
-                df[behavior] = df.parallel_apply(
-                    lambda row: self.behavior_count(row['propertyName'],
-                                                    row['ruletree']['rules'], behavior), axis=1)
-
+                # edgeConnect and any other behavior name is counted
+                df[behavior] = [x[behavior] for x in results]
         return df
 
-    @staticmethod
-    def behavior_count(property_name: str, rules: dict, target_behavior: str) -> int:
-        parent_count = 0
-
-        if 'behaviors' in rules.keys() and isinstance(rules['behaviors'], list):
-            for behavior in rules['behaviors']:
-                if behavior['name'].lower() == target_behavior.lower():
-                    parent_count += 1
-            if 'children' in rules and isinstance(rules['children'], list):
-                for child_rule in rules['children']:
-                    child_count = PapiWrapper.behavior_count(property_name, child_rule, target_behavior)
-                    parent_count += child_count
-        return parent_count
-
-    def cpcode_value(self, property_name: str, rules: dict) -> list[str]:
-        """
-        Cover regular cpcode, visitorPrioritization, netstorage, and Image Manager
-        """
-        values = []
-
-        if 'behaviors' in rules.keys() and isinstance(rules['behaviors'], list):
-            for behavior in rules['behaviors']:
-                if behavior['name'] == 'cpCode':
-                    try:
-                        values.append(behavior['options']['value']['id'])
-                    except:
-                        self.logger.error(f'{property_name} cpCode not found')
-                elif behavior['name'] == 'failAction':  # Site Failover
-                    try:
-                        values.append(behavior['options']['cpCode']['id'])
-                    except:
-                        # logger.warning(f'{property_name:<40} cpCode not found for Site Failover')
-                        pass
-
-                elif behavior['name'] == 'visitorPrioritization':
-                    try:
-                        values.append(behavior['options']['waitingRoomCpCode']['cpCode'])
-                    except:
-                        pass
-                    try:
-                        values.append(behavior['options']['waitingRoomNetStorage']['cpCode'])
-                    except:
-                        pass
-
-                elif behavior['name'] == 'imageManager':
-                    try:
-                        values.append(behavior['options']['cpCodeOriginal']['id'])
-                    except:
-                        pass
-                    try:
-                        values.append(behavior['options']['cpCodeTransformed']['id'])
-                    except:
-                        pass
-
-            if 'children' in rules and isinstance(rules['children'], list):
-                for child_rule in rules['children']:
-                    child_values = self.cpcode_value(property_name, child_rule)
-                    values.extend(child_values)
-        return list(set(values))
-
-    def custom_behavior_value(self, property_name: str, rules: dict) -> list[str]:
-        values = []
-        if 'behaviors' in rules.keys() and isinstance(rules['behaviors'], list):
-            for behavior in rules['behaviors']:
-                if behavior['name'] == 'customBehavior':
-                    try:
-                        values.append(behavior['options']['behaviorId'])
-                    except:
-                        self.logger.error(f'{property_name:<40} behaviorId not found')
-            if 'children' in rules and isinstance(rules['children'], list):
-                for child_rule in rules['children']:
-                    child_values = self.custom_behavior_value(property_name, child_rule)
-                    values.extend(child_values)
-        return list(set(values))
-
-    def setvariable_value(self, property_name: str, rules: dict) -> list[str]:
-        values = []
-        if 'behaviors' in rules.keys() and isinstance(rules['behaviors'], list):
-            for behavior in rules['behaviors']:
-                if behavior['name'] == 'setVariable':
-                    # print_json(data=behavior)
-                    if 'variableName' in behavior['options']:
-                        variableName = behavior['options']['variableName']
-
-                    if 'variableValue' in behavior['options']:
-                        variableValue = behavior['options']['variableValue']
-                        x = f'{variableName}:{variableValue}'
-                        values.append(x)
-
-                    if 'extractLocation' in behavior['options']:
-                        extractLocation = behavior['options']['extractLocation']
-                        if 'headerName' in behavior['options']:
-                            headerName = behavior['options']['headerName']
-                            x = f'{variableName}:{extractLocation}:{headerName}'
-                        else:
-                            x = f'{variableName}:{extractLocation}'
-                        values.append(x)
-            if 'children' in rules and isinstance(rules['children'], list):
-                for child_rule in rules['children']:
-                    child_values = self.setvariable_value(property_name, child_rule)
-                    values.extend(child_values)
-        return sorted(list(set(values)))
-
-    def origin_value(self, property_name: str, rules: dict) -> list[str]:
-        values = []
-        if 'behaviors' in rules.keys() and isinstance(rules['behaviors'], list):
-            for behavior in rules['behaviors']:
-                if behavior['name'] == 'origin':
-                    try:
-                        values.append(behavior['options']['hostname'])
-                    except:
-                        pass
-                    try:
-                        values.append(behavior['options']['netStorage']['downloadDomainName'])
-                    except:
-                        pass
-
-            if 'children' in rules and isinstance(rules['children'], list):
-                for child_rule in rules['children']:
-                    child_values = self.origin_value(property_name, child_rule)
-                    values.extend(child_values)
-        return sorted(list(set(values)))
-
-    def siteshield_value(self, property_name: str, rules: dict) -> list[str]:
-        values = []
-        if 'behaviors' in rules.keys() and isinstance(rules['behaviors'], list):
-            for behavior in rules['behaviors']:
-                if behavior['name'] == 'siteShield':
-                    try:
-                        values.append(behavior['options']['ssmap']['value'])
-                    except:
-                        self.logger.error(f'{property_name:<40} siteShield not found')
-            if 'children' in rules and isinstance(rules['children'], list):
-                for child_rule in rules['children']:
-                    child_values = self.siteshield_value(property_name, child_rule)
-                    values.extend(child_values)
-        return sorted(list(set(values)))
-
-    def sureroute_value(self, property_name: str, rules: dict) -> list[str]:
-        values = []
-        if 'behaviors' in rules.keys() and isinstance(rules['behaviors'], list):
-            for behavior in rules['behaviors']:
-                if behavior['name'] == 'siteShield':
-                    try:
-                        values.append(behavior['options']['ssmap']['srmap'])
-                    except:
-                        self.logger.error(f'{property_name} sureRoute map not found')
-            if 'children' in rules and isinstance(rules['children'], list):
-                for child_rule in rules['children']:
-                    child_values = self.sureroute_value(property_name, child_rule)
-                    values.extend(child_values)
-        return sorted(list(set(values)))
+    def check_criteria(self, criteria: list[str], df: pd.DataFrame) -> pd.DataFrame:
+        return self.check_rules([], criteria, df)
+
+    def check_behavior(self, behaviors: list[str], df: pd.DataFrame, cpcode: CpCodeWrapper) -> DataFrame:
+        return self.check_rules(behaviors, [], df, cpcode)
 
     # ACTIVATION
     def activate_property_version(self, property_id: int, version: int,
@@ -1373,6 +1148,15 @@ class PapiWrapper(Papi):
                 return 0
         return -1
 
+    def activation_detail(self, property_id: int, activation_id: int) -> dict:
+        '''
+        Latest activation item of one activation, {} when it cannot be read
+        '''
+        status, response = super().activation_status(property_id, activation_id)
+        if status == 200 and response:
+            return response[0]
+        return {}
+
     def activation_status(self, property_id: int, activation_id: str, version: int) -> tuple:
         if int(activation_id) == -1:
             return ('', f"{emojis.encode(':x:')}")
@@ -1406,9 +1190,13 @@ class PapiWrapper(Papi):
         else:
             return row['json']['options']
 
-    def extract_behavior_json(self, row: pd.Series[Any]) -> str:
+    def extract_behavior_json(self, row: pd.Series[Any], custom_behaviors: dict | None = None) -> str:
         if row['behavior'] == 'customBehavior':
-            return self.get_custom_behaviors(row['custom_behaviorId'])[1]
+            # the same custom behavior is often referenced by several rules
+            custom_behaviors = {} if custom_behaviors is None else custom_behaviors
+            if row['custom_behaviorId'] not in custom_behaviors:
+                custom_behaviors[row['custom_behaviorId']] = self.get_custom_behaviors(row['custom_behaviorId'])[1]
+            return custom_behaviors[row['custom_behaviorId']]
         if row['behavior'] == 'advanced':
             return row['json']['options']['xml']
         else:
@@ -1420,27 +1208,6 @@ class PapiWrapper(Papi):
         else:
             return ''
 
-    def get_jsonpath_match_behavior(self,
-                                    result: list[tuple[str, str, str]],
-                                    behavior: str,
-                                    navigation: str,
-                                    data: str) -> Any:
-        if len(result) == 1:
-            return result[0][0]
-        else:
-            numbers_inside_brackets = re.findall(r'\[ *(\d+) *\]', navigation)
-            navipath_nums = [int(num) for num in numbers_inside_brackets]
-            jsonpath_nums = [num - 1 for num in navipath_nums]
-            extracted_numbers = [list(map(int, re.findall(r'\d+', item[0]))) for item in result]
-            matching_indices = [index for index, numbers in enumerate(extracted_numbers) if numbers == jsonpath_nums]
-            matching_paths = [result[index][0] for index in matching_indices]
-            self.logger.debug(jsonpath_nums)
-            self.logger.debug(extracted_numbers)
-            self.logger.debug(matching_paths)
-            if len(matching_paths) == 1:
-                return matching_paths[0]
-            return [x[0] for x in result]
-
     def find_jsonpath_behavior(self,
                                ruletree: dict[str, Any],
                                behavior: str | None = None,
@@ -1468,42 +1235,6 @@ class PapiWrapper(Papi):
         traverse(ruletree, '')
         return result
 
-    def get_jsonpath_match_criteria(self,
-                                    result: list[tuple[str, str, str]],
-                                    navigation: str,
-                                    data: str) -> Any:
-        if len(result) == 1:
-            return result[0][0]
-        else:
-            if '>' not in navigation:
-                match_result = [x[0] for x in result if 'children' not in x[0]]
-                if len(match_result) == 1:
-                    return match_result[0]
-            elif 'children' in navigation:
-                count_children = navigation.count('children')
-                matching_elements = [x[0] for x in result if x[0].count('children') == count_children]
-                if len(matching_elements) == 1:
-                    return matching_elements[0]
-                else:
-                    matching_option = [x[0] for x in result if x[2] == data]
-                    if len(matching_option) == 1:
-                        return matching_option[0]
-                    else:
-                        self.logger.debug(navigation)
-                        self.logger.debug(result)
-                        numbers_inside_brackets = re.findall(r'\[ *(\d+) *\]', navigation)
-                        navipath_nums = [int(num) for num in numbers_inside_brackets]
-                        jsonpath_nums = [num - 1 for num in navipath_nums]
-                        extracted_numbers = [list(map(int, re.findall(r'\d+', item[0]))) for item in result]
-                        matching_indices = [index for index, numbers in enumerate(extracted_numbers) if numbers == jsonpath_nums]
-                        matching_paths = [result[index][0] for index in matching_indices]
-                        self.logger.debug(jsonpath_nums)
-                        self.logger.debug(extracted_numbers)
-                        self.logger.debug(matching_paths)
-                        if len(matching_paths) == 1:
-                            return matching_paths[0]
-            return [x[0] for x in result]
-
     def find_jsonpath_criteria(self,
                                ruletree: dict[str, Any],
                                criterion: str | None = None,
@@ -1531,18 +1262,6 @@ class PapiWrapper(Papi):
         traverse(ruletree, '')
         return result
 
-    def get_jsonpath_match_criteria_condition(self,
-                                              result: list[tuple[str, str, str, str]],
-                                              navigation: str) -> Any:
-        if len(result) == 1:
-            return result[0][0]
-        else:
-            for i, item in enumerate(result):
-                if i > 0 and result[i][1] in navigation:
-                    self.logger.debug(result[i])
-                    return result[i][0]
-        return [x[0] for x in result]
-
     def find_jsonpath_criteria_condition(self,
                                          ruletree: dict[str, Any],
                                          current_path: list[str] | None = []) -> list[tuple[str, str, str, str]]:
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import logging
+from typing import Any
+from typing import Iterator
+
+
+logger = logging.getLogger(__name__)
+
+
+def cpcode_values(property_name: str, behavior: dict, values: list) -> None:
+    '''
+    Cover regular cpcode, visitorPrioritization, netstorage, and Image Manager
+    '''
+    options = behavior.get('options', {})
+    if behavior['name'] == 'cpCode':
+        try:
+            values.append(options['value']['id'])
+        except (KeyError, TypeError):
+            logger.error(f'{property_name} cpCode not found')
+    elif behavior['name'] == 'failAction':  # Site Failover
+        values.extend(nested_values(options, [['cpCode', 'id']]))
+    elif behavior['name'] == 'visitorPrioritization':
+        values.extend(nested_values(options, [['waitingRoomCpCode', 'cpCode'], ['waitingRoomNetStorage', 'cpCode']]))
+    elif behavior['name'] == 'imageManager':
+        values.extend(nested_values(options, [['cpCodeOriginal', 'id'], ['cpCodeTransformed', 'id']]))
+
+
+def custom_behavior_values(property_name: str, behavior: dict, values: list) -> None:
+    if behavior['name'] == 'customBehavior':
+        try:
+            values.append(behavior['options']['behaviorId'])
+        except (KeyError, TypeError):
+            logger.error(f'{property_name:<40} behaviorId not found')
+
+
+def setvariable_values(property_name: str, behavior: dict, values: list) -> None:
+    if behavior['name'] == 'setVariable':
+        options = behavior.get('options', {})
+        variable_name = options.get('variableName')
+        if 'variableValue' in options:
+            values.append(f"{variable_name}:{options['variableValue']}")
+        if 'extractLocation' in options:
+            if 'headerName' in options:
+                values.append(f"{variable_name}:{options['extractLocation']}:{options['headerName']}")
+            else:
+                values.append(f"{variable_name}:{options['extractLocation']}")
+
+
+def origin_values(property_name: str, behavior: dict, values: list) -> None:
+    if behavior['name'] == 'origin':
+        values.extend(nested_values(behavior.get('options', {}), [['hostname'], ['netStorage', 'downloadDomainName']]))
+
+
+def siteshield_values(property_name: str, behavior: dict, values: list) -> None:
+    if behavior['name'] == 'siteShield':
+        try:
+            values.append(behavior['options']['ssmap']['value'])
+        except (KeyError, TypeError):
+            logger.error(f'{property_name:<40} siteShield not found')
+
+
+def sureroute_values(property_name: str, behavior: dict, values: list) -> None:
+    if behavior['name'] == 'siteShield':
+        try:
+            values.append(behavior['options']['ssmap']['srmap'])
+        except (KeyError, TypeError):
+            logger.error(f'{property_name} sureRoute map not found')
+
+
+def cloudlets_origin_values(property_name: str, criterion: dict, values: list) -> None:
+    if criterion.get('name') == 'cloudletsOrigin':
+        try:
+            values.extend(criterion['options']['originId'])
+        except (KeyError, TypeError):
+            pass
+
+
+def path_values(property_name: str, criterion: dict, values: list) -> None:
+    if criterion.get('name') == 'path':
+        try:
+            values.append(criterion['options']['values'])
+        except (KeyError, TypeError):
+            pass
+
+
+def nested_values(options: dict, key_paths: list[list[str]]) -> list:
+    values = []
+    for keys in key_paths:
+        value = options
+        try:
+            for key in keys:
+                value = value[key]
+        except (KeyError, TypeError):
+            continue
+        values.append(value)
+    return values
+
+
+# --behavior / --criteria names with a value extractor, any other behavior name is counted
+BEHAVIOR_EXTRACTORS = {'cpcode': cpcode_values,
+                       'custombehavior': custom_behavior_values,
+                       'setvariable': setvariable_values,
+                       'origin': origin_values,
+                       'siteshield': siteshield_values,
+                       'sureroute': sureroute_values,
+                       }
+CRITERIA_EXTRACTORS = {'cloudletsOrigin': cloudlets_origin_values,
+                       'path': path_values,
+                       }
+
+
+def walk(rules: dict) -> Iterator[tuple[str, str, dict]]:
+    '''
+    Pre-order walk of a rule tree, yields (navigation, jsonpath, rule) for every rule
+    navigation matches the "default children [  1] >  Rule" format shown in the excel output
+    '''
+    stack = [('', 'rules', rules)]
+    while stack:
+        prefix, jsonpath, rule = stack.pop()
+        if not isinstance(rule, dict):
+            continue
+        name = rule.get('name', '')
+        yield f'{prefix} {name}'.strip(), jsonpath, rule
+        children = rule.get('children', [])
+        if isinstance(children, list):
+            for i in reversed(range(len(children))):
+                stack.append((f'{prefix} {name} children [{i + 1:>3}] > ', f'{jsonpath}/children/{i}/rules', children[i]))
+
+
+class RuleTreeVisitor:
+    '''
+    Compile the requested behavior/criteria extractors once, then walk each rule tree a single time
+
+    sample:
+    visitor = RuleTreeVisitor(behaviors=['origin', 'cpcode', 'caching'], criteria=['path'])
+    result = visitor.visit(property_name, ruletree['rules'])
+    result['origin'], result['caching']
+    '''
+    def __init__(self, behaviors: list[str] | None = None,
+                 criteria: list[str] | None = None,
+                 records: bool = False):
+        behaviors = behaviors if behaviors else []
+        criteria = criteria if criteria else []
+        self.behavior_extractors = {x: BEHAVIOR_EXTRACTORS[x] for x in behaviors if x in BEHAVIOR_EXTRACTORS}
+        self.behavior_counters = {x.lower(): x for x in behaviors if x not in BEHAVIOR_EXTRACTORS}
+        self.criteria_extractors = {x: CRITERIA_EXTRACTORS[x] for x in criteria if x in CRITERIA_EXTRACTORS}
+        self.records = records
+
+    def visit(self, property_name: str, rules: dict) -> dict[str, Any]:
+        result = {name: [] for name in self.behavior_extractors}
+        result.update({name: [] for name in self.criteria_extractors})
+        result.update({name: 0 for name in self.behavior_counters.values()})
+        if self.records:
+            result.update({'behavior_records': [], 'criteria_records': [], 'condition_records': []})
+        if not isinstance(rules, dict):
+            return result
+
+        for navigation, jsonpath, rule in walk(rules):
+            behaviors = rule.get('behaviors', [])
+            behaviors = behaviors if isinstance(behaviors, list) else []
+            criteria = rule.get('criteria', [])
+            criteria = criteria if isinstance(criteria, list) else []
+
+            for i, behavior in enumerate(behaviors):
+                name = behavior.get('name', '')
+                for key, extractor in self.behavior_extractors.items():
+                    extractor(property_name, behavior, result[key])
+                counter = self.behavior_counters.get(name.lower())
+                if counter:
+                    result[counter] += 1
+                if self.records:
+                    result['behavior_records'].append({'path': f"{navigation.replace('default default', 'default')} [{i + 1:>3}]",
+                                                       'jsonpath': f'{jsonpath}/behaviors/{i}',
+                                                       'name': name,
+                                                       'json': behavior})
+
+            for i, criterion in enumerate(criteria):
+                for key, extractor in self.criteria_extractors.items():
+                    extractor(property_name, criterion, result[key])
+                if self.records:
+                    result['criteria_records'].append({'path': f'{navigation} [{i + 1:>3}]',
+                                                       'jsonpath': f'{jsonpath}/criteria/{i}',
+                                                       'name': criterion.get('name', ''),
+                                                       'json': criterion})
+
+            if self.records and 'criteriaMustSatisfy' in rule:
+                result['condition_records'].append({'path': f'{navigation} [  1]',
+                                                    'jsonpath': jsonpath,
+                                                    'name': 'criteriaMustSatisfy',
+                                                    'json': rule['criteriaMustSatisfy']})
+
+        for key in ['cpcode', 'custombehavior']:
+            if key in result:
+                result[key] = list(set(result[key]))
+        for key in ['setvariable', 'origin', 'siteshield', 'sureroute']:
+            if key in result:
+                result[key] = sorted(set(result[key]))
+        return result
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import concurrent.futures
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from utils import files
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = 'snapshot.json'
+PROPERTY_FIELDS = ['propertyName', 'contractId', 'groupId', 'latestVersion', 'stagingVersion', 'productionVersion']
+SECURITY_FIELDS = ['name', 'groupId', 'latestVersion', 'stagingVersion', 'productionVersion']
+
+
+class AccountSnapshot:
+    '''
+    Local copy of the account inventory: groups, properties with versions and rule tree digest,
+    account hostnames, security configs and CPS enrollments, saved under output/<account>/snapshot.json
+
+    refresh lists groups, properties, hostnames, configs and enrollments (a few paged calls)
+    but only fetches a rule tree digest when a property is new, its versions moved,
+    or its latest version is still editable, activated versions never change.
+
+    sample:
+    snapshot = AccountSnapshot(account_folder, logger=logger).load()
+    changes = snapshot.refresh(papi, appsec, cps)
+    snapshot.save()
+    '''
+    def __init__(self, account_folder: str, logger: logging.Logger = None):
+        self.path = f'{account_folder}/{SNAPSHOT_FILE}'
+        self.logger = logger if logger else logging.getLogger(__name__)
+        self.data = {'refreshed': None,
+                     'groups': [],
+                     'properties': {},
+                     'hostnames': [],
+                     'security_configs': [],
+                     'enrollments': {}}
+
+    @property
+    def exists(self) -> bool:
+        return Path(self.path).is_file()
+
+    @property
+    def refreshed(self) -> str | None:
+        return self.data['refreshed']
+
+    @property
+    def groups(self) -> list[dict]:
+        return self.data['groups']
+
+    @property
+    def properties(self) -> dict[str, dict]:
+        return self.data['properties']
+
+    @property
+    def hostnames(self) -> list[dict]:
+        return self.data['hostnames']
+
+    @property
+    def security_configs(self) -> list[dict]:
+        return self.data['security_configs']
+
+    @property
+    def enrollments(self) -> dict[str, list]:
+        return self.data['enrollments']
+
+    def load(self) -> AccountSnapshot:
+        if self.exists:
+            self.data.update(files.load_json(self.path))
+        return self
+
+    def save(self) -> None:
+        self.data['refreshed'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        files.write_json(self.path, self.data)
+
+    def group_properties(self, group_id: int, contract_id: str) -> list[dict]:
+        '''
+        Same items as the PAPI property listing of one group and contract
+        '''
+        return [{k: v for k, v in x.items() if k not in ['ruleFormat', 'etag']} for x in self.properties.values()
+                if int(x['groupId']) == int(group_id) and x['contractId'] == contract_id]
+
+    @staticmethod
+    def editable(item: dict) -> bool:
+        return item['latestVersion'] not in [item.get('stagingVersion'), item.get('productionVersion')]
+
+    @staticmethod
+    def changed_fields(old: dict, new: dict, fields: list[str]) -> str:
+        return ', '.join(f'{x} {old.get(x)} -> {new.get(x)}' for x in fields if old.get(x) != new.get(x))
+
+    def refresh(self, papi, appsec=None, cps=None, concurrency: int = 10, full: bool = False) -> pd.DataFrame:
+        '''
+        Update the snapshot in place, returns one row per added, removed or changed object
+        full=True fetches the rule tree digest of every property again
+        '''
+        changes = []
+        status, groups = papi.get_all_groups()
+        if status != 200:
+            sys.exit(self.logger.error(f'unable to list groups {groups}'))
+        self.data['groups'] = groups
+
+        listing = [(x['groupId'], contract_id) for x in groups for contract_id in x.get('contractIds', [])]
+        listed = {}
+        failed = set()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for (group_id, contract_id), items in zip(listing, executor.map(lambda x: papi.list_group_properties(*x), listing)):
+                if not isinstance(items, list):
+                    self.logger.error(f'unable to list properties {group_id=} {contract_id=}, keeping the stored properties')
+                    failed.add((int(group_id), contract_id))
+                    continue
+                for item in items:
+                    item.pop('note', None)
+                    listed[str(item['propertyId'])] = item
+            self.logger.info(f'{len(listed):,} properties in {len(listing):,} groups')
+
+            digests = {}
+            for property_id, item in listed.items():
+                old = self.properties.get(property_id)
+                if old is None:
+                    changes.append(('property', property_id, item['propertyName'], 'added', ''))
+                    digests[property_id] = None
+                elif self.changed_fields(old, item, PROPERTY_FIELDS):
+                    changes.append(('property', property_id, item['propertyName'], 'changed', self.changed_fields(old, item, PROPERTY_FIELDS)))
+                    digests[property_id] = None
+                elif full or self.editable(item) or not old.get('etag'):
+                    digests[property_id] = old.get('etag')
+                else:
+                    item.update({'ruleFormat': old.get('ruleFormat'), 'etag': old.get('etag')})
+
+            self.logger.info(f'{len(digests):,} rule tree digests to check')
+            futures = {executor.submit(papi.get_properties_ruletree_digest, int(x), listed[x]['latestVersion']): x for x in digests}
+            for future in concurrent.futures.as_completed(futures):
+                property_id = futures[future]
+                item = listed[property_id]
+                digest = future.result()
+                if 'etag' not in digest:
+                    self.logger.error(f"{item['propertyName']:<50} unable to collect rule tree digest")
+                    continue
+                item.update(digest)
+                old_etag = digests[property_id]
+                if old_etag and old_etag != digest['etag']:
+                    changes.append(('property', property_id, item['propertyName'], 'rules', f"v{item['latestVersion']} rule tree updated"))
+
+        # a failed group listing is not a removal, carry its stored properties and etags over
+        for property_id, old in self.properties.items():
+            if property_id not in listed and (int(old['groupId']), old['contractId']) in failed:
+                listed[property_id] = old
+
+        for property_id in set(self.properties) - set(listed):
+            changes.append(('property', property_id, self.properties[property_id]['propertyName'], 'removed', ''))
+        self.data['properties'] = listed
+
+        hostnames = papi.get_account_hostnames()
+        if isinstance(hostnames, list):
+            old = {(x['cnameFrom'], x.get('propertyId')) for x in self.hostnames}
+            new = {(x['cnameFrom'], x.get('propertyId')) for x in hostnames}
+            changes.extend(('hostname', property_id, hostname, 'added', '') for hostname, property_id in sorted(new - old))
+            changes.extend(('hostname', property_id, hostname, 'removed', '') for hostname, property_id in sorted(old - new))
+            self.data['hostnames'] = hostnames
+        else:
+            self.logger.error(f'unable to list account hostnames, keeping the stored hostnames {hostnames}')
+
+        if appsec:
+            status, configs = appsec.list_waf_configs()
+            if status == 200 and isinstance(configs, list):
+                stored = {x['id']: x for x in self.security_configs}
+                for config in configs:
+                    old = stored.pop(config['id'], None)
+                    if old is None:
+                        changes.append(('security_config', config['id'], config['name'], 'added', ''))
+                    elif self.changed_fields(old, config, SECURITY_FIELDS):
+                        changes.append(('security_config', config['id'], config['name'], 'changed', self.changed_fields(old, config, SECURITY_FIELDS)))
+                changes.extend(('security_config', x['id'], x['name'], 'removed', '') for x in stored.values())
+                self.data['security_configs'] = configs
+            else:
+                self.logger.error(f'unable to list security configs, keeping the stored configs {status}')
+
+        if cps:
+            contracts = papi.get_contracts()
+            for contract_id, (enrollments, _) in cps.list_enrollments_many(contracts).items():
+                if enrollments is None:
+                    self.logger.error(f'unable to list enrollments {contract_id=}, keeping the stored enrollments')
+                    continue
+                stored = {x['id']: x for x in self.enrollments.get(contract_id, [])}
+                for enrollment in enrollments:
+                    old = stored.pop(enrollment['id'], None)
+                    name = enrollment.get('csr', {}).get('cn', '')
+                    if old is None:
+                        changes.append(('enrollment', enrollment['id'], name, 'added', contract_id))
+                    elif old != enrollment:
+                        changes.append(('enrollment', enrollment['id'], name, 'changed', contract_id))
+                changes.extend(('enrollment', x['id'], x.get('csr', {}).get('cn', ''), 'removed', contract_id) for x in stored.values())
+                self.enrollments[contract_id] = enrollments
+
+        df = pd.DataFrame(changes, columns=['object', 'id', 'name', 'change', 'detail'])
+        return df.sort_values(by=['object', 'change', 'name']).reset_index(drop=True)
+
+    def summary(self) -> pd.DataFrame:
+        data = [('groups', len(self.groups)),
+                ('properties', len(self.properties)),
+                ('hostnames', len(self.hostnames)),
+                ('security_configs', len(self.security_configs)),
+                ('enrollments', sum(len(x) for x in self.enrollments.values()))]
+        return pd.DataFrame(data, columns=['object', 'count'])
+
+
+_snapshot: AccountSnapshot | None = None
+
+
+def configure_snapshot(account_folder: str, logger: logging.Logger = None) -> AccountSnapshot:
+    '''
+    Inventory lookups of this run read from the stored snapshot instead of the API
+    '''
+    global _snapshot
+    _snapshot = AccountSnapshot(account_folder, logger=logger)
+    if not _snapshot.exists:
+        sys.exit(_snapshot.logger.error(f'{_snapshot.path} not found, run snapshot refresh first'))
+    _snapshot.load()
+    _snapshot.logger.warning(f'Reading account inventory from snapshot refreshed at {_snapshot.refreshed}')
+    return _snapshot
+
+
+def get_snapshot() -> AccountSnapshot | None:
+    return _snapshot
+
+
+if __name__ == '__main__':
+    pass
@@ -6,11 +6,14 @@ import time
 
 import numpy as np
 import pandas as pd
+from akamai_api.edge_auth import parallel_map
+from akamai_utils import checkpoint
 from akamai_utils import cpcode as cp
 from akamai_utils import papi as p
 from akamai_utils import siteshield as ss
+from akamai_utils.bulk_tracker import BulkJobTracker
+from akamai_utils.bulk_tracker import TIMEOUT
 from akamai_utils.papi import PapiWrapper
-from pandarallel import pandarallel
 from rich import print_json
 from tabulate import tabulate
 from utils import files
@@ -72,7 +75,7 @@ def check_filter_condition(args, df, logger) -> pd.DataFrame:
     return df
 
 
-def fetch_status_patch(papi: PapiWrapper, id: int, version_note: str, logger) -> pd.DataFrame:
+def fetch_status_patch(papi: PapiWrapper, id: int, version_note: str, logger, journal: checkpoint.Journal | None = None) -> pd.DataFrame:
     resp = papi.list_bulk_patch(id)
     if not resp.ok:
         logger.critical(resp.status_code)
@@ -91,24 +94,27 @@ def fetch_status_patch(papi: PapiWrapper, id: int, version_note: str, logger) ->
         columns_to_extract.append('status')
         update_df = df[columns_to_extract].copy()
 
-        pandarallel.initialize(progress_bar=False, nb_workers=4, verbose=0)
-
-        update_df['ruleFormat'] = update_df.parallel_apply(lambda row: papi.get_property_version_detail(row['patchPropertyId'], row['patchPropertyVersion'], 'ruleFormat'), axis=1)
-        update_df['assetId'] = update_df.parallel_apply(lambda row: papi.get_property_version_full_detail(row['patchPropertyId'], row['patchPropertyVersion'], 'assetId'), axis=1)
-        update_df['groupId'] = update_df.parallel_apply(lambda row: papi.get_property_version_full_detail(row['patchPropertyId'], row['patchPropertyVersion'], 'groupId'), axis=1)
-        update_df['url'] = update_df.parallel_apply(lambda row: papi.property_url_edit_version(row['assetId'], row['patchPropertyVersion'], row['groupId']), axis=1)
+        update_df['ruleFormat'] = parallel_map(lambda row: papi.get_property_version_detail(row['patchPropertyId'], row['patchPropertyVersion'], 'ruleFormat'), update_df.to_dict('records'))
+        update_df['assetId'] = parallel_map(lambda row: papi.get_property_version_full_detail(row['patchPropertyId'], row['patchPropertyVersion'], 'assetId'), update_df.to_dict('records'))
+        update_df['groupId'] = parallel_map(lambda row: papi.get_property_version_full_detail(row['patchPropertyId'], row['patchPropertyVersion'], 'groupId'), update_df.to_dict('records'))
+        update_df['url'] = update_df.apply(lambda row: papi.property_url_edit_version(row['assetId'], row['patchPropertyVersion'], row['groupId']), axis=1)
         if 'papiErrors' in update_df.columns:
-            update_df['papiErrors'] = update_df['papiErrors'].parallel_apply(lambda x: len(x) if isinstance(x, (list, str, dict)) else 0)
+            update_df['papiErrors'] = update_df['papiErrors'].apply(lambda x: len(x) if isinstance(x, (list, str, dict)) else 0)
 
         columns_to_extract = update_df.columns.tolist()
         columns_to_extract.extend(['ruleFormat', 'url'])
         if version_note:
-            update_df['current_rule'] = update_df.parallel_apply(lambda row: papi.get_property_full_ruletree(row['patchPropertyId'], row['patchPropertyVersion']).json(), axis=1)
-            update_df['version_status'] = update_df.parallel_apply(lambda row: papi.update_property_ruletree(row['patchPropertyId'],
+            # a version note already saved by an interrupted run is not written again
+            journal = journal if journal is not None else checkpoint.Journal(None)
+            update_df['current_rule'] = parallel_map(lambda row: papi.get_property_full_ruletree(row['patchPropertyId'], row['patchPropertyVersion']).json(), update_df.to_dict('records'))
+            update_df['version_status'] = journal.map(lambda row: papi.update_property_ruletree(row['patchPropertyId'],
                                                                                             row['patchPropertyVersion'],
                                                                                             row['ruleFormat'],
                                                                                             row['current_rule']['rules'],
-                                                                                            version_note), axis=1)
+                                                                                            version_note).status_code,
+                                                      update_df.to_dict('records'),
+                                                      key=lambda row: f"note:{row['patchPropertyId']}:{row['patchPropertyVersion']}",
+                                                      valid=lambda x: x < 400)
             if 'version_status' not in columns_to_extract:
                 columns_to_extract.append('version_status')
     return update_df
@@ -131,16 +137,31 @@ def fetch_status_activation(papi: PapiWrapper, id: int, logger) -> pd.DataFrame:
         columns_to_extract.append('activationId')
         columns_to_extract.remove('propertyActivationsLink')
         activation_df = df[columns_to_extract].copy()
-        activation_df.loc[:, 'assetId'] = activation_df.parallel_apply(lambda row: papi.get_property_version_full_detail(row['propertyId'], row['propertyVersion'], 'assetId'), axis=1)
-        activation_df.loc[:, 'groupId'] = activation_df.parallel_apply(lambda row: papi.get_property_version_full_detail(row['propertyId'], row['propertyVersion'], 'groupId'), axis=1)
+        activation_df.loc[:, 'assetId'] = parallel_map(lambda row: papi.get_property_version_full_detail(row['propertyId'], row['propertyVersion'], 'assetId'), activation_df.to_dict('records'))
+        activation_df.loc[:, 'groupId'] = parallel_map(lambda row: papi.get_property_version_full_detail(row['propertyId'], row['propertyVersion'], 'groupId'), activation_df.to_dict('records'))
         # show summary page instead of edit version page
-        activation_df.loc[:, 'url'] = activation_df.parallel_apply(lambda row: papi.property_url(row['assetId'], row['groupId']), axis=1)
-        activation_df.loc[:, 'activation_status'] = activation_df.parallel_apply(lambda row: papi.activation_status(row['propertyId'], row['activationId'], row['propertyVersion'])[1]
-                                                                   if row['activationId'] else '',
-                                                                   axis=1)
+        activation_df.loc[:, 'url'] = activation_df.apply(lambda row: papi.property_url(row['assetId'], row['groupId']), axis=1)
+        activation_df.loc[:, 'activation_status'] = parallel_map(lambda row: papi.activation_status(row['propertyId'], row['activationId'], row['propertyVersion'])[1]
+                                                                 if row['activationId'] else '',
+                                                                 activation_df.to_dict('records'))
     return activation_df
 
 
+def wait_for_activations(papi: PapiWrapper, df: pd.DataFrame, logger) -> dict:
+    '''
+    Poll every property activation of df together until it is final
+    '''
+    keys = []
+    for row in df.to_dict('records'):
+        activation_id = str(row['activationId']).split('_')[-1]
+        if activation_id.isdigit() and int(activation_id) > 0:
+            keys.append(papi.tracker.add('property_activation', int(activation_id),
+                                         label=row['propertyName'], propertyId=str(row['propertyId'])))
+    jobs = papi.tracker.wait(keys)
+    logger.warning(f'{len(jobs)} of {len(keys)} activations reached a final status')
+    return jobs
+
+
 def combine(args, account_folder, logger):
     origin = pd.read_excel(args.origin)
     caching = pd.read_excel(args.caching)
@@ -176,12 +197,12 @@ def bulk_search(args, account_folder, logger) -> pd.DataFrame:
     bulk search --group-id 244000 --jsonpath digiteka/search.json --product Adaptive_Media_Delivery
     """
     papi = p.PapiWrapper(account_switch_key=args.account_switch_key, section=args.section, edgerc=args.edgerc, logger=logger)
+    papi.tracker = BulkJobTracker(papi, account_folder, logger=logger).load()
     all_df = []
     if not args.id and not args.jsonpath:
         sys.exit(logger.error('please provide either --id or --jsonpath'))
 
-    pandarallel.initialize(progress_bar=False, nb_workers=4, verbose=0)
-
+    bulk_search_id = 0
     if args.id:
         bulk_search_id = int(args.id)
         resp = papi.list_bulk_search(bulk_search_id)
@@ -194,10 +215,7 @@ def bulk_search(args, account_folder, logger) -> pd.DataFrame:
             bulk_search_id = bulk_search_result['bulkSearchId']
             logger.critical(f'bulkSearchId: {bulk_search_id}')
             df = pd.DataFrame(bulk_search_result['results'])
-            df = check_filter_condition(args, df, logger).copy()
             df['bulkSearchId'] = bulk_search_id
-            df['contractId'] = df.parallel_apply(lambda row: papi.get_property_version_full_detail(row['propertyId'], row['propertyVersion'], 'contractId'), axis=1)
-            df['groupId'] = df.parallel_apply(lambda row: papi.get_property_version_full_detail(row['propertyId'], row['propertyVersion'], 'groupId'), axis=1)
             all_df.append(df)
     else:
         query = files.load_json(args.jsonpath)
@@ -221,31 +239,24 @@ def bulk_search(args, account_folder, logger) -> pd.DataFrame:
 
                 bulk_search_id = bulk_result['bulkSearchId']
                 df['bulkSearchId'] = bulk_search_id
-                df['contractId'] = args.contract
-                df.loc[:, 'groupId'] = df.parallel_apply(lambda row: papi.get_property_version_full_detail(row['propertyId'], row['propertyVersion'], 'groupId'), axis=1)
                 all_df.append(df)
 
-        # search by at least one group
+        # search by at least one group, all searches are submitted at once and polled together
         if args.group:
-            for group_id in args.group:
-                papi.group_id = group_id
-                resp = papi.bulk_search(query)
-                if resp.ok:
-                    bulk_result = resp.json()
-                    dataset = bulk_result['results']
-                    df = pd.DataFrame(dataset)
-                    if df.empty:
-                        logger.warning(f'{group_id:<30}       no property found\n')
-                        return -1
-                    else:
-                        bulk_search_id = bulk_result['bulkSearchId']
-                        df['bulkSearchId'] = bulk_search_id
-                        df.loc[:, 'contractId'] = df.parallel_apply(lambda row: papi.get_property_version_full_detail(row['propertyId'], row['propertyVersion'], 'contractId'), axis=1)
-                        df['groupId'] = group_id
-                        logger.debug(f'{group_id:<30} {df.shape[0]:<5} properties\n')
-                        all_df.append(df)
+            responses = papi.bulk_search_many(query, args.group)
+            for group_id, resp in responses.items():
+                if resp is None or not resp.ok:
+                    logger.debug(f'{group_id:<30} bulk search failed')
+                    continue
+                bulk_result = resp.json()
+                df = pd.DataFrame(bulk_result['results'])
+                if df.empty:
+                    logger.warning(f'{group_id:<30}       no property found\n')
                 else:
-                    logger.debug(f'{resp.status_code} {resp.url}')
+                    bulk_search_id = bulk_result['bulkSearchId']
+                    df['bulkSearchId'] = bulk_search_id
+                    logger.debug(f'{group_id:<30} {df.shape[0]:<5} properties\n')
+                    all_df.append(df)
 
         if not args.contract and not args.group:
             # lookup whole account
@@ -254,10 +265,7 @@ def bulk_search(args, account_folder, logger) -> pd.DataFrame:
                 bulk_result = resp.json()
                 bulk_search_id = bulk_result['bulkSearchId']
                 df = pd.DataFrame(bulk_result['results'])
-                df = check_filter_condition(args, df, logger).copy()
                 df['bulkSearchId'] = bulk_search_id
-                df.loc[:, 'contractId'] = df.parallel_apply(lambda row: papi.get_property_version_full_detail(row['propertyId'], row['propertyVersion'], 'contractId'), axis=1)
-                df.loc[:, 'groupId'] = df.parallel_apply(lambda row: papi.get_property_version_full_detail(row['propertyId'], row['propertyVersion'], 'groupId'), axis=1)
                 all_df.append(df)
 
     if len(all_df) == 0:
@@ -269,19 +277,20 @@ def bulk_search(args, account_folder, logger) -> pd.DataFrame:
         sys.exit(logger.info('found nothing'))
 
     # help columns
-    df.loc[:, 'env'] = df.parallel_apply(lambda row: papi.guestimate_env_type(row['propertyName']), axis=1)
-    df.loc[:, 'assetId'] = df.parallel_apply(lambda row: papi.get_property_version_full_detail(row['propertyId'], row['propertyVersion'], 'assetId'), axis=1)
+    df.loc[:, 'env'] = df.apply(lambda row: papi.guestimate_env_type(row['propertyName']), axis=1)
 
     result_df = check_filter_condition(args, df, logger).copy()
     if result_df.empty:
         sys.exit(logger.error('no property found with requested conditions'))
     else:
-        result_df.loc[:, 'groupName'] = result_df.parallel_apply(lambda row: papi.get_group_name(row['groupId']), axis=1)
-        result_df.loc[:, 'propertyURL'] = result_df.parallel_apply(lambda row: papi.property_url_edit_version(row['assetId'], row['propertyVersion'], row['groupId']), axis=1)
-        result_df.loc[:, 'propertyName(hyperlink)'] = result_df.parallel_apply(lambda row: files.make_xlsx_hyperlink_to_external_link(row['propertyURL'], row['propertyName']), axis=1)
-
-        result_df.loc[:, 'productId'] = result_df.parallel_apply(lambda row: papi.get_property_version_detail(row['propertyId'], row['propertyVersion'], 'productId'), axis=1)
-        result_df.loc[:, 'ruleFormat'] = result_df.parallel_apply(lambda row: papi.get_property_version_detail(row['propertyId'], row['propertyVersion'], 'ruleFormat'), axis=1)
+        # one version payload per property version gives contract, group, asset, product and rule format
+        result_df = result_df.reset_index(drop=True)
+        details = papi.property_version_details(result_df['propertyId'], result_df['propertyVersion'])
+        result_df[details.columns.tolist()] = details
+        group_names = papi.group_names()
+        result_df.loc[:, 'groupName'] = result_df['groupId'].map(group_names).fillna('')
+        result_df.loc[:, 'propertyURL'] = result_df.apply(lambda row: papi.property_url_edit_version(row['assetId'], row['propertyVersion'], row['groupId']), axis=1)
+        result_df.loc[:, 'propertyName(hyperlink)'] = result_df.apply(lambda row: files.make_xlsx_hyperlink_to_external_link(row['propertyURL'], row['propertyName']), axis=1)
 
         if args.product:
             result_df = result_df.query(f"productId == '{args.product}'").copy()
@@ -320,7 +329,7 @@ def bulk_search(args, account_folder, logger) -> pd.DataFrame:
 
     if args.group is None:
         all_groups = result_df.groupId.unique().tolist()
-        modified_list = [word for word in all_groups]
+        modified_list = [str(word) for word in all_groups]
         all_groups = ' '.join(modified_list)
         logger.warning(f'--group-id {all_groups}')
 
@@ -329,7 +338,7 @@ def bulk_search(args, account_folder, logger) -> pd.DataFrame:
 
 def bulk_create(args, account_folder, logger):
     papi = p.PapiWrapper(account_switch_key=args.account_switch_key, section=args.section, edgerc=args.edgerc, logger=logger)
-    pandarallel.initialize(progress_bar=False, nb_workers=4, verbose=0)
+    papi.tracker = BulkJobTracker(papi, account_folder, logger=logger).load()
     if args.id:
         # only show result from bulk create call
         # !!! this option doesn't provide matchLocations, so output cannot be used for bulk update !!!
@@ -372,7 +381,7 @@ def bulk_create(args, account_folder, logger):
             print_json(data=bulk_search_result['bulkSearchQuery'])
             df = pd.DataFrame(bulk_search_result['results'])
             df['bulkSearchId'] = bulk_search_result['bulkSearchId']
-            df.loc[:, 'env'] = df.parallel_apply(lambda row: papi.guestimate_env_type(row['propertyName']), axis=1)
+            df.loc[:, 'env'] = df.apply(lambda row: papi.guestimate_env_type(row['propertyName']), axis=1)
             if df.empty:
                 sys.exit(logger.error('Properties not found'))
 
@@ -387,7 +396,7 @@ def bulk_create(args, account_folder, logger):
         # print()
         # print(tabulate(result_df[columns], headers=columns, tablefmt='simple', numalign='center'))
 
-    result_df['property_list'] = result_df.parallel_apply(lambda row: (row['propertyId'], row['propertyVersion']), axis=1)
+    result_df['property_list'] = result_df.apply(lambda row: (row['propertyId'], row['propertyVersion']), axis=1)
     result_df = result_df.rename(columns={'propertyVersion': 'old_version'})
     print()
     logger.warning('Rename column propertyVersion to old_version')
@@ -419,7 +428,7 @@ def bulk_create(args, account_folder, logger):
 
     try:
         # TODO need to make this fleixble and not hardcode '/options/strictMode'
-        merge['matchLocations'] = merge['matchLocations'].parallel_apply(lambda x: remove_string_from_list(x, '/options/strictMode', logger))
+        merge['matchLocations'] = merge['matchLocations'].apply(lambda x: remove_string_from_list(x, '/options/strictMode', logger))
         selected_columns = ['bulkCreateId', 'env', 'propertyName', 'propertyId', 'base_version',
                             'new_version',
                             'createVersionStatus', 'matchLocations']
@@ -450,7 +459,7 @@ def bulk_create(args, account_folder, logger):
 
 def bulk_update(args, account_folder, logger):
     papi = p.PapiWrapper(account_switch_key=args.account_switch_key, section=args.section, edgerc=args.edgerc, logger=logger)
-    pandarallel.initialize(progress_bar=False, nb_workers=4, verbose=0)
+    papi.tracker = BulkJobTracker(papi, account_folder, logger=logger).load()
     version_note = args.note
     if args.id:
         # review result of the bulk update
@@ -487,20 +496,25 @@ def bulk_update(args, account_folder, logger):
         # load_columns = ['propertyId', 'propertyName', 'new_version', 'matchLocations']
         # print(tabulate(df[load_columns], headers=load_columns, tablefmt='simple', numalign='center'))
 
-        df['property_list'] = df.parallel_apply(lambda row: (row['propertyName'], row['propertyId'], row['new_version'], row['matchLocations']), axis=1)
+        df['property_list'] = df.apply(lambda row: (row['propertyName'], row['propertyId'], row['new_version'], row['matchLocations']), axis=1)
         properties = df['property_list'].values.tolist()
 
-        if args.jsonpath is None:
-            resp = papi.bulk_delete_add_behavior(properties)
+        # the patch id is journaled once submitted, --resume waits for it instead of patching again
+        journal = checkpoint.get_journal('bulk_update', scope=checkpoint.command_scope(args), logger=logger)
+        if journal.done('bulkPatchId'):
+            logger.warning(f"Resuming bulkPatchId: {journal.get('bulkPatchId')}")
+            resp = papi.wait_bulk_job('patch', journal.get('bulkPatchId'))
+        elif args.jsonpath is None:
+            resp = papi.bulk_delete_add_behavior(properties, on_submit=lambda x: journal.record('bulkPatchId', x))
         else:
             query = files.load_json(args.jsonpath)
-            resp = papi.bulk_update_behavior(properties, query)
+            resp = papi.bulk_update_behavior(properties, query, on_submit=lambda x: journal.record('bulkPatchId', x))
 
         if not resp.ok:
             print_json(data=resp.json())
         else:
             bulk_patch_id = resp.json()['bulkPatchId']
-            update_df = fetch_status_patch(papi, bulk_patch_id, version_note, logger=logger)
+            update_df = fetch_status_patch(papi, bulk_patch_id, version_note, logger=logger, journal=journal)
             print()
             logger.critical(f'Fetch_status_patch {bulk_patch_id=} {update_df.shape[0]=}')
             columns = ['bulkPatchId', 'patchPropertyId', 'url', 'status', 'patchPropertyVersion', 'propertyName']
@@ -509,7 +523,8 @@ def bulk_update(args, account_folder, logger):
             update_df.index = update_df.index + 1
             print(tabulate(update_df[columns], headers=columns, tablefmt='simple', numalign='center'))
 
-            logger.critical(f'\n>> run akamai util bulk update --id {bulk_patch_id} to check status of update')
+            if resp.json().get('bulkPatchStatus') != 'COMPLETE':
+                logger.critical(f'\n>> run akamai util bulk update --id {bulk_patch_id} to check status of update')
 
             '''
             # Too slow let using run bulk update --id instead
@@ -528,9 +543,10 @@ def bulk_update(args, account_folder, logger):
 def bulk_activate(args, account_folder, logger):
     """
     bulk activate --note "cli activation" --input-excel production.xlsx --network production --normal
+    bulk activate --note "cli activation" --input-excel production.xlsx --network staging --wait
     """
     papi = p.PapiWrapper(account_switch_key=args.account_switch_key, section=args.section, edgerc=args.edgerc, logger=logger)
-    pandarallel.initialize(progress_bar=False, nb_workers=4, verbose=0)
+    papi.tracker = BulkJobTracker(papi, account_folder, logger=logger).load()
 
     if args.id:
         ids = [int(x) for x in args.id]
@@ -573,17 +589,19 @@ def bulk_activate(args, account_folder, logger):
             if args.normal:
                 print()
                 with yaspin() as sp:
-                    df['activationId'] = df.parallel_apply(lambda row: papi.activate_property_version(row['propertyId'],
-                                                                                                      row['new_version'],
-                                                                                                      args.network,
-                                                                                                      args.note,
-                                                                                                      args.email,
-                                                                                                      args.review_email), axis=1)
-
-                    df[['network', 'activation_status']] = df.parallel_apply(lambda row: papi.activation_status(row['propertyId'],
-                                                                                                                int(row['activationId']),
-                                                                                                                int(row['new_version'])),
-                                                                             axis=1).apply(pd.Series)
+                    df['activationId'] = parallel_map(lambda row: papi.activate_property_version(row['propertyId'],
+                                                                                                 row['new_version'],
+                                                                                                 args.network,
+                                                                                                 args.note,
+                                                                                                 args.email,
+                                                                                                 args.review_email), df.to_dict('records'))
+                    if args.wait:
+                        wait_for_activations(papi, df, logger)
+
+                    df[['network', 'activation_status']] = pd.DataFrame(parallel_map(lambda row: papi.activation_status(row['propertyId'],
+                                                                                                                      int(row['activationId']),
+                                                                                                                      int(row['new_version'])),
+                                                                                     df.to_dict('records')), index=df.index)
 
                     columns = ['propertyName', 'propertyId', 'base_version', 'new_version',
                                'activationId', 'network', 'activation_status']
@@ -597,7 +615,7 @@ def bulk_activate(args, account_folder, logger):
                     files.open_excel_application(filepath, True, df[columns])
             else:
                 print()
-                df['property_list'] = df.parallel_apply(lambda row: (row['propertyId'], row['new_version']), axis=1)
+                df['property_list'] = df.apply(lambda row: (row['propertyId'], row['new_version']), axis=1)
                 properties = df['property_list'].values.tolist()
                 logger.debug(properties)
                 resp = papi.bulk_activate_properties(args.network, args.email, args.review_email, args.note, properties)
@@ -607,10 +625,17 @@ def bulk_activate(args, account_folder, logger):
                 else:
                     activation_id = int(resp.json()['bulkActivationId'])
                     activation = fetch_status_activation(papi, activation_id, logger=logger)
-                    logger.critical(f'\n>> run akamai util bulk activation --id {activation_id} to check progress of activation status')
+                    if args.wait:
+                        wait_for_activations(papi, activation, logger)
+                        activation = fetch_status_activation(papi, activation_id, logger=logger)
+                    else:
+                        logger.critical(f'\n>> run akamai util bulk activation --id {activation_id} to check progress of activation status')
+                    df = activation.reset_index(drop=True)
+                    columns = ['bulkActivationId', 'activationId', 'activation_status',
+                               'propertyName', 'propertyId', 'propertyVersion', 'network', 'taskStatus']
         else:
-            df[['network', 'activation_status']] = df.parallel_apply(lambda row: pd.Series(papi.activation_status(
-                                                                     row['propertyId'], row['activationId'], int(row['new_version']))), axis=1)
+            df[['network', 'activation_status']] = pd.DataFrame(parallel_map(lambda row: papi.activation_status(
+                                                                row['propertyId'], row['activationId'], int(row['new_version'])), df.to_dict('records')), index=df.index)
             columns = ['propertyName', 'propertyId', 'base_version', 'new_version', 'activationId', 'network', 'activation_status']
             sheet = {'activation': df[columns]}
             if args.tag:
@@ -627,6 +652,30 @@ def bulk_activate(args, account_folder, logger):
     print(f'\n{table}')
 
 
+def bulk_jobs(args, account_folder, logger):
+    """
+    bulk jobs
+    bulk jobs --clear --timeout 600
+    """
+    papi = p.PapiWrapper(account_switch_key=args.account_switch_key, section=args.section, edgerc=args.edgerc, logger=logger)
+    tracker = BulkJobTracker(papi, account_folder, logger=logger).load()
+    if args.clear:
+        logger.warning(f'Removed {tracker.clear()} finished jobs')
+
+    pending = tracker.pending()
+    if pending:
+        logger.warning(f'Waiting for {len(pending)} jobs')
+        timeout = float(args.timeout) if args.timeout else TIMEOUT
+        for job in tracker.as_completed(pending, timeout=timeout):
+            logger.critical(f"{job['kind']:<20} {job['id']:<12} {job['label']:<40} {job['status']}")
+
+    df = tracker.to_dataframe()
+    if df.empty:
+        sys.exit(logger.info('no bulk job tracked'))
+    print()
+    print(tabulate(df, headers='keys', tablefmt='simple', showindex=False))
+
+
 def add_behavior_default_rule(logger, config: str, rule: dict,
                               desired_behavior: dict,
                               behavior_name: str,
@@ -3,21 +3,23 @@ from __future__ import annotations
 import re
 import subprocess
 import sys
-import time
 from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
 from akamai_api.cps import CpsWrapper
 from akamai_api.identity_access import IdentityAccessManagement
+from akamai_utils import checkpoint
 from akamai_utils import papi as p
-from ipwhois import IPWhois
+from akamai_utils import snapshot
+from akamai_utils.hostname_index import HostnameIndex
 from pandarallel import pandarallel
 from pytz import utc
 from rich import print_json
 from tabulate import tabulate
 from utils import files
-from utils import google_dns as gg
+from utils import resolver
+from utils.asn import AsnService
 from yaspin import yaspin
 from yaspin.spinners import Spinners
 
@@ -42,15 +44,36 @@ def audit(args, account_folder, logger):
     sheet = {}
     contract_data = []
     contract_host = []
+    hostname_index = None
+    asn_service = AsnService(table=args.asn_table, logger=logger)
     pandarallel.initialize(progress_bar=False, verbose=0)
 
+    # contracts finished by an interrupted run are rebuilt from the journal with --resume
+    journal = checkpoint.get_journal('certificate', scope=checkpoint.command_scope(args), logger=logger)
+    for contract_id in [x for x in contracts if journal.done(f'contract:{x}')]:
+        finished = journal.get(f'contract:{contract_id}')
+        contract_data.extend(pd.DataFrame(x) for x in finished['summary'])
+        contract_host.extend(pd.DataFrame(x) for x in finished['hostname'])
+    contracts = [x for x in contracts if not journal.done(f'contract:{x}')]
+
+    stored = snapshot.get_snapshot()
+    if stored:
+        listed = {x: (stored.enrollments.get(x, []), cps.enrollments_dataframe(x, stored.enrollments.get(x, []))) for x in contracts}
+    else:
+        listed = cps.list_enrollments_many(contracts)
+    selected = {}
+    # contracts with a failed listing or deployment lookup are reported but not journaled, --resume collects them again
+    failed = set()
     for contract_id in contracts:
         print()
         msg = f'Collect certificate for {contract_id=}'
-        _, df = cps.list_enrollments(contract_id)
+        enrollments, df = listed[contract_id]
 
         filtered = False
-        if df.empty:
+        if enrollments is None:
+            failed.add(contract_id)
+            logger.error(f'{msg} - unable to list enrollments')
+        elif df.empty:
             logger.warning(f'{msg} - found no certificate')
         else:
             logger.warning(f'{msg}')
@@ -79,7 +102,15 @@ def audit(args, account_folder, logger):
                 filtered = True
                 df = df[df['enrollment_id'].isin(csv_list)].copy()
                 df = df.reset_index(drop=True)
+        selected[contract_id] = (df, filtered)
+
+    # deployments of every selected enrollment in one concurrent pass, expiration_date below reads from it
+    deployments = cps.fetch_deployments([x for df, _ in selected.values() if not df.empty for x in df['enrollment_id']])
+    failed.update(x for x, (df, _) in selected.items() if not df.empty and any(deployments[y] is None for y in df['enrollment_id']))
 
+    for contract_id in contracts:
+        df, filtered = selected[contract_id]
+        summary_count, host_count = len(contract_data), len(contract_host)
         if not df.empty:
             if filtered is True:
                 logger.warning('Filter based on selected criteria')
@@ -96,14 +127,21 @@ def audit(args, account_folder, logger):
                     total = sum(df['hostname_count'])
 
                     logger.warning(f'Collecting CNAME for all {total:,} hosts, please be patient')
-                    hostname_df['cname'] = hostname_df['hostname'].parallel_apply(lambda x: gg.dnslookup(x, logger=logger) if x is not None else '')
+                    cnames = resolver.get_resolver().resolve_many(hostname_df['hostname'])
+                    hostname_df['cname'] = hostname_df['hostname'].map(lambda x: cnames.get(x, 'Wildcard') if x is not None else '')
 
                     logger.warning('Determine if CNAMEd to Akamai')
                     hostname_df['cname_to_akamai'] = hostname_df['cname'].parallel_apply(lambda x: 'True' if 'edgekey' in x or 'edgesuite' in x else '')
 
                     logger.warning('Determine if IP belongs to Akamai')
                     hostname_df['valid_ip'] = hostname_df.parallel_apply(lambda row: is_valid_ip(row['cname']), axis=1)
-                    hostname_df['ASN_Description'] = hostname_df.parallel_apply(lambda row: asn(row['cname'], logger=logger) if row['valid_ip'] is True else None, axis=1)
+                    descriptions = asn_service.describe_many(hostname_df.loc[hostname_df['valid_ip'].astype(bool), 'cname'])
+                    hostname_df['ASN_Description'] = hostname_df['cname'].map(descriptions).where(hostname_df['valid_ip'].astype(bool), None)
+
+                    logger.warning('Determine delivery property serving the hostname')
+                    if hostname_index is None:
+                        hostname_index = HostnameIndex(papi, logger=logger).build()
+                    hostname_df['propertyName'] = hostname_df['hostname'].map(hostname_index.property_name)
                     contract_host.append(hostname_df)
 
                 df['hostname_one_per_line'] = df['hostname'].parallel_apply(lambda x: '\n'.join(''.join(c) for c in x))
@@ -114,7 +152,7 @@ def audit(args, account_folder, logger):
                            'orgId', 'org', 'adminContact', 'techContact',
                            'common_name', 'expiration_date',
                            'hostname_count', 'hostname_one_per_line', 'hostname_with_ending_comma']
-                df['expiration_date'] = df['enrollment_id'].parallel_apply(lambda x: cps.certificate_expiration_date(x))
+                df['expiration_date'] = df['enrollment_id'].map(cps.certificate_expiration_date)
                 if args.expire is True:
                     filtered = True
                     filtered_df = df.copy()
@@ -138,6 +176,12 @@ def audit(args, account_folder, logger):
                 # sheet[f'summary_{contract_id}'] = df
                 # sheet[f'hostname_{contract_id}'] = hostname_df
 
+        if contract_id in failed:
+            logger.warning(f'{contract_id=} has failed lookups, not journaled')
+            continue
+        journal.record(f'contract:{contract_id}', {'summary': [journal.to_records(x) for x in contract_data[summary_count:]],
+                                                   'hostname': [journal.to_records(x) for x in contract_host[host_count:]]})
+
     if len(contract_data) > 0:
         sheet['summary'] = pd.concat(contract_data)
 
@@ -151,7 +195,7 @@ def audit(args, account_folder, logger):
             ip_df = ip_df.sort_values(by='cname')
             ip_df = ip_df.reset_index(drop=True)
             logger.debug(f'\n{ip_df}')
-            ip_df['ASN_Description'] = ip_df['cname'].parallel_apply(lambda x: asn(x, logger=logger))
+            ip_df['ASN_Description'] = ip_df['cname'].map(asn_service.describe_many(ip_df['cname']))
             sheet['ip'] = ip_df
 
     if sheet:
@@ -162,27 +206,3 @@ def audit(args, account_folder, logger):
 def is_valid_ip(ip: str):
     pattern = r'^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$'
     return re.match(pattern, ip) is not None
-
-
-def asn(ip, logger):
-    max_retries = 2
-    retry_delay = 1  # seconds
-
-    for attempt in range(max_retries):
-        try:
-            whois_info = IPWhois(ip).lookup_rdap()['asn_description']
-            logger.debug(f'{ip:<30} {whois_info:<20} {attempt}')
-            break
-        except Exception as e:
-            logger.debug(f'{ip:<30} RDAP lookup {attempt}')
-            time.sleep(retry_delay)
-    else:
-        try:
-            whois_info = IPWhois(ip).lookup_whois()['asn_description']
-            if whois_info is None:
-                whois_info = '_NOT FOUND'
-        except Exception as e:
-            logger.error(f'{ip:<30} WHOIS lookup {attempt}')
-            return '__NOT FOUND'
-
-    return whois_info
@@ -65,7 +65,12 @@ bulk = [{'name': 'search',
                                 {'name': 'normal', 'help': 'not using bulk', 'action': 'store_true', 'default': True},
                                 {'name': 'id', 'help': 'check progress based on bulk activate command', 'nargs': '+'},
                                 {'name': 'tag', 'help': 'tag output'}],
-         'optional_arguments': [{'name': 'output', 'help': '.xlsx output file'}]},
+         'optional_arguments': [{'name': 'output', 'help': '.xlsx output file'},
+                                {'name': 'wait', 'help': 'poll every property activation until it is active or failed', 'action': 'store_true'}]},
+        {'name': 'jobs',
+         'help': 'show bulk jobs started from this account and keep polling the unfinished ones',
+         'optional_arguments': [{'name': 'timeout', 'help': 'seconds to wait for unfinished jobs, default 3600'},
+                                {'name': 'clear', 'help': 'remove finished jobs', 'action': 'store_true'}]},
         ]
 
 delivery = [{'name': 'add-ehn',
@@ -173,6 +178,14 @@ security = [{'name': 'hostname',
                                     {'name': 'output', 'help': 'override excel output file (.xlsx)'},
                                     {'name': 'no-show', 'help': 'automatically open excel', 'action': 'store_true'},
                                     {'name': 'summary', 'help': 'only show account summary', 'action': 'store_true'}]
+             },
+            {'name': 'netlist',
+             'help': 'mirror network lists locally, only lists with a new syncPoint are downloaded, and find lists containing an IP/CIDR',
+             'optional_arguments': [{'name': 'ip', 'help': 'provide at least one IP address or CIDR', 'nargs': '+'},
+                                    {'name': 'input', 'help': '.txt file contains IP address or CIDR per line ie. origin or GTM IPs'},
+                                    {'name': 'concurrency', 'help': 'download X [numeric] network lists at a time', 'default': 5},
+                                    {'name': 'output', 'help': 'xlsx output file ie. netlist.xlsx'},
+                                    {'name': 'no-show', 'help': 'automatically open excel', 'action': 'store_true'}]
              }]
 
 diff = [{'name': 'behavior',
@@ -286,6 +299,14 @@ report = [{'name': 'list',
                                   {'name': 'product-id', 'help': 'product ID'}]}
          ]
 
+snapshot = [{'name': 'refresh',
+             'help': 'update the local account snapshot, only changed properties are fetched again',
+             'optional_arguments': [{'name': 'full', 'help': 'check the rule tree digest of every property', 'action': 'store_true'},
+                                    {'name': 'concurrency', 'help': 'process X [numeric] requests at a time', 'default': 10},
+                                    {'name': 'output', 'help': 'xlsx output file', 'default': 'snapshot_changes.xlsx'}]},
+            {'name': 'show',
+             'help': 'summary of the local account snapshot'}]
+
 main_commands = [{'diff': 'show compare report between two configurations. Both delivery and security configs are supported',
                   'required_arguments': [{'name': 'config1', 'help': 'config to compare', 'required': False}],
                   'optional_arguments': [{'name': 'xml', 'help': 'compare metadata', 'action': 'store_true'},
@@ -335,6 +356,7 @@ main_commands = [{'diff': 'show compare report between two configurations. Both
                                          {'name': 'authority', 'help': 'certificate authority ie. lets-encrypt, symantec, third-party',
                                           'choices': ['lets-encrypt', 'symantec', 'third-party', 'geotrust'], 'nargs': '+'},
                                          {'name': 'output', 'help': 'xlsx output file', 'default': 'certificate.xlsx'},
+                                         {'name': 'asn-table', 'help': 'offline prefix to ASN table, "prefix asn description" per line or iptoasn tsv'},
                                          {'name': 'show', 'help': 'automatically launch Microsoft Excel after (Mac OS Only)', 'action': 'store_true'}]},
                  {'gtm': 'list GTM report',
                   'optional_arguments': [{'name': 'output', 'help': 'output filename.extension ie akamai.xlsx'},
@@ -360,13 +382,15 @@ main_commands = [{'diff': 'show compare report between two configurations. Both
                                          {'name': 'table', 'help': 'display result as table', 'action': 'store_true'}
                                          ]},
                  {'self': 'verify api access'},
+                 {'snapshot': 'local account snapshot read by delivery, security, certificate and report with --snapshot'},
                  {'log': '(internal to Akamai employees only) review ghost logs, excel friendly ',
                   'required_arguments': [{'name': 'input', 'help': 'location of file ending with gz extension', 'required': False}],
                   'optional_arguments': [{'name': 'output', 'help': 'desired output excel file location', 'default': 'ghost_log.xlsx'},
                                          {'name': 'only', 'help': 'R or F', 'choices': ['R', 'F'], 'default': None},
                                          {'name': 'sample', 'help': 'sample size [numeric]', 'default': 0},
                                          {'name': 'column', 'help': 'filter column'},
-                                         {'name': 'valuecontains', 'help': 'search text', 'nargs': '+'}]},
+                                         {'name': 'valuecontains', 'help': 'search text', 'nargs': '+'},
+                                         {'name': 'fields', 'help': 'only parse and show these columns, ie. arl statuscode', 'nargs': '+'}]},
                  {'search': '(internal to Akamai employees only) lookup account key/account name',
                   'required_arguments': [{'name': 'account', 'help': 'keyword search at least 3 characters', 'nargs': '+', 'required': False},
                                          {'name': 'input', 'help': '.txt file contains account key per line', 'required': False},
@@ -383,4 +407,5 @@ sub_commands = {'delivery': delivery,
                 'mpulse': mpulse,
                 'report': report,
                 'cpcode': cpcode,
+                'snapshot': snapshot,
                 }
@@ -3,8 +3,8 @@ from __future__ import annotations
 import sys
 
 import pandas as pd
+from akamai_api.edge_auth import parallel_map
 from akamai_utils import cpcode as cp
-from pandarallel import pandarallel
 from rich import print_json
 from utils import files
 
@@ -74,8 +74,7 @@ def list_reporting_group(args, account_folder, logger):
 
     if not df.empty:
         if args.product:
-            pandarallel.initialize(progress_bar=False, verbose=0)
-            df['resp'] = df['reportingGroupId'].parallel_apply(lambda x: cpc.list_product_of_reporting_group(x))
+            df['resp'] = parallel_map(cpc.list_product_of_reporting_group, df['reportingGroupId'], progress='reporting group products')
             df['products'] = df['resp'].apply(lambda x: x.json()['products'] if x.ok else None)
             df['product_names'] = df['products'].apply(lambda x: [item['productName'] for item in x])
             df.drop(columns=['resp', 'products'], inplace=True)
@@ -8,7 +8,6 @@ import platform
 import re
 import subprocess
 import sys
-import time
 from datetime import datetime
 from pathlib import Path
 from subprocess import Popen
@@ -19,15 +18,17 @@ from time import strftime
 
 import numpy as np
 import pandas as pd
+from akamai_api.edge_auth import parallel_map
+from akamai_api.edge_auth import run_coroutines
+from akamai_utils import checkpoint
 from akamai_utils import cpcode as cp
 from akamai_utils import papi as p
 from akamai_utils import siteshield as ss
-from pandarallel import pandarallel
+from akamai_utils.bulk_tracker import BulkJobTracker
 from rich import print_json
 from rich.console import Console
 from rich.syntax import Syntax
 from tabulate import tabulate
-from utils import _logging as lg
 from utils import dataframe
 from utils import files
 from utils import ssl
@@ -53,46 +54,62 @@ def main(args, account_folder, logger):
         sys.exit(logger.error('Please reduce concurrency.  10 is the maximum value allowed'))
     papi = p.PapiWrapper(account_switch_key=args.account_switch_key, section=args.section, edgerc=args.edgerc, logger=logger)
     cpc = cp.CpCodeWrapper(account_switch_key=args.account_switch_key, section=args.section, edgerc=args.edgerc)
+    # groups and rule trees already collected by an interrupted run are read back with --resume
+    journal = checkpoint.get_journal('delivery', scope=checkpoint.command_scope(args), logger=logger)
     if args.behavior:
         original_behaviors = [x.lower() for x in args.behavior]
     sheet = {}
     if args.property:
         distinct_properties = list(set(sorted(args.property)))
-        all_properties = []
-        for i, property in enumerate(distinct_properties, 1):
-            status, resp = papi.search_property_by_name(property)
-            # print_json(data=resp)
+
+        async def search(i: int, property: str) -> tuple | None:
+            status, resp = await papi.async_search_property_by_name(property)
             if status != 200:
+                return None
+            # the property state set by the search is read before the next await
+            logger.debug(f'{papi.group_id} {papi.contract_id} {papi.property_id}')
+            latest, stg, prd = papi.property_version(resp, property_name=property, order=i)
+            return (papi.account_id, papi.contract_id, papi.group_id, property, papi.property_id, stg, prd) if latest > 0 else ()
+
+        all_properties = []
+        found = run_coroutines([search(i, property) for i, property in enumerate(distinct_properties, 1)])
+        for property, row in zip(distinct_properties, found):
+            if row is None:
                 logger.info(f'property {property:<50} not found')
                 break
-            else:
-                logger.debug(f'{papi.group_id} {papi.contract_id} {papi.property_id}')
-                latest, stg, prd = papi.property_version(resp, property_name=property, order=i)
-                if latest > 0:
-                    all_properties.append((papi.account_id, papi.contract_id, papi.group_id, property, papi.property_id, stg, prd))
+            if row:
+                all_properties.append(row)
 
         properties_df = pd.DataFrame(all_properties, columns=['accountId', 'contractId', 'groupId', 'propertyName', 'propertyId', 'stagingVersion', 'productionVersion'])
         properties_df['groupName'] = properties_df['groupId'].apply(lambda x: papi.get_group_name(x))
-        properties_df['latestVersion'] = properties_df['propertyId'].apply(lambda x: papi.get_property_version_latest(x)['latestVersion'])
-        properties_df['assetId'] = properties_df['propertyId'].apply(lambda x: papi.get_property_version_latest(x)['assetId'])
+        latest = properties_df['propertyId'].apply(lambda x: papi.get_property_version_latest(x))
+        properties_df['latestVersion'] = latest.apply(lambda x: x['latestVersion'])
+        properties_df['assetId'] = latest.apply(lambda x: x['assetId'])
+
+        def active_version(row) -> int:
+            return int(row['productionVersion']) if pd.notnull(row['productionVersion']) else row['latestVersion']
+
+        async def ruletree(row) -> dict:
+            # the version payload is shared with productId/ruleFormat and tells whether the rules can be cached
+            await papi.async_property_version_payload(row['propertyId'], active_version(row))
+            return await papi.async_get_property_ruletree(row['propertyId'], active_version(row))
+
+        # every lookup of every property is in flight on one event loop
+        logger.debug(' Collecting hostname, updatedDate, productId, ruleFormat and ruletree')
+        rows = properties_df.to_dict('records')
+        lookups = [papi.async_get_property_hostnames(row['propertyId']) for row in rows]
+        lookups.extend(papi.async_get_property_version_detail(row['propertyId'], row['latestVersion'], 'updatedDate') for row in rows)
+        lookups.extend(papi.async_get_property_version_detail(row['propertyId'], active_version(row), 'productId') for row in rows)
+        lookups.extend(papi.async_get_property_version_detail(row['propertyId'], active_version(row), 'ruleFormat') for row in rows)
+        lookups.extend(ruletree(row) for row in rows)
+        results = run_coroutines(lookups)
+        for i, column in enumerate(['hostname', 'updatedDate', 'productId', 'ruleFormat', 'ruletree']):
+            properties_df[column] = pd.Series(results[i * len(rows):(i + 1) * len(rows)], index=properties_df.index, dtype=object)
 
-        logger.debug(' Collecting hostname')
-        properties_df['hostname'] = properties_df[['propertyId']].apply(lambda x: papi.get_property_hostnames(*x), axis=1)
         properties_df['hostname_count'] = properties_df['hostname'].str.len()
         # show one hostname per list and remove list syntax
         properties_df['hostname'] = properties_df[['hostname']].apply(lambda x: ',\n'.join(x.iloc[0]) if not x.empty else '', axis=1)
 
-        logger.debug(' Collecting updatedDate')
-        properties_df['updatedDate'] = properties_df.apply(lambda row: papi.get_property_version_detail(row['propertyId'], row['latestVersion'], 'updatedDate'), axis=1)
-
-        logger.debug(' Collecting productId')
-        properties_df['productId'] = properties_df.apply(lambda row: papi.get_property_version_detail(
-            row['propertyId'], int(row['productionVersion']) if pd.notnull(row['productionVersion']) else row['latestVersion'], 'productId'), axis=1)
-
-        logger.debug(' Collecting ruleFormat')
-        properties_df['ruleFormat'] = properties_df.apply(lambda row: papi.get_property_version_detail(
-            row['propertyId'], int(row['productionVersion']) if pd.notnull(row['productionVersion']) else row['latestVersion'], 'ruleFormat'), axis=1)
-
         logger.debug(' Collecting property url')
         properties_df['propertyURL'] = properties_df.apply(lambda row: papi.property_url(row['assetId'], row['groupId']), axis=1)
         properties_df['url'] = properties_df.apply(lambda row: files.make_xlsx_hyperlink_to_external_link(row['propertyURL'], row['propertyName']), axis=1)
@@ -101,9 +118,6 @@ def main(args, account_folder, logger):
         properties_df = properties_df.rename(columns={'url': 'propertyName(hyperlink)'})  # show column with hyperlink instead
         properties_df = properties_df.rename(columns={'groupName_url': 'groupName'})  # show column with hyperlink instead
         properties_df = properties_df.sort_values(by=['groupName', 'propertyName'])
-        properties_df['ruletree'] = properties_df.apply(
-                        lambda row: papi.get_property_ruletree(row['propertyId'], int(row['productionVersion'])
-                                                            if pd.notnull(row['productionVersion']) else row['latestVersion']), axis=1)
         # properties.loc[pd.notnull(properties['cpcode_unique_value']) & (properties['cpcode_unique_value'] == ''), 'cpcode'] = '0'
 
         columns = ['groupId', 'contractId', 'propertyName', 'propertyId', 'latestVersion', 'stagingVersion', 'productionVersion',
@@ -111,10 +125,11 @@ def main(args, account_folder, logger):
         properties_df['propertyId'] = properties_df['propertyId'].astype(str)
 
         if args.behavior or args.criteria:
-            pandarallel.initialize(progress_bar=False, verbose=0)
+            properties_df = papi.check_rules(original_behaviors if args.behavior else [],
+                                             args.criteria if args.criteria else [],
+                                             properties_df, cpc)
 
         if args.behavior:
-            properties_df = papi.check_behavior(original_behaviors, properties_df, cpc)
             columns.extend(sorted(original_behaviors))
             if 'cpcode' in original_behaviors:
                 columns.remove('cpcode')
@@ -124,7 +139,6 @@ def main(args, account_folder, logger):
                 columns.extend(['origin_count', 'origin'])
 
         if args.criteria:
-            properties_df = papi.check_criteria(args.criteria, properties_df)
             columns.extend(sorted(args.criteria))
             if 'cloudletsOrigin' in args.criteria:
                 columns.remove('cloudletsOrigin')
@@ -211,15 +225,14 @@ def main(args, account_folder, logger):
             else:
                 logger.critical('collecting properties ruletree ...')
                 prop0 = perf_counter()
-                account_properties = papi.property_summary(group_df, concurrency)
+                account_properties = papi.property_summary(group_df, concurrency, journal=journal)
                 if len(account_properties) > 0:
                     df = pd.concat(account_properties, axis=0)
-                    df['ruletree'] = df.parallel_apply(
-                        lambda row: papi.get_property_ruletree(int(row['propertyId']),
-                                                                int(row['productionVersion'])
-                                                                if pd.notnull(row['productionVersion'])
-                                                                else row['latestVersion'],
-                                                                remove_tags=['uuid', 'templateLink']), axis=1)
+                    versions = df['productionVersion'].fillna(df['latestVersion']).astype(int)
+                    df['ruletree'] = journal.map(
+                        lambda x: papi.get_property_ruletree(int(x[0]), int(x[1]), remove_tags=['uuid', 'templateLink']),
+                        zip(df['propertyId'], versions), key=lambda x: f'ruletree:{x[0]}:{x[1]}',
+                        concurrency=concurrency, progress='property ruletree', valid=lambda x: x.get('rules') != '')
 
                     df = df.rename(columns={'url': 'propertyName(hyperlink)'})  # show column with hyperlink instead
                     df = df.rename(columns={'groupName_url': 'groupName'})  # show column with hyperlink instead
@@ -232,32 +245,27 @@ def main(args, account_folder, logger):
                                'productId', 'ruleFormat', 'hostname_count', 'hostname', 'ruletree',
                                'property_with_version', 'env']
 
-                    if args.criteria:
-                        print()
-                        msg = 'collecting criteria'
-                        logger.critical(f'{msg} ...')
-                        t0 = perf_counter()
-                        df = papi.check_criteria(args.criteria, df)
-                        columns.extend(sorted(args.criteria))
-                        if 'cloudletsOrigin' in args.criteria:
-                            columns.remove('cloudletsOrigin')
-                            columns.extend(['cloudletsOrigin_count', 'cloudletsOrigin'])
-                        t1 = perf_counter()
-                        logger.critical(f'{msg:<40} finished  {t1 - t0:.2f} seconds')
-
-                    if args.behavior:
+                    if args.behavior or args.criteria:
                         print()
-                        msg = 'collecting behaviors'
+                        msg = 'collecting behaviors and criteria'
                         logger.critical(f'{msg} ...')
                         t0 = perf_counter()
-                        df = papi.check_behavior(original_behaviors, df, cpc)
-                        columns.extend(sorted(original_behaviors))
-                        if 'cpcode' in original_behaviors:
-                            columns.remove('cpcode')
-                            columns.extend(['cpcode_count', 'cpcode', 'cpcode_name'])
-                        if 'origin' in original_behaviors:
-                            columns.remove('origin')
-                            columns.extend(['origin_count', 'origin'])
+                        df = papi.check_rules(original_behaviors if args.behavior else [],
+                                              args.criteria if args.criteria else [],
+                                              df, cpc)
+                        if args.criteria:
+                            columns.extend(sorted(args.criteria))
+                            if 'cloudletsOrigin' in args.criteria:
+                                columns.remove('cloudletsOrigin')
+                                columns.extend(['cloudletsOrigin_count', 'cloudletsOrigin'])
+                        if args.behavior:
+                            columns.extend(sorted(original_behaviors))
+                            if 'cpcode' in original_behaviors:
+                                columns.remove('cpcode')
+                                columns.extend(['cpcode_count', 'cpcode', 'cpcode_name'])
+                            if 'origin' in original_behaviors:
+                                columns.remove('origin')
+                                columns.extend(['origin_count', 'origin'])
                         t1 = perf_counter()
                         logger.critical(f'{msg:<40} finished  {t1 - t0:.2f} seconds')
 
@@ -265,8 +273,7 @@ def main(args, account_folder, logger):
                     df['propertyId'] = df['propertyId'].astype(str)  # for excel format
                     df = df[columns].copy()
                     df = df.reset_index(drop=True)
-                    df['hostname'] = df[['hostname']].parallel_apply(lambda x: dataframe.split_elements_newline(x[0])
-                                                        if len(x[0]) > 0 else '', axis=1)
+                    df['hostname'] = df['hostname'].map(lambda x: dataframe.split_elements_newline(x) if len(x) > 0 else '')
 
                     generic_columns = df.columns
                     main = ['accountId', 'contractId', 'groupId', 'propertyId', 'groupName', 'property_with_version',
@@ -373,14 +380,14 @@ def netstorage(args, account_folder, logger):
     if properties_df.empty:
         sys.exit()
 
-    pandarallel.initialize(progress_bar=False, verbose=0)
     papi = p.PapiWrapper(account_switch_key=args.account_switch_key, section=args.section, edgerc=args.edgerc, logger=logger)
     if 'ruletree' not in properties_df.columns:
-        properties_df['ruletree'] = properties_df.apply(lambda row: papi.get_property_ruletree(row['propertyId'], int(row['productionVersion'])
-                                                            if pd.notnull(row['productionVersion']) else row['latestVersion']), axis=1)
+        properties_df['ruletree'] = parallel_map(lambda row: papi.get_property_ruletree(row['propertyId'], int(row['productionVersion'])
+                                                 if pd.notnull(row['productionVersion']) else row['latestVersion']),
+                                                 properties_df.to_dict('records'), progress='ruletree')
 
     properties = properties_df[['propertyName', 'propertyId', 'productionVersion', 'latestVersion', 'ruletree']].copy()
-    properties['rules'] = properties['ruletree'].parallel_apply(lambda x: x['rules'])
+    properties['rules'] = properties['ruletree'].map(lambda x: x['rules'])
     property_name = properties['propertyName'].values
     logger.debug(property_name)
     rules = properties['rules'].values
@@ -474,14 +481,13 @@ def origin_certificate(args, account_folder, logger):
     if properties_df.empty:
         sys.exit()
 
-    pandarallel.initialize(progress_bar=False, verbose=0)
     properties = properties_df[['propertyName', 'propertyId', 'productionVersion', 'latestVersion']].copy()
     papi = p.PapiWrapper(account_switch_key=args.account_switch_key, section=args.section, edgerc=args.edgerc, logger=logger)
 
-    properties['rules'] = properties.parallel_apply(
+    properties['rules'] = parallel_map(
         lambda row: papi.get_property_ruletree(int(row['propertyId']),
                                                int(row['productionVersion']) if pd.notnull(row['productionVersion'])
-                                               else row['latestVersion'])['rules'], axis=1)
+                                               else row['latestVersion'])['rules'], properties.to_dict('records'), progress='ruletree')
     property_name = properties['propertyName'].values
     rules = properties['rules'].values
 
@@ -567,9 +573,14 @@ def origin_certificate(args, account_folder, logger):
         combined_df = combined_df[columns]
         combined_df['originSni_temp'] = combined_df['originSni'].map({'TRUE': True, 'FALSE': False})
 
-        # origin_df[['expired_date', 'PEM']] = origin_df.parallel_apply(lambda row: ssl.get_cert(row['hostname'], 443, row['originSni']), axis=1).apply(pd.Series)
-        combined_df[['expired_date', 'commonName', 'PEM']] = combined_df.apply(lambda row: ssl.get_cert(row['hostname'], 443, row['originSni_temp']), axis=1).apply(pd.Series)
-        columns = ['property', 'hostname', 'forwardHostHeader', 'originSni', 'expired_date', 'commonName', 'PEM', 'rule_path']
+        # the same origin is often used by many properties, each distinct (hostname, sni) is probed once
+        probe = ssl.CertificateProbe(logger=logger)
+        targets = list(zip(combined_df['hostname'], [443] * len(combined_df), combined_df['originSni_temp']))
+        probe.probe_many(targets)
+        certificates = pd.DataFrame([probe.probe(*x) for x in targets], index=combined_df.index)
+        certificates['subjectAltName'] = certificates['subjectAltName'].apply(lambda x: '\n'.join(x))
+        combined_df[['expired_date', 'commonName', 'subjectAltName', 'PEM']] = certificates[['expired_date', 'commonName', 'subjectAltName', 'PEM']]
+        columns = ['property', 'hostname', 'forwardHostHeader', 'originSni', 'expired_date', 'commonName', 'subjectAltName', 'PEM', 'rule_path']
         combined_df = combined_df.rename(columns={'path': 'rule_path'})
         combined_df['rule_path'] = combined_df.apply(lambda row: dataframe.split_elements_newline_withcomma(row['rule_path'])
                                                         if row['rule_path'] else '', axis=1)
@@ -596,16 +607,19 @@ def activate_from_excel(args, logger):
     logger.warning(f'Row count: {len(df)}')
     logger.warning(f'New activationId\n{df}')
 
-    active = pd.DataFrame()
-    while len(df) > len(active):
-        df['production_status'] = df[['propertyId', 'activationId', 'stagingVersion']].swifter.apply(lambda x: papi.activation_status(*x), axis=1)
-        active = df[df['production_status'] == 'ACTIVE'].copy()
-        print()
-        if len(df) == len(active):
-            logger.critical(f'Activation Completed\n{active}')
-        else:
-            logger.info(f'Activation In Progress\n{df}')
-            lg.countdown(60, msg='Checking again ... ')
+    # poll all activations together, each one backs off on its own and leaves the queue once final
+    tracker = BulkJobTracker(papi, logger=logger)
+    keys = [tracker.add('property_activation', activation_id, propertyId=property_id) if activation_id > 0 else None
+            for property_id, activation_id in zip(df['propertyId'], df['activationId'])]
+    jobs = tracker.wait([key for key in keys if key])
+    df['production_status'] = [jobs[key]['status'] if key in jobs else tracker.jobs[key]['status'] if key else ''
+                               for key in keys]
+    active = df[df['production_status'] == 'ACTIVE'].copy()
+    print()
+    if len(df) == len(active):
+        logger.critical(f'Activation Completed\n{active}')
+    else:
+        logger.warning(f'Activation not completed\n{df}')
 
 
 def activation_status(args, logger):
@@ -656,8 +670,8 @@ def activation_status(args, logger):
         else:
             subprocess.check_call(['open', '-a', 'Microsoft Excel', filepath])
     df = all_failed_configs
-    df['staging_status'] = df[['propertyId', 'staging_activation_id', 'new_version']].swifter.apply(lambda x: papi.activation_status(*x), axis=1)
-    df['production_status'] = df[['propertyId', 'production_activation_id', 'new_version']].swifter.apply(lambda x: papi.activation_status(*x), axis=1)
+    df['staging_status'] = parallel_map(lambda x: papi.activation_status(*x)[1], df[['propertyId', 'staging_activation_id', 'new_version']].values.tolist())
+    df['production_status'] = parallel_map(lambda x: papi.activation_status(*x)[1], df[['propertyId', 'production_activation_id', 'new_version']].values.tolist())
 
     columns = ['propertyName', 'propertyId', 'basedVersion', 'new_version', 'comment',
                'staging_activation_id', 'staging_status',
@@ -1059,7 +1073,8 @@ def get_property_advanced_behavior(args, account_folder, logger):
             if status != 200:
                 sys.exit(logger.error(f'{json["title"]}. please provide correct version'))
 
-        behaviors = papi.collect_property_behavior(property_name, json['rules'])
+        # one walk of the rule tree, custom behaviors are fetched once
+        behaviors, criteria, _ = papi.collect_property_rules(property_name, json['rules'])
         if len(behaviors) > 0:
             db = pd.DataFrame(behaviors)
             db = db[db['name'] == 'advanced'].copy()
@@ -1072,7 +1087,6 @@ def get_property_advanced_behavior(args, account_folder, logger):
             db = db[columns]
             options.append(db)
 
-        criteria = papi.collect_property_criteria(property_name, json['rules'])
         if len(criteria) > 0:
             dc = pd.DataFrame(criteria)
             dc = dc[dc['name'] == 'matchAdvanced'].copy()
@@ -1240,9 +1254,9 @@ def upgrade_ruleformat(args, account_folder, logger):
         sys.exit()
 
     papi = p.PapiWrapper(account_switch_key=args.account_switch_key, section=args.section, edgerc=args.edgerc, logger=logger)
-    pandarallel.initialize(progress_bar=False, nb_workers=5, verbose=0)
-    df['ruletree_get'] = df.parallel_apply(lambda row: papi.get_property_full_ruletree(row['propertyId'], int(row['productionVersion'])
-                                                                if pd.notnull(row['productionVersion']) else row['latestVersion']), axis=1)
+    df['ruletree_get'] = parallel_map(lambda row: papi.get_property_full_ruletree(row['propertyId'], int(row['productionVersion'])
+                                                            if pd.notnull(row['productionVersion']) else row['latestVersion']),
+                                      df.to_dict('records'), concurrency=5)
 
     def download_rule(property_name: str, comment: str, resp):
         errors = []
@@ -1256,24 +1270,28 @@ def upgrade_ruleformat(args, account_folder, logger):
             return filename, errors
         return '', errors
 
-    df[['json_loc', 'errors']] = df[['propertyName', 'ruletree_get']].parallel_apply(
+    df[['json_loc', 'errors']] = df[['propertyName', 'ruletree_get']].apply(
         lambda row: pd.Series(download_rule(row['propertyName'], args.comment, row['ruletree_get'])),
         axis=1)
     # cols = ['propertyName', 'json_loc', 'errors']
     logger.critical('create new version')
-    df['new_version'] = df[['propertyId', 'productionVersion']].parallel_apply(
+    df['new_version'] = parallel_map(
         lambda row: papi.create_new_property_version(row['propertyId'],  row['productionVersion']),
-        axis=1)
+        df.to_dict('records'), concurrency=5)
 
+    # wait until every new version can be read back instead of a fixed two minutes sleep
+    tracker = BulkJobTracker(papi, logger=logger)
+    keys = [tracker.add('property_version', version, propertyId=property_id)
+            for property_id, version in zip(df['propertyId'], df['new_version']) if version > 0]
+    tracker.wait(keys, timeout=300)
     logger.critical('update now')
-    time.sleep(120)
 
     # replace "useUniqueCacheKey": false,
     # with "tlsVersionTitle": "",
 
-    df['ruletree_load'] = df['json_loc'].parallel_apply(lambda x: files.load_json(x))
+    df['ruletree_load'] = df['json_loc'].apply(lambda x: files.load_json(x))
 
-    df['update_resp'] = df.parallel_apply(
+    df['update_resp'] = parallel_map(
         lambda row: papi.update_property_ruletree(row['propertyId'],
                                                   row['new_version'],  # use new_version if create new version
                                                   rule_format='latest',
@@ -1281,9 +1299,9 @@ def upgrade_ruleformat(args, account_folder, logger):
                                                   version_notes=args.comment,
                                                   group_id=row['groupId'],
                                                   contract_id=row['contractId']),
-        axis=1)
+        df.to_dict('records'), concurrency=5)
 
-    df['errors'] = df['update_resp'].parallel_apply(lambda x: x.json().get('errors', ''))
+    df['errors'] = df['update_resp'].apply(lambda x: x.json().get('errors', ''))
 
     cols = ['propertyName', 'propertyId', 'groupId', 'contractId', 'latestVersion',
             'updatedDate', 'ruletree_load', 'update_resp', 'errors']
@@ -1318,10 +1336,9 @@ def load_config_from_xlsx(papi, filepath: str, sheet_name: str | None = None, fi
 
 
 def add_group_url(df: pd.DataFrame, papi) -> pd.DataFrame:
-    pandarallel.initialize(progress_bar=False, nb_workers=5, verbose=0)
     df['accountId'] = papi.account_switch_key if papi.account_switch_key else papi.get_account_id()
-    df['groupURL'] = df.parallel_apply(lambda row: papi.group_url(row['groupId']), axis=1)
-    df['groupName_url'] = df.parallel_apply(lambda row: files.make_xlsx_hyperlink_to_external_link(row['groupURL'], row['propertyCount']) if row['propertyCount'] else '', axis=1)
+    df['groupURL'] = df.apply(lambda row: papi.group_url(row['groupId']), axis=1)
+    df['groupName_url'] = df.apply(lambda row: files.make_xlsx_hyperlink_to_external_link(row['groupURL'], row['propertyCount']) if row['propertyCount'] else '', axis=1)
     del df['groupURL']
     del df['propertyCount']
     df = df.rename(columns={'groupName_url': 'propertyCount'})  # show column with hyperlink instead
@@ -333,9 +333,10 @@ def compare_delivery_behaviors(args, logger):
     all_criteria = []
     all_criteria_condition = []
     for property_name, rule in prop.items():
-        all_behaviors.append(papi_rules.collect_property_behavior(property_name, rule))
-        all_criteria.append(papi_rules.collect_property_criteria(property_name, rule))
-        all_criteria_condition.append(papi_rules.collect_property_criteria_condition(property_name, rule))
+        behavior, criteria, criteria_condition = papi_rules.collect_property_rules(property_name, rule)
+        all_behaviors.append(behavior)
+        all_criteria.append(criteria)
+        all_criteria_condition.append(criteria_condition)
 
     db = pd.concat(all_behaviors)
     if args.behavior:
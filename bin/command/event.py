@@ -3,9 +3,9 @@ from __future__ import annotations
 import sys
 
 import pandas as pd
+from akamai_api.edge_auth import parallel_map
 from akamai_utils import cpcode as cp
 from akamai_utils import eventcenter as ec
-from pandarallel import pandarallel
 from rich import print_json
 from tabulate import tabulate
 from utils import files
@@ -52,8 +52,7 @@ def remove_event(args, logger):
 def get_event(args, account_folder, logger):
     account_switch_key, section, edgerc = args.account_switch_key, args.section, args.edgerc
     event = ec.EventCenterWrapper(account_switch_key=account_switch_key, section=section, edgerc=edgerc)
-    cpc = cp.CpCodeWrapper(account_switch_key=account_switch_key, section=section, edgerc=edgerc)
-    pandarallel.initialize(progress_bar=False, verbose=0)
+    cpc = cp.CpCodeWrapper(account_switch_key=account_switch_key, section=section, edgerc=edgerc, logger=logger)
 
     if args.id:
         all_ids = args.id
@@ -68,8 +67,8 @@ def get_event(args, account_folder, logger):
     logger.info(f'Processing total event id: {len(all_ids)}')
 
     df = pd.DataFrame(all_ids, columns=['eventcenter_id'])
-    df['resp'] = df['eventcenter_id'].parallel_apply(lambda x: event.get_event(x))
-    df['objects'] = df['resp'].parallel_apply(lambda x: x.json()['objects'] if x.ok else '')
+    df['resp'] = parallel_map(event.get_event, df['eventcenter_id'], progress='event detail')
+    df['objects'] = df['resp'].apply(lambda x: x.json()['objects'] if x.ok else '')
 
     df_exploded = df.explode('objects').reset_index(drop=True)
     df_exploded = pd.concat([df_exploded.drop(['objects'], axis=1), df_exploded['objects'].apply(pd.Series)], axis=1)
@@ -77,7 +76,7 @@ def get_event(args, account_folder, logger):
     df = df_exploded.rename(columns={'name': 'event_name'})
     logger.debug(f'\n{df}')
 
-    df['cpcode_name'] = df['cpCode'].parallel_apply(lambda x: cpc.get_cpcode_name(x))
+    df['cpcode_name'] = df['cpCode'].map(cpc.get_cpcode_name)
     df['cpCode'] = df['cpCode'].astype(str)
     df = df.sort_values(by=['event_name', 'cpcode_name'], key=lambda x: x.str.lower())
     df = df.reset_index(drop=True)
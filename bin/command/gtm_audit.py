@@ -7,8 +7,8 @@ import sys
 import numpy as np
 import pandas as pd
 import pydig
+from akamai_api.edge_auth import parallel_map
 from akamai_api.gtm import GtmWrapper
-from pandarallel import pandarallel
 from rich import print_json
 from utils import files
 
@@ -94,10 +94,10 @@ def audit(args, account_folder, logger):
     master_df = master_df[master_df['weight'] > 0].copy()
     master_df['servers'] = master_df['servers'].fillna(master_df['handoutCName'])
 
-    pandarallel.initialize(progress_bar=False, nb_workers=5, verbose=0)
-    master_df['datacenter'] = master_df.parallel_apply(lambda row: gtm.get_datacenter(row['Domain'], row['datacenterId']), axis=1)
-    master_df['datacenter'] = master_df['datacenter'].parallel_apply(get_nickname)
-    master_df['valid_ip'] = master_df['servers'].parallel_apply(validate_ip)
+    master_df['datacenter'] = parallel_map(lambda row: gtm.get_datacenter(row['Domain'], row['datacenterId']), master_df.to_dict('records'),
+                                           concurrency=5, progress='GTM datacenter')
+    master_df['datacenter'] = master_df['datacenter'].apply(get_nickname)
+    master_df['valid_ip'] = parallel_map(validate_ip, master_df['servers'], concurrency=5)
     master_df['gtm'] = master_df['Properties'] + '.' + master_df['Domain']
 
     sort_col_df = master_df[['gtm', 'Domain', 'Properties', 'Type', 'datacenter', 'weight', 'servers']]
@@ -2,13 +2,13 @@
 # https://docs.akamai.com/esp/user/edgesuite/log-format.xml
 from __future__ import annotations
 
+import gzip
 import logging
+import re
 import sys
 import warnings
 from urllib.parse import unquote
 
-import dask.bag as db
-import numpy as np
 import pandas as pd
 from akamai_utils import ghost_index as gh
 from utils import files
@@ -16,48 +16,33 @@ from utils import files
 
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 100_000  # parsed lines held as tuples before they become a DataFrame
+INDEX_FILES = {'r': 'config/ghost_r.txt', 'f': 'config/ghost_f.txt'}
+ESCAPE_COLUMNS = ['useragent', 'SNIservernamedata']
+SORT_COLUMNS = ['arl', 'starttime', 'ghostIP']
+
 
 def main(args, logger):
     if args.column and args.valuecontains is None:
         sys.exit(logger.error('At least one value is required for --value-contains'))
 
-    line_count = files.get_line_count(args.input)
-    logger.warning(f'Total {line_count:,} lines, please be patient') if line_count > 1000 else None
+    record_types = [args.only.lower()] if args.only else ['r', 'f']
+    result = process_log(args.input, record_types,
+                         column=args.column,
+                         search_keyword=args.valuecontains,
+                         fields=args.fields,
+                         sample=int(args.sample),
+                         logger=logger)
 
-    filtered_column, valuecontains, sample = args.column, args.valuecontains, int(args.sample)
     sheet = {}
     alls = []
-
-    if args.only == 'R':
-        r_df, _ = process_line(args.input, record_type='r', column=filtered_column, search_keyword=valuecontains, sample=sample, logger=logger)
-        line_count = len(r_df.index)
-        if len(r_df.index) > 1:
-            sheet['R'] = r_df
-            alls.append(r_df)
-        else:
-            logger.warning('No r/R line found')
-    elif args.only == 'F':
-        f_df, _ = process_line(args.input, record_type='f', column=filtered_column, search_keyword=valuecontains, sample=sample, logger=logger)
-        if len(f_df.index) > 0:
-            sheet['F'] = f_df
-            alls.append(f_df)
-        else:
-            logger.warning('No f/F line found')
-    else:
-        r_df, _ = process_line(args.input, record_type='r', column=filtered_column, search_keyword=valuecontains, sample=sample, logger=logger)
-        line_count = len(r_df.index)
-        if len(r_df.index) > 0:
-            sheet['R'] = r_df
-            alls.append(r_df)
+    for record_type in record_types:
+        df = result[record_type]
+        if len(df.index) > 0:
+            sheet[record_type.upper()] = df
+            alls.append(df)
         else:
-            logger.warning('No r/R line found')
-
-        f_df, _ = process_line(args.input, record_type='f', column=filtered_column, search_keyword=valuecontains, sample=sample, logger=logger)
-        if len(f_df.index) > 0:
-            sheet['F'] = f_df
-            alls.append(f_df)
-        else:
-            logger.warning('No f/F line found')
+            logger.warning(f'No {record_type}/{record_type.upper()} line found')
 
     keys = sheet.keys()
     if len(keys) > 0:
@@ -69,75 +54,131 @@ def main(args, logger):
         files.open_excel_application(filepath, True, pd.concat(alls))
 
 
-def process_line(filename: str,
-                 record_type: str,
+class GhostLineParser:
+    '''
+    Split only the fields needed for the --column filter and the output of one record type,
+    and turn bounded chunks of parsed lines into DataFrames
+    '''
+    def __init__(self, record_type: str,
                  column: str | None = None,
-                 search_keyword: list | None = None,
-                 sample: int | None = 0,
-                 logger=None) -> tuple:
-
-    if record_type == 'r':
-        columns, rec_dict = gh.build_ghost_log_index('config/ghost_r.txt', logger)
-    elif record_type == 'f':
-        columns, rec_dict = gh.build_ghost_log_index('config/ghost_f.txt', logger)
-
-    try:
-        rec_dict[-1] = 'GMT'
-        logger.warning(f'checking {record_type} line')
-        bag = db.read_text(filename, compression='gzip')
-    except:
-        return pd.DataFrame(), pd.DataFrame()
-
-    if sample > 0:
-        bag_head = bag.take(sample)
-        if record_type == 'r':
-            processed_lines = [filter_r_line(line) for line in bag_head if filter_r_line(line) is not None]
-        elif record_type == 'f':
-            processed_lines = [filter_f_line(line) for line in bag_head if filter_f_line(line) is not None]
-        else:
-            pass
-        ddf = db.from_sequence(processed_lines).to_dataframe(columns=columns)
-    else:
-        if record_type == 'r':
-            processed_bag = bag.map(filter_r_line).filter(lambda x: x is not None)
-        elif record_type == 'f':
-            processed_bag = bag.map(filter_f_line).filter(lambda x: x is not None)
+                 fields: list[str] | None = None,
+                 logger=None):
+        self.record_type = record_type
+        self.logger = logger
+        self.columns, self.record = gh.build_ghost_log_index(INDEX_FILES[record_type], logger)
+        self.record[-1] = 'GMT'
+        self.trailing = 2 if record_type == 'r' else 0  # r line ends with 2 fields not in the format specification
+
+        self.column_index = self.columns.index(column) if column in self.columns else None
+        if column and self.column_index is None:
+            logger.warning(f'{column} is not a {record_type} line column')
+
+        if fields:
+            unknown = sorted(set(fields) - set(self.columns))
+            if unknown:
+                logger.debug(f'{record_type} line does not have {unknown}')
+            keep = set(fields) | set(SORT_COLUMNS) | {column}
+            self.indexes = [i for i, name in enumerate(self.columns) if name in keep]
+            self.maxsplit = max(self.indexes) + 1
         else:
-            pass
-        ddf = processed_bag.to_dataframe(columns=columns)
-
-    df = ddf.compute()
-    df['starttime'] = pd.to_numeric(df['starttime'], errors='coerce')
-    df['GMT'] = pd.to_datetime(df['starttime'], unit='s', utc=True)
-    df['GMT'] = pd.to_datetime(df.GMT).dt.tz_localize(None)
-
-    escape_columns = ['useragent', 'SNIservernamedata']
-    for col in list(df.columns):
-        if col in escape_columns:
-            df[col] = df[col].apply(unquote)
-
+            self.indexes = list(range(len(self.columns)))
+            self.maxsplit = -1
+        self.names = [self.columns[i] for i in self.indexes]
+        self.filtered = column is not None
+
+    def parse(self, line: str, pattern: re.Pattern | None = None) -> tuple | None:
+        values = line.strip().split(' ', self.maxsplit)
+        if self.maxsplit < 0:
+            values = values[:len(values) - self.trailing]
+
+        if self.filtered:
+            if self.column_index is None or self.column_index >= len(values):
+                return None
+            value = values[self.column_index]
+            if self.columns[self.column_index] in ESCAPE_COLUMNS:
+                value = unquote(value)
+            if pattern and not pattern.search(value):
+                return None
+        return tuple(values[i] if i < len(values) else None for i in self.indexes)
+
+    def to_dataframe(self, rows: list[tuple]) -> pd.DataFrame:
+        df = pd.DataFrame(rows, columns=self.names)
+        for col in ESCAPE_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].apply(lambda x: unquote(x) if isinstance(x, str) else x)
+        df['starttime'] = pd.to_numeric(df['starttime'], errors='coerce')
+        df['GMT'] = pd.to_datetime(df['starttime'], unit='s', utc=True).dt.tz_localize(None)
+        return df
+
+    def finish(self, chunks: list[pd.DataFrame]) -> pd.DataFrame:
+        if len(chunks) == 0:
+            return pd.DataFrame()
+        df = pd.concat(chunks, ignore_index=True)
+        if self.filtered:
+            df = df.sort_values(by=[col for col in SORT_COLUMNS if col in df.columns])
+            df = df.reset_index(drop=True)
+            line_count = len(df.index)
+            if line_count > 1:
+                self.logger.warning(f'Total {line_count:,} {self.record_type} lines after filter')
+        return build_header_line(df, self.record, self.record_type, logger=self.logger)
+
+
+def process_log(filename: str,
+                record_types: list[str],
+                column: str | None = None,
+                search_keyword: list | None = None,
+                fields: list[str] | None = None,
+                sample: int | None = 0,
+                logger=None) -> dict[str, pd.DataFrame]:
+    '''
+    Single streaming pass over the gzip log for every record type,
+    lines without the search keyword are dropped before any field is split
+    '''
+    parsers = {record_type: GhostLineParser(record_type, column, fields, logger) for record_type in record_types}
+    rows = {record_type: [] for record_type in record_types}
+    chunks = {record_type: [] for record_type in record_types}
+    pattern = re.compile('|'.join(search_keyword)) if search_keyword else None
+    if pattern:
+        logger.warning(f'Filtered {column if column else "all"} values: {search_keyword}')
+
+    total = 0
+    try:
+        with gzip.open(filename, 'rt', errors='replace') as f:
+            for line in f:
+                total += 1
+                if sample and total > sample:
+                    total -= 1
+                    break
+                if total % 1_000_000 == 0:
+                    logger.warning(f'{total:,} lines read')
+
+                # record type is the second field, ie. "1.2.3.4 r 1700000000.123 ..."
+                first = line.find(' ')
+                record_type = line[first + 1:first + 2].lower()
+                if record_type not in parsers or line[first + 2:first + 3] != ' ':
+                    continue
+                if pattern and not (pattern.search(line) or ('%' in line and pattern.search(unquote(line)))):
+                    continue
+
+                row = parsers[record_type].parse(line, pattern)
+                if row is None:
+                    continue
+                rows[record_type].append(row)
+                if len(rows[record_type]) >= CHUNK_SIZE:
+                    chunks[record_type].append(parsers[record_type].to_dataframe(rows[record_type]))
+                    rows[record_type] = []
+    except (OSError, EOFError) as e:
+        logger.error(f'unable to read {filename} {e}')
+        return {record_type: pd.DataFrame() for record_type in record_types}
+
+    logger.warning(f'Total {total:,} lines')
     pd.options.mode.chained_assignment = None
-    df = df.reset_index(drop=True)
-
-    # find search filter in all columns, not column specific
-    if column is None and search_keyword:
-        mask = np.column_stack([df[col].astype(str).str.contains(f'{search_keyword}', na=False) for col in df])
-        sdf = df.loc[mask.any(axis=1)]
-        logger.warning(sdf.shape)
-
-    # search based on column and value
-    if column and search_keyword:
-        logger.warning(f'Filtered {column} values: {search_keyword}')
-        df[column] = df[column].astype(str)
-        df = df[df[column].str.contains('|'.join(search_keyword))].copy()
-        df = df.sort_values(by=['arl', 'starttime', 'ghostIP']).copy()
-        df = df.reset_index(drop=True)
-        line_count = len(df.index)
-        if line_count > 1:
-            logger.warning(f'Total {line_count:,} lines after filter')
-
-    df_filtered = build_header_line(df, rec_dict, record_type, logger=logger)
-    return df_filtered, None
+    result = {}
+    for record_type, parser in parsers.items():
+        if rows[record_type]:
+            chunks[record_type].append(parser.to_dataframe(rows[record_type]))
+        result[record_type] = parser.finish(chunks[record_type])
+    return result
 
 
 def build_header_line(df: pd.Dataframe, record: dict, record_type: str, logger=None) -> pd.DataFrame:
@@ -179,18 +220,6 @@ def build_header_line(df: pd.Dataframe, record: dict, record_type: str, logger=N
     return df_filtered
 
 
-def filter_r_line(line):
-    values = line.strip().split(' ')
-    if values[1] in ['r', 'R']:
-        return tuple(values[:-2])
-
-
-def filter_f_line(line):
-    values = line.strip().split(' ')
-    if values[1] in ['f', 'F']:
-        return tuple(values)
-
-
 def foo():
     pass
     # TODO add tab to store unique values for some fields
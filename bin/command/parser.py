@@ -72,6 +72,44 @@ class AkamaiParser(argparse.ArgumentParser):
                               default='info',
                               help='Set the log level. Too noisy, increase to warning',
                              )
+        parser.add_argument('--connect-timeout',
+                            metavar='', type=float, dest='connect_timeout', default=10,
+                            help='seconds to wait for a connection to the API host')
+        parser.add_argument('--read-timeout',
+                            metavar='', type=float, dest='read_timeout', default=120,
+                            help='seconds to wait for an API response')
+        parser.add_argument('--no-keep-alive',
+                            action='store_true', dest='no_keep_alive',
+                            help='close API connections after every request')
+        parser.add_argument('--no-cache',
+                            action='store_true', dest='no_cache',
+                            help='do not read or write the local response cache for property versions')
+        parser.add_argument('--refresh',
+                            action='store_true', dest='refresh',
+                            help='ignore cached responses and fetch property versions again')
+        parser.add_argument('--snapshot',
+                            action='store_true', dest='snapshot',
+                            help='read groups, properties, hostnames, security configs and enrollments from the local account snapshot')
+        parser.add_argument('--resume',
+                            action='store_true', dest='resume',
+                            help='continue an interrupted run from output/<account>/checkpoint, finished units are not fetched again')
+        parser.add_argument('--format',
+                            choices=['xlsx', 'parquet', 'arrow', 'csv', 'jsonl'],
+                            dest='output_format', default='xlsx',
+                            help='output file format, non excel formats write one file per sheet')
+        parser.add_argument('--constant-memory',
+                            action='store_true', dest='constant_memory',
+                            help='write excel output row by row, large workbooks switch to it automatically')
+
+        parser.add_argument('--dns-backend',
+                            choices=['doh', 'system', 'server'], dest='dns_backend', default=None,
+                            help='resolver for hostname lookups, DNS over HTTPS by default')
+        parser.add_argument('--dns-server',
+                            metavar='', type=str, dest='dns_server',
+                            help='DNS server ip[:port] or DNS over HTTPS url for hostname lookups')
+        parser.add_argument('--dns-concurrency',
+                            metavar='', type=int, dest='dns_concurrency', default=50,
+                            help='maximum DNS queries in flight')
 
         subparsers = parser.add_subparsers(title='commands', metavar='', dest='command')
 
@@ -9,12 +9,13 @@ import urllib
 from pathlib import Path
 
 import pandas as pd
+from akamai_api.edge_auth import parallel_map
 from akamai_api.identity_access import IdentityAccessManagement
-from akamai_api.papi import Papi
 from akamai_api.reporting import Reporting
 from akamai_utils import cpcode as cp
+from akamai_utils import papi as p
 from akamai_utils import reporting
-from pandarallel import pandarallel
+from akamai_utils.hostname_index import HostnameIndex
 from rich import print_json
 from rich.console import Console
 from rich.table import Table
@@ -80,7 +81,7 @@ def all_reports(args, account_folder, logger):
 def offload_by_hostname(args, account_folder, logger):
     account_switch_key, section, edgerc = args.account_switch_key, args.section, args.edgerc
     rpt = Reporting(account_switch_key=account_switch_key, section=section, edgerc=edgerc, logger=logger)
-    papi = Papi(account_switch_key=account_switch_key, section=section, edgerc=edgerc, logger=logger)
+    papi = p.PapiWrapper(account_switch_key=account_switch_key, section=section, edgerc=edgerc, logger=logger)
     start, end = reporting.get_start_end(args.interval, int(args.last), logger=logger)
     data = rpt.hits_by_hostname(start, end)
 
@@ -88,8 +89,8 @@ def offload_by_hostname(args, account_folder, logger):
     df['edgeHits'] = df['edgeHits'].astype(int)
 
     logger.warning('Looking property by hostname ...')
-    pandarallel.initialize(progress_bar=True)
-    df['property_name'] = df['hostname'].parallel_apply(lambda x: papi.search_property_by_hostname(x))
+    index = HostnameIndex(papi, logger=logger).build()
+    df['property_name'] = df['hostname'].map(index.property_name)
     stat_df = df.groupby(['property_name']).sum()
     flat_data = stat_df.reset_index()
     stat_df = flat_data[['property_name', 'edgeHits']]
@@ -160,17 +161,16 @@ def traffic_by_response_class(args, account_folder, logger):
         sys.exit(logger.error('Please use either --file or --cpcode, not both'))
 
     start, end = reporting.get_start_end(args.interval, int(args.last), logger=logger)
-    # use parallel_apply
     concurrency = int(args.concurrency)
     if concurrency > 5:
         logger.critical('This API has limit of 25 request per minute')
         logger.critical(f'Reduce concurrenct from {concurrency} to 5')
         concurrency = 5
-    pandarallel.initialize(progress_bar=True, nb_workers=concurrency, verbose=0)
 
     if args.cpcode:
         df = pd.DataFrame({'cpcode': args.cpcode})
-        df['api'] = df['cpcode'].parallel_apply(lambda x: rpt.traffic_by_response_class(start, end, args.interval, x))
+        df['api'] = parallel_map(lambda x: rpt.traffic_by_response_class(start, end, args.interval, x), df['cpcode'],
+                                 concurrency=concurrency, progress='traffic by response class')
         original_cpcode = df['cpcode'].unique()
     elif args.file:
         sample = int(args.sample) if args.sample else None
@@ -180,7 +180,8 @@ def traffic_by_response_class(args, account_folder, logger):
         df = df.sort_values(by='cpcode')
         df = df.reset_index(drop=True)
         logger.warning(f'\n{df}')
-        df['api'] = df['cpcode'].parallel_apply(lambda x: rpt.traffic_by_response_class(start, end, args.interval, x))
+        df['api'] = parallel_map(lambda x: rpt.traffic_by_response_class(start, end, args.interval, x), df['cpcode'],
+                                 concurrency=concurrency, progress='traffic by response class')
     else:
         cpcodes = rpt.traffic_by_response_class(start, end, args.interval)['metadata']['objectIds']
         original_cpcode = list(set(cpcodes))
@@ -188,7 +189,8 @@ def traffic_by_response_class(args, account_folder, logger):
         df = pd.DataFrame({'cpcode': cpcodes})
         if args.sample:
             df = df.head(int(args.sample))
-        df['api'] = df['cpcode'].parallel_apply(lambda x: rpt.traffic_by_response_class(start, end, args.interval, x))
+        df['api'] = parallel_map(lambda x: rpt.traffic_by_response_class(start, end, args.interval, x), df['cpcode'],
+                                 concurrency=concurrency, progress='traffic by response class')
 
     sheet = {}
     all_df = df.copy()
@@ -214,9 +216,8 @@ def traffic_by_response_class(args, account_folder, logger):
     print()
     logger.warning('Collecting cpcode name')
     logger.debug(f'\n{pivot_df}')
-    pandarallel.initialize(progress_bar=False, verbose=0)
-    cpc = cp.CpCodeWrapper(account_switch_key=args.account_switch_key)
-    pivot_df['cpcode_name'] = pivot_df['cpcode'].parallel_apply(lambda x: cpc.get_cpcode_name(x))
+    cpc = cp.CpCodeWrapper(account_switch_key=account_switch_key, section=section, edgerc=edgerc, logger=logger)
+    pivot_df['cpcode_name'] = pivot_df['cpcode'].map(cpc.get_cpcode_name)
 
     '''
     # layout 2
@@ -235,7 +236,7 @@ def traffic_by_response_class(args, account_folder, logger):
         diff_df = pd.DataFrame(diff, columns=['cpcode'])
         diff_df = diff_df.sort_values(by='cpcode')
         diff_df = diff_df.reset_index(drop=True)
-        diff_df['cpcode_name'] = diff_df['cpcode'].parallel_apply(lambda x: cpc.get_cpcode_name(x))
+        diff_df['cpcode_name'] = diff_df['cpcode'].map(cpc.get_cpcode_name)
 
     columns = list(pivot_df.columns)
     columns.remove('cpcode')
@@ -7,8 +7,11 @@ import sys
 from pathlib import Path
 
 import pandas as pd
+from akamai_api.edge_auth import parallel_map
 from akamai_utils import appsec as sec
 from akamai_utils import papi as p
+from akamai_utils.hostname_index import HostnameIndex
+from akamai_utils.network_mirror import NetworkListMirror
 from rich import print_json
 from tabulate import tabulate
 from utils import _logging as lg
@@ -75,155 +78,196 @@ def list_config(args, account_folder, logger):
         if notfound_configs:
             logger.error(f'{notfound_configs} not found.  You need to provide an exact spelling')
 
-    all_files = []
-    all_excels = []
-    counter = 0
-    if args.config is None:
-        logger.critical('Please provide at least one configName using --config')
-    else:
-        for _, row in good_df.iterrows():
-            if row['productionVersion'] == 0:
-                status, policy = appsec.get_config_version_detail(row['configId'], row['latestVersion'])
-            else:
-                status, policy = appsec.get_config_version_detail(row['configId'], row['productionVersion'])
+    def export_config(row: dict) -> tuple | None:
+        # fetch and flatten one configuration, network lists are shared through the wrapper memo
+        version = row['latestVersion'] if row['productionVersion'] == 0 else row['productionVersion']
+        status, policy = appsec.get_config_version_detail(row['configId'], version)
+        if status != 200:
+            logger.error(f"{row['configId']}  {status} {row['productionVersion']} {row['latestVersion']}")
+            return None
+
+        policy_name = policy['configName'].replace(' ', '')
+        policy_name = policy_name.replace('/', '')
+        filepath = f'{account_folder}/{policy_name}.xlsx' if args.output is None else f'output/{args.output}'
+        files.write_json(f'{account_folder}/{policy_name}.json', policy)
+
+        sheet = {}
+        advanced = []
+        try:
+            mdf = pd.json_normalize(policy['siem'])
+            mdf.index = pd.Index(['value'])
+            mdf = mdf.T
+            mdf = mdf.reset_index()
+            mdf = mdf.rename(columns={'index': 'title'})
+            mdf['key'] = 'siem'
+            advanced.append(mdf)
+        except:
+            pass
+
+        tdf = pd.json_normalize(policy['advancedOptions'])
+        tdf.index = pd.Index(['value'])
+        tdf = tdf.T
+        tdf = tdf.reset_index()
+        tdf = tdf.rename(columns={'index': 'title'})
+        tdf['key'] = 'advancedOptions'
+        advanced.append(tdf)
+
+        try:
+            sdf = pd.json_normalize(policy['advancedSettings'])
+            sdf.index = pd.Index(['value'])
+            sdf = sdf.T
+            sdf = sdf.reset_index()
+            sdf = sdf.rename(columns={'index': 'title'})
+            sdf['key'] = 'advancedSettings'
+            advanced.append(sdf)
+        except:
+            pass
+
+        df = pd.concat(advanced, axis=0)
+        sheet['advanced'] = df[['key', 'title', 'value']]
+
+        all_hosts = []
+        selectableHosts_df = pd.DataFrame(policy['selectableHosts'], columns=['selectableHosts'])
+        selectableHosts_df = selectableHosts_df.sort_values(by='selectableHosts').copy()
+        selectableHosts_df = selectableHosts_df.reset_index(drop=True)
+        all_hosts.append(selectableHosts_df)
+        selectedHosts_df = pd.DataFrame(policy['selectedHosts'], columns=['selectedHosts'])
+        selectedHosts_df = selectedHosts_df.sort_values(by='selectedHosts').copy()
+        selectedHosts_df = selectedHosts_df.reset_index(drop=True)
+        all_hosts.append(selectedHosts_df)
+
+        try:
+            errorHosts_df = pd.DataFrame(policy['errorHosts'])
+            errorHosts_df = errorHosts_df.rename(columns={'hostname': 'errorHosts'})
+            errorHosts_df = errorHosts_df.sort_values(by='errorHosts')
+            errorHosts_df = errorHosts_df['errorHosts']
+            all_hosts.append(errorHosts_df)
+        except:
+            pass
+
+        sheet['hosts'] = pd.concat(all_hosts, axis=1)
+        sheet['securityPolicies'] = pd.json_normalize(policy['securityPolicies'])
+
+        try:
+            sheet['matchTargets'] = bot.process_matchTargets(policy['matchTargets']['websiteTargets'], network)
+        except:
+            feature = 'matchTargets'
+            logger.critical(f"{row['configName']:<40} {feature:<40} no data")
+
+        try:
+            df = bot.process_custom_bot(policy['customDefinedBots'], network)
+            if not df.empty:
+                sheet['customDefinedBots'] = df
+        except:
+            feature = 'customDefinedBots'
+            logger.critical(f"{row['configName']:<40} {feature:<40} no data")
+
+        df = bot.process_custom_deny_list(policy['customDenyList'])
+        if not df.empty:
+            sheet['customDenyList'] = df
+
+        df = bot.process_custom_rules(policy['customRules'])
+        if not df.empty:
+            sheet['customRules'] = df
+
+        rate_policy = bot.process_rate_policies(policy['ratePolicies'], network)
+        if len(rate_policy) > 0:
+            sheet['ratePolicies'] = rate_policy
+
+        _, _, response_action_df = bot.process_response_actions(policy['responseActions'], network)
+        if not response_action_df.empty:
+            sheet['responseActions'] = response_action_df
+        else:
+            feature = 'responseActions'
+            logger.critical(f"{row['configName']:<40} {feature:<40} no data")
 
-            if status != 200:
-                logger.error(f"{row['configId']}  {status} {row['productionVersion']} {row['latestVersion']}")
-                break
+        if len(policy['rulesets']) > 0:
+            sheet['rulesets'], sheet['rulesets_attackgroup'] = bot.process_rulesets(policy['rulesets'])
+        else:
+            feature = 'rulesets'
+            logger.critical(f"{row['configName']:<40} {feature:<40} no data")
 
-            policy_name = policy['configName'].replace(' ', '')
-            policy_name = policy_name.replace('/', '')
-            filepath = f'{account_folder}/{policy_name}.xlsx' if args.output is None else f'output/{args.output}'
-            files.write_json(f'{account_folder}/{policy_name}.json', policy)
+        try:
+            sheet['reputationProfiles'] = bot.process_reputation_profiles(policy['reputationProfiles'], network)
+        except:
+            feature = 'reputationProfiles'
+            logger.critical(f"{row['configName']:<40} {feature:<40} no data")
 
-            print()
-            counter += 1
-            logger.warning(f"config no. {counter:<4}'{row['configName']}'")
-            summary = ['configId', 'configName', 'version', 'basedOn',
-                    'staging.status', 'production.status', 'createdBy', 'versionNotes']
-            if 'versionNotes' not in policy.keys():
-                summary.remove('versionNotes')
-            if 'basedOn' not in policy.keys():
-                summary.remove('basedOn')
-
-            df = pd.json_normalize(policy)
-            df.index = df.index + 1
-            logger.debug(df.columns.values)
-            print(tabulate(df[summary], headers=summary, tablefmt='simple', numalign='center', showindex=False, maxcolwidths=50))
-
-            sheet = {}
-            advanced = []
-            try:
-                mdf = pd.json_normalize(policy['siem'])
-                mdf.index = pd.Index(['value'])
-                mdf = mdf.T
-                mdf = mdf.reset_index()
-                mdf = mdf.rename(columns={'index': 'title'})
-                mdf['key'] = 'siem'
-                advanced.append(mdf)
-            except:
-                pass
-
-            tdf = pd.json_normalize(policy['advancedOptions'])
-            tdf.index = pd.Index(['value'])
-            tdf = tdf.T
-            tdf = tdf.reset_index()
-            tdf = tdf.rename(columns={'index': 'title'})
-            tdf['key'] = 'advancedOptions'
-            advanced.append(tdf)
-
-            try:
-                sdf = pd.json_normalize(policy['advancedSettings'])
-                sdf.index = pd.Index(['value'])
-                sdf = sdf.T
-                sdf = sdf.reset_index()
-                sdf = sdf.rename(columns={'index': 'title'})
-                sdf['key'] = 'advancedSettings'
-                advanced.append(sdf)
-            except:
-                pass
-
-            df = pd.concat(advanced, axis=0)
-            sheet['advanced'] = df[['key', 'title', 'value']]
-
-            all_hosts = []
-            selectableHosts_df = pd.DataFrame(policy['selectableHosts'], columns=['selectableHosts'])
-            selectableHosts_df = selectableHosts_df.sort_values(by='selectableHosts').copy()
-            selectableHosts_df = selectableHosts_df.reset_index(drop=True)
-            all_hosts.append(selectableHosts_df)
-            selectedHosts_df = pd.DataFrame(policy['selectedHosts'], columns=['selectedHosts'])
-            selectedHosts_df = selectedHosts_df.sort_values(by='selectedHosts').copy()
-            selectedHosts_df = selectedHosts_df.reset_index(drop=True)
-            all_hosts.append(selectedHosts_df)
-
-            try:
-                errorHosts_df = pd.DataFrame(policy['errorHosts'])
-                errorHosts_df = errorHosts_df.rename(columns={'hostname': 'errorHosts'})
-                errorHosts_df = errorHosts_df.sort_values(by='errorHosts')
-                errorHosts_df = errorHosts_df['errorHosts']
-                all_hosts.append(errorHosts_df)
-            except:
-                pass
-
-            sheet['hosts'] = pd.concat(all_hosts, axis=1)
-            sheet['securityPolicies'] = pd.json_normalize(policy['securityPolicies'])
-
-            try:
-                sheet['matchTargets'] = bot.process_matchTargets(policy['matchTargets']['websiteTargets'], network)
-            except:
-                feature = 'matchTargets'
-                logger.critical(f'{feature:<40} no data')
-
-            try:
-                df = bot.process_custom_bot(policy['customDefinedBots'], network)
-                if not df.empty:
-                    sheet['customDefinedBots'] = df
-            except:
-                feature = 'customDefinedBots'
-                logger.critical(f'{feature:<40} no data')
-
-            df = bot.process_custom_deny_list(policy['customDenyList'])
-            if not df.empty:
-                sheet['customDenyList'] = df
+        return row, policy, filepath, sheet
 
-            df = bot.process_custom_rules(policy['customRules'])
-            if not df.empty:
-                sheet['customRules'] = df
-
-            rate_policy = bot.process_rate_policies(policy['ratePolicies'], network)
-            if len(rate_policy) > 0:
-                sheet['ratePolicies'] = rate_policy
-
-            _, _, response_action_df = bot.process_response_actions(policy['responseActions'], network)
-            if not response_action_df.empty:
-                sheet['responseActions'] = response_action_df
-            else:
-                feature = 'responseActions'
-                logger.critical(f'{feature:<40} no data')
-
-            if len(policy['rulesets']) > 0:
-                sheet['rulesets'], sheet['rulesets_attackgroup'] = bot.process_rulesets(policy['rulesets'])
-            else:
-                feature = 'rulesets'
-                logger.critical(f'{feature:<40} no data')
-
-            try:
-                sheet['reputationProfiles'] = bot.process_reputation_profiles(policy['reputationProfiles'], network)
-            except:
-                feature = 'reputationProfiles'
-                logger.critical(f'{feature:<40} no data')
-
-            all_excels.append(sheet)
-            all_files.append(filepath)
-
-    if all_files:
+    if args.config is None:
+        logger.critical('Please provide at least one configName using --config')
+        return None
+
+    # one listing call, referenced lists are read from the local mirror unless their syncPoint moved
+    network.mirror = NetworkListMirror(account_folder, logger=logger).load()
+    network.mirror.list_versions(network)
+    exports = parallel_map(export_config, good_df.to_dict('records'), progress='security config')
+    network.mirror.save()
+    workbooks = {}
+    for counter, export in enumerate([x for x in exports if x], start=1):
+        row, policy, filepath, sheet = export
+        print()
+        logger.warning(f"config no. {counter:<4}'{row['configName']}'")
+        summary = ['configId', 'configName', 'version', 'basedOn',
+                'staging.status', 'production.status', 'createdBy', 'versionNotes']
+        if 'versionNotes' not in policy.keys():
+            summary.remove('versionNotes')
+        if 'basedOn' not in policy.keys():
+            summary.remove('basedOn')
+
+        df = pd.json_normalize(policy)
+        df.index = df.index + 1
+        logger.debug(df.columns.values)
+        print(tabulate(df[summary], headers=summary, tablefmt='simple', numalign='center', showindex=False, maxcolwidths=50))
+        # with --output every configuration shares one file, the last one wins as before
+        workbooks[filepath] = sheet
+
+    if workbooks:
         print()
-        for filepath, excel in zip(all_files, all_excels):
-            files.write_xlsx(filepath, excel, adjust_column_width=False, freeze_column=3)
+        files.write_xlsx_many(list(workbooks.items()), adjust_column_width=False, freeze_column=3)
+        for filepath in workbooks:
             if platform.system() == 'Darwin' and args.no_show is False:
                 subprocess.check_call(['open', '-a', 'Microsoft Excel', filepath])
 
 
+def network_list(args, account_folder, logger):
+    account_switch_key, section, edgerc = args.account_switch_key, args.section, args.edgerc
+    network = sec.NetworkListWrapper(account_switch_key=account_switch_key, section=section, edgerc=edgerc, logger=logger)
+
+    mirror = NetworkListMirror(account_folder, logger=logger).load()
+    if mirror.refreshed:
+        logger.warning(f'Syncing network lists mirrored at {mirror.refreshed}')
+    changes = mirror.sync(network, concurrency=int(args.concurrency))
+    mirror.save()
+    if not changes.empty:
+        print(tabulate(changes, headers='keys', showindex=False, tablefmt='github'))
+        print()
+
+    queries = list(args.ip) if args.ip else []
+    if args.input:
+        with open(args.input) as file:
+            queries.extend(line.strip() for line in file if line.strip())
+
+    if not queries:
+        df = mirror.summary()
+        print(tabulate(df, headers='keys', showindex=False, tablefmt='github', numalign='center'))
+        logger.warning('--ip or --input to find which network lists contain an IP/CIDR')
+    else:
+        df = mirror.lookup_many(queries)
+        df.index = df.index + 1
+        print(tabulate(df, headers='keys', showindex=True, tablefmt='github', numalign='center'))
+        not_found = df[df['uniqueId'].isna()]
+        if not not_found.empty:
+            logger.info(f'{len(not_found)} of {len(queries)} not found in any network list')
+
+    if args.output:
+        filepath = f'{account_folder}/{args.output}'
+        files.write_xlsx(filepath, {'network_lists': df}, freeze_column=1)
+        if platform.system() == 'Darwin' and args.no_show is False:
+            subprocess.check_call(['open', '-a', 'Microsoft Excel', filepath])
+
+
 def audit_hostname(args, account_folder, logger):
     account_switch_key, section, edgerc = args.account_switch_key, args.section, args.edgerc
     Path(account_folder).mkdir(parents=True, exist_ok=True)
@@ -300,6 +344,8 @@ def audit_hostname(args, account_folder, logger):
     papi = p.PapiWrapper(account_switch_key=account_switch_key, section=section, edgerc=edgerc, logger=logger)
     if args.summary:
         all_account_hostnames = papi.get_account_hostnames()
+        if not isinstance(all_account_hostnames, list):
+            sys.exit(logger.error(f'unable to list account hostnames {all_account_hostnames}'))
         df = pd.DataFrame(all_account_hostnames)
         df = df.rename(columns={'cnameFrom': 'hostname'})
         columns = ['propertyName', 'hostname', 'stagingCnameTo', 'productionCnameTo']
@@ -326,11 +372,10 @@ def audit_hostname(args, account_folder, logger):
 
         unique_hostnames = pd.DataFrame({'hostname': hostnames})
 
-        unique_hostnames['propertyName'] = unique_hostnames['hostname'].apply(lambda x: papi.search_property_by_hostname(x))
-        unique_hostnames['json'] = unique_hostnames['propertyName'].apply(lambda x: papi.search_property_by_name(x)[1])
-        unique_hostnames['staging_version'] = unique_hostnames['json'].apply(lambda x: papi.search_property_version(x)[0])
-
-        del unique_hostnames['json']
+        index = HostnameIndex(papi, logger=logger).build()
+        records = unique_hostnames['hostname'].map(index.get)
+        unique_hostnames['propertyName'] = records.apply(lambda x: x['propertyName'] if x else 'NOT_FOUND')
+        unique_hostnames['staging_version'] = records.apply(lambda x: x['stagingVersion'] if x else None)
         columns = ['propertyName', 'hostname', 'staging_version']
         logger.info(f'\n{unique_hostnames[columns]}')
         sys.exit()
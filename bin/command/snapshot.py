@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import sys
+
+from akamai_api.cps import CpsWrapper
+from akamai_utils import papi as p
+from akamai_utils.appsec import AppsecWrapper
+from akamai_utils.snapshot import AccountSnapshot
+from tabulate import tabulate
+from utils import files
+
+
+def refresh(args, account_folder, logger):
+    account_switch_key, section, edgerc = args.account_switch_key, args.section, args.edgerc
+    papi = p.PapiWrapper(account_switch_key=account_switch_key, section=section, edgerc=edgerc, logger=logger)
+    appsec = AppsecWrapper(account_switch_key=account_switch_key, section=section, edgerc=edgerc, logger=logger)
+    cps = CpsWrapper(account_switch_key=account_switch_key, section=section, edgerc=edgerc, logger=logger)
+
+    snapshot = AccountSnapshot(account_folder, logger=logger).load()
+    if snapshot.refreshed:
+        logger.warning(f'Refreshing snapshot from {snapshot.refreshed}')
+    else:
+        logger.warning('No snapshot found, collecting the whole account')
+    changes = snapshot.refresh(papi, appsec, cps, concurrency=int(args.concurrency), full=args.full)
+    snapshot.save()
+
+    print()
+    print(tabulate(snapshot.summary(), headers='keys', showindex=False, tablefmt='github'))
+    print()
+    if changes.empty:
+        sys.exit(logger.info('No change since the last snapshot'))
+
+    summary = changes.groupby(['object', 'change']).size().reset_index(name='count')
+    print(tabulate(summary, headers='keys', showindex=False, tablefmt='github'))
+    filepath = f'{account_folder}/{args.output}' if args.output else f'{account_folder}/snapshot_changes.xlsx'
+    files.write_xlsx(filepath, {'changes': changes}, freeze_column=3)
+    files.open_excel_application(filepath, False, changes)
+
+
+def show(args, account_folder, logger):
+    snapshot = AccountSnapshot(account_folder, logger=logger).load()
+    if not snapshot.refreshed:
+        sys.exit(logger.error('No snapshot found, run snapshot refresh first'))
+    logger.warning(f'Snapshot refreshed at {snapshot.refreshed}')
+    print(tabulate(snapshot.summary(), headers='keys', showindex=False, tablefmt='github'))
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import concurrent.futures
+import ipaddress
+import logging
+import threading
+import time
+
+from ipwhois import IPWhois
+from utils import cache
+
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 2
+RETRY_DELAY = 1  # seconds
+CONCURRENCY = 10
+WAVE_PREFIX_LENGTH = {4: [16, 24, 32], 6: [32, 48, 128]}
+
+
+class AsnService:
+    '''
+    IP -> ASN description with prefix level reuse,
+    one RDAP lookup returns the announced prefix (asn_cidr) and answers every other IP inside it.
+    Learned prefixes are kept in the response cache, an offline table makes every lookup local
+
+    offline table, one prefix per line, either
+    1.2.3.0/24 13335 CLOUDFLARENET
+    or iptoasn.com tsv
+    1.2.3.0 1.2.3.255 13335 US CLOUDFLARENET
+
+    sample:
+    service = AsnService(logger=logger)
+    descriptions = service.describe_many(ip_df['cname'])
+    ip_df['ASN_Description'] = ip_df['cname'].map(descriptions)
+    '''
+    def __init__(self, table: str | None = None, concurrency: int | None = CONCURRENCY, logger: logging.Logger = None):
+        self.logger = logger if logger else logging.getLogger(__name__)
+        self.concurrency = concurrency
+        self.lock = threading.Lock()
+        # ip version -> prefix length -> network address -> (asn, description, cidr)
+        self.prefixes: dict[int, dict[int, dict[int, tuple[str, str, str]]]] = {4: {}, 6: {}}
+        self.lengths: dict[int, list[int]] = {4: [], 6: []}
+        self.learned: dict[str, list] = {}
+        self.memo: dict[str, str] = {}  # every answer of this run, including failed lookups
+        self.offline = table is not None
+        if table:
+            self.load_table(table)
+        else:
+            cached = cache.get_cache().get('asn', 'prefixes', 0, '', 'asn')
+            for cidr, asn, description in cached.get('prefixes', []) if cached else []:
+                self.add_prefix(cidr, asn, description, learned=True)
+            self.logger.debug(f'{len(self.learned):,} cached ASN prefixes')
+
+    def load_table(self, filepath: str) -> None:
+        count = 0
+        with open(filepath) as f:
+            for line in f:
+                if not line.strip() or line.startswith('#'):
+                    continue
+                fields = line.rstrip('\n').split('\t') if '\t' in line else line.split(maxsplit=2)
+                try:
+                    if len(fields) >= 5:
+                        first, last = ipaddress.ip_address(fields[0]), ipaddress.ip_address(fields[1])
+                        description = fields[4].strip()
+                        asn = fields[2].strip()
+                        if asn == '0':
+                            continue  # not routed
+                        for network in ipaddress.summarize_address_range(first, last):
+                            self.add_prefix(str(network), asn, description)
+                    else:
+                        self.add_prefix(fields[0].strip(), fields[1].strip(), fields[2].strip() if len(fields) > 2 else '')
+                    count += 1
+                except (ValueError, IndexError):
+                    self.logger.debug(f'invalid ASN table line {line.strip()}')
+        self.logger.info(f'loaded {count:,} ASN table entries from {filepath}')
+
+    def add_prefix(self, cidr: str, asn: str, description: str, learned: bool = False) -> None:
+        network = ipaddress.ip_network(cidr, strict=False)
+        with self.lock:
+            by_length = self.prefixes[network.version].setdefault(network.prefixlen, {})
+            by_length[int(network.network_address)] = (asn, description, str(network))
+            self.lengths[network.version] = sorted(self.prefixes[network.version], reverse=True)
+            if learned:
+                self.learned[str(network)] = [str(network), asn, description]
+
+    def find(self, ip: str) -> tuple[str, str, str] | None:
+        '''
+        Most specific known prefix covering the ip, (asn, description, cidr)
+        '''
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        value = int(address)
+        bits = address.max_prefixlen
+        with self.lock:
+            for length in self.lengths[address.version]:
+                found = self.prefixes[address.version][length].get(value >> (bits - length) << (bits - length))
+                if found:
+                    return found
+        return None
+
+    def lookup(self, ip: str) -> str:
+        '''
+        RDAP first, then WHOIS, the announced prefix is learned for the next ip
+        '''
+        for attempt in range(MAX_RETRIES):
+            try:
+                result = IPWhois(ip).lookup_rdap()
+                break
+            except Exception:
+                self.logger.debug(f'{ip:<30} RDAP lookup {attempt}')
+                time.sleep(RETRY_DELAY)
+        else:
+            try:
+                result = IPWhois(ip).lookup_whois()
+            except Exception:
+                self.logger.error(f'{ip:<30} WHOIS lookup {attempt}')
+                return '__NOT FOUND'
+
+        description = result.get('asn_description')
+        if description is None:
+            return '_NOT FOUND'
+        for cidr in str(result.get('asn_cidr') or '').split(','):
+            try:
+                self.add_prefix(cidr.strip(), str(result.get('asn')), description, learned=True)
+            except ValueError:
+                pass
+        self.logger.debug(f'{ip:<30} {description:<20} {result.get("asn_cidr")}')
+        return description
+
+    def describe(self, ip: str) -> str:
+        found = self.find(ip)
+        if found:
+            return found[1]
+        if self.offline:
+            return '_NOT FOUND'
+        return self.lookup(ip)
+
+    def describe_many(self, ips) -> dict[str, str]:
+        '''
+        Distinct ips, resolved one prefix at a time:
+        each wave looks up one uncovered ip per block concurrently, from /16 down to single ips,
+        everything inside a learned prefix is answered locally
+        '''
+        unique = list(dict.fromkeys(x for x in ips if isinstance(x, str)))
+        result = {}
+        pending = []
+        for ip in unique:
+            found = self.find(ip)
+            if ip in self.memo:
+                result[ip] = self.memo[ip]
+            elif found:
+                result[ip] = found[1]
+            elif self.offline:
+                result[ip] = '_NOT FOUND'
+            else:
+                pending.append(ip)
+
+        lookups, depth = 0, 0
+        while pending:
+            wave = {}
+            for ip in pending:
+                try:
+                    address = ipaddress.ip_address(ip)
+                except ValueError:
+                    result[ip] = '_NOT FOUND'
+                    continue
+                length = WAVE_PREFIX_LENGTH[address.version][min(depth, 2)]
+                wave.setdefault(ipaddress.ip_network(f'{ip}/{length}', strict=False), ip)
+            depth += 1
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                for ip, description in zip(wave.values(), executor.map(self.lookup, wave.values())):
+                    result[ip] = description
+            lookups += len(wave)
+
+            remaining = []
+            for ip in pending:
+                if ip in result:
+                    continue
+                found = self.find(ip)
+                if found:
+                    result[ip] = found[1]
+                else:
+                    remaining.append(ip)
+            pending = remaining
+
+        self.memo.update(result)
+        self.logger.debug(f'{len(unique):,} ips, {lookups:,} ASN lookups')
+        if lookups:
+            self.save()
+        return result
+
+    def save(self) -> None:
+        with self.lock:
+            prefixes = list(self.learned.values())
+        cache.get_cache().set('asn', 'prefixes', 0, '', 'asn', {'prefixes': prefixes})
+
+
+if __name__ == '__main__':
+    pass
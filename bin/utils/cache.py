@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONFIG = {'enabled': True,
+                'refresh': False,
+                'path': f'{str(Path.home())}/.cache/akamai-utility/responses.db',
+                'max_age_days': 30,
+                'max_size_mb': 512}
+
+
+class ResponseCache:
+    '''
+    SQLite store of zlib compressed JSON responses for immutable API objects,
+    keyed by (account, propertyId, version, ruleFormat, endpoint)
+
+    --no-cache : never read or write the cache
+    --refresh  : ignore cached entries and store fresh responses
+    '''
+    def __init__(self, path: str, max_age_days: int, max_size_mb: int,
+                 enabled: bool = True, refresh: bool = False):
+        self.path = path
+        self.max_age = max_age_days * 86400
+        self.max_size = max_size_mb * 1024 * 1024
+        self.enabled = enabled
+        self.refresh = refresh
+        self.lock = threading.Lock()
+        self.pid = None
+        self.conn = None
+
+    def connect(self) -> sqlite3.Connection:
+        # pandarallel forks workers, a sqlite connection must not cross processes
+        if self.conn is None or self.pid != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS response (
+                                     account TEXT, property_id TEXT, version INTEGER,
+                                     rule_format TEXT, endpoint TEXT,
+                                     created REAL, accessed REAL, size INTEGER, data BLOB,
+                                     PRIMARY KEY (account, property_id, version, rule_format, endpoint))''')
+            self.conn.commit()
+            self.pid = os.getpid()
+        return self.conn
+
+    def get(self, account: str, property_id: int | str, version: int, rule_format: str, endpoint: str,
+            max_age: int | None = None) -> dict | None:
+        '''
+        max_age in seconds overrides max_age_days for objects that do change, ie. the cpcode directory
+        '''
+        if not self.enabled or self.refresh:
+            return None
+        max_age = self.max_age if max_age is None else min(max_age, self.max_age)
+        key = (str(account), str(property_id), int(version), rule_format, endpoint)
+        try:
+            with self.lock:
+                conn = self.connect()
+                row = conn.execute('''SELECT data, created FROM response
+                                      WHERE account=? AND property_id=? AND version=? AND rule_format=? AND endpoint=?''', key).fetchone()
+                if row is None or time.time() - row[1] > max_age:
+                    return None
+                conn.execute('''UPDATE response SET accessed=?
+                                WHERE account=? AND property_id=? AND version=? AND rule_format=? AND endpoint=?''', (time.time(), *key))
+                conn.commit()
+            logger.debug(f'cache hit {key}')
+            return json.loads(zlib.decompress(row[0]))
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            logger.debug(f'cache read error {key} {e}')
+            return None
+
+    def set(self, account: str, property_id: int | str, version: int, rule_format: str, endpoint: str, data: dict) -> None:
+        if not self.enabled:
+            return None
+        key = (str(account), str(property_id), int(version), rule_format, endpoint)
+        blob = zlib.compress(json.dumps(data).encode('utf-8'))
+        now = time.time()
+        try:
+            with self.lock:
+                conn = self.connect()
+                conn.execute('INSERT OR REPLACE INTO response VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (*key, now, now, len(blob), blob))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.debug(f'cache write error {key} {e}')
+
+    def evict(self) -> None:
+        '''
+        Drop entries older than max_age_days, then least recently used entries above max_size_mb
+        '''
+        if not self.enabled:
+            return None
+        try:
+            with self.lock:
+                conn = self.connect()
+                conn.execute('DELETE FROM response WHERE created < ?', (time.time() - self.max_age,))
+                total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM response').fetchone()[0]
+                if total > self.max_size:
+                    rows = conn.execute('SELECT rowid, size FROM response ORDER BY accessed').fetchall()
+                    expired = []
+                    for rowid, size in rows:
+                        if total <= self.max_size:
+                            break
+                        expired.append((rowid,))
+                        total -= size
+                    conn.executemany('DELETE FROM response WHERE rowid=?', expired)
+                    logger.debug(f'cache evicted {len(expired)} entries')
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.debug(f'cache eviction error {e}')
+
+
+_cache: ResponseCache | None = None
+
+
+def configure_cache(enabled: bool | None = None,
+                    refresh: bool | None = None,
+                    path: str | None = None,
+                    max_age_days: int | None = None,
+                    max_size_mb: int | None = None) -> ResponseCache:
+    global _cache
+    if enabled is not None:
+        CACHE_CONFIG['enabled'] = enabled
+    if refresh is not None:
+        CACHE_CONFIG['refresh'] = refresh
+    if path:
+        CACHE_CONFIG['path'] = path
+    if max_age_days:
+        CACHE_CONFIG['max_age_days'] = max_age_days
+    if max_size_mb:
+        CACHE_CONFIG['max_size_mb'] = max_size_mb
+    _cache = ResponseCache(**CACHE_CONFIG)
+    _cache.evict()
+    return _cache
+
+
+def get_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache(**CACHE_CONFIG)
+    return _cache
+
+
+if __name__ == '__main__':
+    pass
@@ -75,6 +75,27 @@ def explode_cell(df, column_name: str, columns_to_explode: list):
     return exploded_data
 
 
+def explode_records(df: pd.DataFrame, column_name: str) -> tuple[pd.DataFrame, list]:
+    '''
+    Columnar explode_cell, one row per dict in the list column and one column per key,
+    a key replaces the parent column of the same name. Rows with an empty or missing list are kept once
+    with the key columns empty, column_name itself is kept as is
+
+    sample:
+    conditions_df, keys = explode_records(df, 'conditions')
+    '''
+    items = [x if isinstance(x, list) and len(x) > 0 else [None] for x in df[column_name]]
+    positions = np.repeat(np.arange(len(items)), [len(x) for x in items])
+    children = pd.DataFrame([x if isinstance(x, dict) else {} for item in items for x in item], index=pd.RangeIndex(len(positions)))
+    keys = children.columns.tolist()
+    parent = df.iloc[positions].drop(columns=[key for key in keys if key in df.columns]).reset_index(drop=True)
+    return pd.concat([parent, children], axis=1), keys
+
+
+def count_items(values: pd.Series) -> pd.Series:
+    return values.map(lambda x: len(x) if isinstance(x, list) else 0)
+
+
 def explode_columns(row):
     exploded_row = []
     for col_name, col_value in row.items():
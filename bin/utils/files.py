@@ -1,21 +1,38 @@
 from __future__ import annotations
 
 import gzip
+import itertools
 import json
 import logging
 import platform
 import re
 import subprocess
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+import polars as pl
+import xlsxwriter
 from lxml import etree
 from UliPlot.XLSX import auto_adjust_xlsx_column_width
 
 
 logger = logging.getLogger(__name__)
 
+OUTPUT_CONFIG = {'format': 'xlsx', 'constant_memory': False}
+MAX_XLXS_ROW = 1000000           # 1 million rows per sheet
+STREAMING_XLSX_ROW = 200000      # larger workbooks are written in xlsxwriter constant_memory mode
+COLUMN_WIDTH_SAMPLE = 1000       # rows used to estimate column width in constant_memory mode
+MAX_COLUMN_WIDTH = 80
+COLUMNAR_EXTENSIONS = {'parquet': 'parquet', 'arrow': 'arrow', 'csv': 'csv', 'jsonl': 'jsonl'}
+# pandas nullable dtypes, written with their own type and real nulls
+NULLABLE_TYPES = {'Int8': pl.Int8, 'Int16': pl.Int16, 'Int32': pl.Int32, 'Int64': pl.Int64,
+                  'UInt8': pl.UInt8, 'UInt16': pl.UInt16, 'UInt32': pl.UInt32, 'UInt64': pl.UInt64,
+                  'Float32': pl.Float32, 'Float64': pl.Float64, 'boolean': pl.Boolean}
+
 
 def transform_to_jsonpath(path):
     parts = path.strip('/').split('/')
@@ -143,16 +160,83 @@ def create_hyperlink_to_external_link(url: str, alias: str) -> str:
         return f'{url}'
 
 
+def configure_output(output_format: str, constant_memory: bool | None = None) -> None:
+    OUTPUT_CONFIG['format'] = output_format
+    if constant_memory is not None:
+        OUTPUT_CONFIG['constant_memory'] = constant_memory
+
+
+def columnar_frame(df: pd.DataFrame) -> pl.DataFrame:
+    '''
+    Arrow needs one type per column, serialize mixed object columns (ruletree json, lists, etc.) to text.
+    Built column by column from numpy so it does not depend on pandas' pyarrow bridge
+    '''
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series) and getattr(series.dt, 'tz', None) is not None:
+            series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+        if isinstance(series.dtype, np.dtype) and series.dtype != object:
+            columns[str(col)] = series.to_numpy()
+        elif series.dtype.name in NULLABLE_TYPES:
+            values = series.astype(object).where(series.notna(), None).tolist()
+            columns[str(col)] = pl.Series(str(col), values, dtype=NULLABLE_TYPES[series.dtype.name])
+        elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            columns[str(col)] = series.to_numpy(dtype=float, na_value=np.nan)
+        else:
+            columns[str(col)] = [None if x is None or (not isinstance(x, (dict, list, tuple)) and pd.isna(x))
+                                 else x if isinstance(x, str)
+                                 else json.dumps(x, default=str) if isinstance(x, (dict, list, tuple))
+                                 else str(x) for x in series]
+    return pl.DataFrame(columns)
+
+
+def write_columnar(filepath: str, dict_value: dict, output_format: str, show_index: bool | None = False) -> str:
+    '''
+    One file per sheet, output/account_summary.xlsx -> output/account_summary/<sheet>.parquet
+    '''
+    folder = Path(filepath).with_suffix('')
+    folder.mkdir(parents=True, exist_ok=True)
+    extension = COLUMNAR_EXTENSIONS[output_format]
+    for sheetname, df in dict_value.items():
+        if df is None:
+            continue
+        sheetfile = folder / f"{str(sheetname).replace('/', '_')}.{extension}"
+        if output_format == 'csv':
+            df.to_csv(sheetfile, index=show_index)
+        elif output_format == 'jsonl':
+            df = df.reset_index() if show_index else df
+            df.to_json(sheetfile, orient='records', lines=True, date_format='iso', default_handler=str)
+        else:
+            data = columnar_frame(df.reset_index() if show_index else df)
+            if output_format == 'parquet':
+                data.write_parquet(sheetfile)
+            else:
+                data.write_ipc(sheetfile)  # Arrow IPC file
+        logger.debug(f'{sheetname} {len(df.index):,} rows {sheetfile}')
+    logger.info(f'filepath={str(folder.absolute())}')
+    return str(folder)
+
+
 def write_xlsx(filepath: str, dict_value: dict,
                freeze_row: int | None = 1,
                freeze_column: int | None = 2,
                show_url: bool | None = True,
                show_index: bool | None = False,
                adjust_column_width: bool | None = True) -> None:
+    if OUTPUT_CONFIG['format'] != 'xlsx':
+        write_columnar(filepath, dict_value, OUTPUT_CONFIG['format'], show_index)
+        return None
+
+    chunked = any(df is not None and not isinstance(df, pd.DataFrame) for df in dict_value.values())
+    total = sum(len(df.index) for df in dict_value.values() if isinstance(df, pd.DataFrame))
+    if chunked or OUTPUT_CONFIG['constant_memory'] or total > STREAMING_XLSX_ROW:
+        write_xlsx_streaming(filepath, dict_value, freeze_row, freeze_column, show_url, show_index, adjust_column_width)
+        return None
+
     with pd.ExcelWriter(path=filepath, engine='xlsxwriter',
                         engine_kwargs={'options': {'strings_to_urls': show_url}}) as writer:
         writer.book.use_zip64()  # to allow excel to store files larger than 4GB
-        MAX_XLXS_ROW = 1000000   # 1 million rows per sheet
         MAX_SHEETS = 89          # 89 sheets per excel
         for sheetname, df in dict_value.items():
             if df is not None:
@@ -251,8 +335,123 @@ def write_xlsx(filepath: str, dict_value: dict,
     logger.info(f'{filepath=}')
 
 
+def write_xlsx_many(workbooks: list[tuple[str, dict]], processes: int | None = None, **kwargs) -> None:
+    '''
+    Write independent workbooks in worker processes, building xlsx is CPU bound and holds the GIL.
+    kwargs are passed to write_xlsx for every workbook
+
+    sample:
+    write_xlsx_many([(filepath, sheet) for filepath, sheet in exports], adjust_column_width=False, freeze_column=3)
+    '''
+    if len(workbooks) <= 1 or processes == 1:
+        for filepath, dict_value in workbooks:
+            write_xlsx(filepath, dict_value, **kwargs)
+        return None
+
+    # workers may be spawned rather than forked, pass the output settings along
+    with ProcessPoolExecutor(max_workers=processes, initializer=configure_output,
+                             initargs=(OUTPUT_CONFIG['format'], OUTPUT_CONFIG['constant_memory'])) as executor:
+        futures = [executor.submit(write_xlsx, filepath, dict_value, **kwargs) for filepath, dict_value in workbooks]
+        for future in futures:
+            future.result()
+
+
+def write_xlsx_streaming(filepath: str, dict_value: dict,
+                         freeze_row: int | None = 1,
+                         freeze_column: int | None = 2,
+                         show_url: bool | None = True,
+                         show_index: bool | None = False,
+                         adjust_column_width: bool | None = True) -> None:
+    '''
+    xlsxwriter constant_memory mode, rows are flushed to disk as they are written.
+    dict_value values are DataFrames or iterables of DataFrame chunks sharing the same columns,
+    column widths come from the first COLUMN_WIDTH_SAMPLE rows instead of autofit
+    '''
+    workbook = xlsxwriter.Workbook(filepath, {'constant_memory': True,
+                                              'strings_to_urls': show_url,
+                                              'default_date_format': 'yyyy-mm-dd hh:mm:ss'})
+    workbook.use_zip64()  # to allow excel to store files larger than 4GB
+    header_format = workbook.add_format({'bold': True,
+                                         'text_wrap': True,
+                                         'valign': 'top',
+                                         'align': 'middle',
+                                         'fg_color': '#FFC588',  # orange
+                                         'border': 1,
+                                        })
+    format1 = workbook.add_format({'num_format': '#,##0'})
+
+    def new_sheet(name: str, header: list, sample: pd.DataFrame):
+        ws = workbook.add_worksheet(name)
+        ws.hide_gridlines()
+        ws.freeze_panes(freeze_row, freeze_column)
+        for col_num, width in enumerate(sample_column_width(header, sample) if adjust_column_width else [None] * len(header)):
+            ws.set_column(col_num, col_num, width, format1 if col_num == 2 else None)
+        for col_num, value in enumerate(header):
+            ws.write(0, col_num, value, header_format)
+        return ws
+
+    for sheetname, data in dict_value.items():
+        if data is None:
+            continue
+        chunks = iter([data]) if isinstance(data, pd.DataFrame) else iter(data)
+        first = next(chunks, None)
+        if first is None:
+            continue
+        sample = first.head(COLUMN_WIDTH_SAMPLE)
+        sample = sample.reset_index() if show_index else sample
+        header = ['' if show_index and i == 0 else str(col) for i, col in enumerate(sample.columns)]
+        split = isinstance(data, pd.DataFrame) and len(data.index) > MAX_XLXS_ROW
+
+        sheet_no, row_num = 1, 0
+        ws = new_sheet(f'{sheetname}_{sheet_no}' if split else sheetname, header, sample)
+        for chunk in itertools.chain([first], chunks):
+            for values in chunk.itertuples(index=show_index, name=None):
+                if row_num == MAX_XLXS_ROW:
+                    sheet_no, row_num = sheet_no + 1, 0
+                    ws = new_sheet(f'{sheetname}_{sheet_no}', header, sample)
+                    logger.info(f'{sheetname}_{sheet_no}')
+                row_num += 1
+                for col_num, value in enumerate(values):
+                    write_xlsx_cell(ws, row_num, col_num, value)
+        logger.debug(f'{sheetname} {(sheet_no - 1) * MAX_XLXS_ROW + row_num:,} rows')
+
+    workbook.close()
+    filepath = str(Path(f'{filepath}').absolute())
+    logger.info(f'{filepath=}')
+
+
+def write_xlsx_cell(ws, row_num: int, col_num: int, value) -> None:
+    if value is None or isinstance(value, (list, dict, tuple, set)):
+        if value is not None:
+            ws.write_string(row_num, col_num, str(value))
+        return None
+    if isinstance(value, (pd.Timestamp, datetime)):
+        if pd.isna(value):
+            return None
+        ws.write_datetime(row_num, col_num, value.tz_localize(None) if isinstance(value, pd.Timestamp) and value.tz else value)
+    elif isinstance(value, (float, np.floating)) and not np.isfinite(value):
+        return None
+    elif isinstance(value, (str, bool, int, float, np.integer, np.floating, np.bool_)):
+        ws.write(row_num, col_num, value.item() if isinstance(value, np.generic) else value)
+    elif pd.isna(value):
+        return None
+    else:
+        ws.write_string(row_num, col_num, str(value))
+
+
+def sample_column_width(header: list, sample: pd.DataFrame) -> list[int]:
+    widths = []
+    for col_num, col in enumerate(sample.columns):
+        values = sample.iloc[:, col_num].dropna().astype(str)
+        # formula cells display their alias, not the whole =HYPERLINK("url", "alias")
+        values = values.str.replace(r'^=HYPERLINK\(".*", ?"(.*)"\)$', r'\1', regex=True)
+        longest = max([len(header[col_num])] + [len(line) for value in values for line in value.split('\n')])
+        widths.append(min(longest + 2, MAX_COLUMN_WIDTH))
+    return widths
+
+
 def open_excel_application(filepath: str, show: bool | None = True, df: pd.DataFrame | None = None) -> None:
-    if platform.system() == 'Darwin' and show is True:
+    if platform.system() == 'Darwin' and show is True and OUTPUT_CONFIG['format'] == 'xlsx':
         if len(df.index) > 0:
             subprocess.check_call(['open', '-a', 'Microsoft Excel', filepath])
 
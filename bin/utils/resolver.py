@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import dns.exception
+import dns.resolver
+import requests
+from akamai_api.edge_auth import parallel_map
+from requests.adapters import HTTPAdapter
+from utils import cache
+
+
+logger = logging.getLogger(__name__)
+
+# doh    : JSON DNS over HTTPS, Google /resolve API compatible
+# system : operating system resolver, no TTL so answers are kept SYSTEM_TTL seconds
+# server : query a DNS server directly, ie. --dns-server 10.0.0.2 or 127.0.0.1:5353
+RESOLVER_CONFIG = {'backend': 'doh',
+                   'server': 'https://dns.google/resolve',
+                   'concurrency': 50,
+                   'timeout': 5}
+
+SYSTEM_TTL = 300
+NEGATIVE_TTL = 300     # NXDOMAIN and SERVFAIL answers
+MAX_TTL = 86400        # never keep an answer longer than a day, whatever the record says
+
+
+class DohBackend:
+    name = 'doh'
+
+    def __init__(self, url: str, concurrency: int, timeout: float):
+        self.url = url
+        self.source = f'doh:{url}'
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+        self.session.headers.update({'Accept': 'application/dns-json'})
+
+    def query(self, hostname: str) -> tuple[str, list[tuple[str, int]]]:
+        try:
+            resp = self.session.get(self.url, params={'name': hostname, 'do': 0}, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.debug(f'{hostname:<40} {e}')
+            return 'ERROR', []
+        if resp.status_code != 200:
+            return 'ERROR', []
+        data = resp.json()
+        if data['Status'] == 0:
+            return 'NOERROR', [(x['data'], x.get('TTL', SYSTEM_TTL)) for x in data.get('Answer', [])]
+        elif data['Status'] == 3:
+            return 'NXDOMAIN', []
+        elif data['Status'] == 2:
+            return 'SERVFAIL', []
+        return 'OTHER', []
+
+
+class ServerBackend:
+    name = 'server'
+
+    def __init__(self, server: str, timeout: float):
+        host, _, port = server.partition(':') if server.count(':') == 1 else (server, '', '')  # ipv6 without port
+        self.resolver = dns.resolver.Resolver(configure=False)
+        self.resolver.nameservers = [host]
+        self.resolver.port = int(port) if port else 53
+        self.resolver.lifetime = timeout
+        self.source = f'server:{host}:{self.resolver.port}'
+
+    def query(self, hostname: str) -> tuple[str, list[tuple[str, int]]]:
+        try:
+            answer = self.resolver.resolve(hostname, 'A', raise_on_no_answer=False)
+        except dns.resolver.NXDOMAIN:
+            return 'NXDOMAIN', []
+        except dns.resolver.NoNameservers:
+            return 'SERVFAIL', []
+        except dns.exception.DNSException as e:
+            logger.debug(f'{hostname:<40} {e}')
+            return 'OTHER', []
+        # CNAME chain followed by the A records, in the order the server returned them
+        return 'NOERROR', [(rdata.to_text(), rrset.ttl) for rrset in answer.response.answer for rdata in rrset]
+
+
+class SystemBackend:
+    name = 'system'
+    source = 'system'
+
+    def query(self, hostname: str) -> tuple[str, list[tuple[str, int]]]:
+        try:
+            canonical, aliases, ips = socket.gethostbyname_ex(hostname)
+        except socket.gaierror as e:
+            if e.errno in [socket.EAI_NONAME, getattr(socket, 'EAI_NODATA', socket.EAI_NONAME)]:
+                return 'NXDOMAIN', []
+            return 'OTHER', []
+        except (socket.herror, UnicodeError):
+            return 'OTHER', []
+        names = [x for x in [*aliases, canonical] if x.lower() != hostname.lower().rstrip('.')]
+        return 'NOERROR', [(f'{x}.', SYSTEM_TTL) for x in names] + [(x, SYSTEM_TTL) for x in ips]
+
+
+class Resolver:
+    '''
+    Resolve hostnames to the Akamai CNAME (edgekey/edgesuite) when there is one, otherwise the last answer,
+    answers are cached in memory and on disk for the record TTL
+
+    sample:
+    cnames = resolver.get_resolver().resolve_many(hostname_df['hostname'])
+    hostname_df['cname'] = hostname_df['hostname'].map(cnames)
+    '''
+    def __init__(self, backend: str, server: str, concurrency: int, timeout: float):
+        if backend == 'system':
+            self.backend = SystemBackend()
+        elif backend == 'server' and not server.startswith('https://'):
+            self.backend = ServerBackend(server, timeout)
+        else:
+            self.backend = DohBackend(server if server.startswith('https://') else 'https://dns.google/resolve', concurrency, timeout)
+        self.concurrency = concurrency
+        self.memo: dict[str, tuple[str, float]] = {}
+        self.lock = threading.Lock()
+        # DNS queries have their own threads, they are not capped by the API pool size and do not hold its workers
+        self.executor: ThreadPoolExecutor | None = None
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='resolver')
+        return self.executor
+
+    @staticmethod
+    def answer_value(status: str, answers: list[tuple[str, int]]) -> str:
+        if status == 'NOERROR':
+            output = 'None'
+            for data, _ in answers:
+                output = data
+                if 'edgekey.net' in data or 'edgesuite.net' in data:
+                    break
+            return output
+        elif status in ['NXDOMAIN', 'ERROR']:
+            return 'None'
+        elif status == 'SERVFAIL':
+            return 'DNS SERV FAIL'
+        return 'N/A'
+
+    def resolve(self, hostname: str | None) -> str:
+        if not isinstance(hostname, str):
+            return 'Wildcard'
+        key = hostname.lower()
+        now = time.time()
+        with self.lock:
+            memo = self.memo.get(key)
+        if memo and memo[1] > now:
+            return memo[0]
+
+        cached = cache.get_cache().get('dns', key, 0, self.backend.source, 'dns', max_age=MAX_TTL)
+        if cached and cached['expires'] > now:
+            value, expires = cached['value'], cached['expires']
+        else:
+            status, answers = self.backend.query(hostname)
+            value = self.answer_value(status, answers)
+            if status == 'NOERROR' and answers:
+                ttl = min(ttl for _, ttl in answers)
+            elif status == 'ERROR':
+                ttl = 0  # transport error, ask again next time
+            else:
+                ttl = NEGATIVE_TTL
+            expires = now + min(ttl, MAX_TTL)
+            if ttl > 0:
+                cache.get_cache().set('dns', key, 0, self.backend.source, 'dns', {'value': value, 'expires': expires})
+            if 'edgesuite.net' in value:
+                logger.debug(f'{hostname:<40} cname to {value}')
+        with self.lock:
+            self.memo[key] = (value, expires)
+        return value
+
+    def resolve_many(self, hostnames) -> dict[str, str]:
+        '''
+        Resolve every distinct hostname once, at most `concurrency` queries in flight
+        '''
+        unique = list(dict.fromkeys(x for x in hostnames if isinstance(x, str)))
+        if not unique:
+            return {}
+        values = parallel_map(self.resolve, unique, concurrency=self.concurrency, executor=self.get_executor())
+        logger.debug(f'resolved {len(unique):,} hostnames')
+        return dict(zip(unique, values))
+
+
+_resolver: Resolver | None = None
+
+
+def configure_resolver(backend: str | None = None,
+                       server: str | None = None,
+                       concurrency: int | None = None,
+                       timeout: float | None = None) -> Resolver:
+    global _resolver
+    if backend:
+        RESOLVER_CONFIG['backend'] = backend
+    if server:
+        RESOLVER_CONFIG['server'] = server
+        RESOLVER_CONFIG['backend'] = backend if backend else ('doh' if server.startswith('https://') else 'server')
+    if concurrency:
+        RESOLVER_CONFIG['concurrency'] = concurrency
+    if timeout:
+        RESOLVER_CONFIG['timeout'] = timeout
+    _resolver = Resolver(**RESOLVER_CONFIG)
+    return _resolver
+
+
+def get_resolver() -> Resolver:
+    global _resolver
+    if _resolver is None:
+        _resolver = Resolver(**RESOLVER_CONFIG)
+    return _resolver
+
+
+if __name__ == '__main__':
+    pass
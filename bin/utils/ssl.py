@@ -8,8 +8,11 @@ from __future__ import annotations
 import logging
 import socket
 import ssl
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+from akamai_api.edge_auth import parallel_map
 from cryptography import x509
 from cryptography.x509.oid import NameOID
 from utils import _logging as lg
@@ -23,40 +26,118 @@ def cert_decode_pem(pem_data):
     return cert
 
 
-def get_cert(hostname: str, port: int, sni: bool, retries=2, delay=1):
-    count = 0
-    for attempt in range(1, retries + 1):
+CONCURRENCY = 50
+TIMEOUT = 5  # seconds, connect and handshake
+NO_CERTIFICATE = {'expired_date': None, 'commonName': None, 'subjectAltName': [], 'PEM': None}
+
+
+class CertificateProbe:
+    '''
+    Concurrent TLS handshakes, one per distinct (hostname, port, sni) per run,
+    the leaf certificate is returned as PEM with expiry, common name and subjectAltName already parsed
+
+    sample:
+    probe = ssl.CertificateProbe(logger=logger)
+    targets = list(zip(df['hostname'], df['port'], df['sni']))
+    probe.probe_many(targets)
+    df['expired_date'] = [probe.probe(*x)['expired_date'] for x in targets]
+    '''
+    def __init__(self, concurrency: int = CONCURRENCY, timeout: float = TIMEOUT, retries: int = 2, delay: float = 1,
+                 logger: logging.Logger = None):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.delay = delay
+        self.logger = logger if logger else logging.getLogger(__name__)
+        # origins are audited, not trusted, any certificate is accepted so expired or self signed ones are reported
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        self.context.check_hostname = False
+        self.context.verify_mode = ssl.CERT_NONE
+        self.memo: dict[tuple[str, int, bool], dict] = {}
+        self.lock = threading.Lock()
+        # handshakes wait on sockets, not on the API, they run on their own threads
+        self.executor: ThreadPoolExecutor | None = None
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='tls_probe')
+        return self.executor
+
+    @staticmethod
+    def key(hostname: str, port: int, sni: bool) -> tuple[str, int, bool]:
+        return hostname.lower().rstrip('.'), int(port), bool(sni)
+
+    @staticmethod
+    def parse(pem_certificate: str) -> dict:
+        value = {'expired_date': '', 'commonName': '', 'subjectAltName': [], 'PEM': pem_certificate}
         try:
-            conn = ssl.create_connection((hostname, port), timeout=5)
-            context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
-            if sni:
-                sock = context.wrap_socket(conn, server_hostname=hostname)
-            else:
-                sock = context.wrap_socket(conn)
-            der_certificate = sock.getpeercert(True)
-            try:
-                pem_certificate = ssl.DER_cert_to_PEM_cert(der_certificate)
-            except:
-                pem_certificate = ''
+            cert = cert_decode_pem(pem_certificate)
+            value['expired_date'] = cert.not_valid_after.strftime('%Y-%m-%d %H:%M:%S')
+            common_name = cert.subject.get_attributes_for_oid(NameOID.COMMON_NAME)
+            value['commonName'] = common_name[0].value if common_name else ''
+            san = cert.extensions.get_extension_for_class(x509.SubjectAlternativeName)
+            value['subjectAltName'] = san.value.get_values_for_type(x509.DNSName)
+        except x509.ExtensionNotFound:
+            pass
+        except ValueError as e:
+            logger.debug(f'unable to decode certificate {e}')
+        return value
+
+    def handshake(self, hostname: str, port: int, sni: bool) -> dict:
+        count = 0
+        for attempt in range(1, self.retries + 1):
             try:
-                cert = cert_decode_pem(pem_certificate)
-                expired_dt = cert.not_valid_after.strftime('%Y-%m-%d %H:%M:%S')
-                common_name = cert.subject.get_attributes_for_oid(NameOID.COMMON_NAME)[0].value
-                logger.debug(common_name)
-            except:
-                expired_dt = ''
-                common_name = ''
-            return expired_dt, common_name, pem_certificate
-        except socket.timeout as e:
-            logger.debug(f'{hostname:<80} Connection {attempt}/{retries} timed out: {str(e)}')
-            count += 1
-            time.sleep(delay)
-        except Exception as e:
-            logger.error(f'{hostname:<80} {str(e)}')
-            break
-    if count > 0:
-        logger.error(f'{hostname:<80} Failed to establish a connection')
-    return None, None, None
+                with socket.create_connection((hostname, port), timeout=self.timeout) as conn:
+                    with self.context.wrap_socket(conn, server_hostname=hostname if sni else None) as sock:
+                        der_certificate = sock.getpeercert(True)
+                value = self.parse(ssl.DER_cert_to_PEM_cert(der_certificate) if der_certificate else '')
+                self.logger.debug(f'{hostname:<80} {value["commonName"]}')
+                return value
+            except socket.timeout as e:
+                self.logger.debug(f'{hostname:<80} Connection {attempt}/{self.retries} timed out: {str(e)}')
+                count += 1
+                time.sleep(self.delay)
+            except Exception as e:
+                self.logger.error(f'{hostname:<80} {str(e)}')
+                break
+        if count > 0:
+            self.logger.error(f'{hostname:<80} Failed to establish a connection')
+        return dict(NO_CERTIFICATE)
+
+    def probe(self, hostname: str, port: int = 443, sni: bool = True) -> dict:
+        if not isinstance(hostname, str):
+            return dict(NO_CERTIFICATE)
+        key = self.key(hostname, port, sni)
+        with self.lock:
+            if key in self.memo:
+                return self.memo[key]
+        value = self.handshake(hostname, key[1], key[2])
+        with self.lock:
+            self.memo[key] = value
+        return value
+
+    def probe_many(self, targets) -> dict[tuple[str, int, bool], dict]:
+        '''
+        targets are (hostname, port, sni), every distinct one is probed once with at most `concurrency` handshakes in flight
+        '''
+        unique = list(dict.fromkeys(self.key(*x) for x in targets if isinstance(x[0], str)))
+        if not unique:
+            return {}
+        values = parallel_map(lambda x: self.probe(*x), unique, concurrency=self.concurrency, executor=self.get_executor())
+        self.logger.debug(f'probed {len(unique):,} certificates')
+        return dict(zip(unique, values))
+
+
+_probe: CertificateProbe | None = None
+
+
+def get_cert(hostname: str, port: int, sni: bool, retries=2, delay=1):
+    global _probe
+    if _probe is None:
+        _probe = CertificateProbe(retries=retries, delay=delay)
+    value = _probe.probe(hostname, port, sni)
+    return value['expired_date'], value['commonName'], value['PEM']
 
 
 if __name__ == '__main__':